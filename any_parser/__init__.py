@@ -1,7 +1,42 @@
 """AnyParser module for parsing data."""
 
-from any_parser.any_parser import AnyParser
+from any_parser.any_parser import AnyParser, ProcessResult
+from any_parser.callbacks import CallbackReceiver
+from any_parser.circuit_breaker import CircuitBreakerRegistry
+from any_parser.concurrency import AdaptiveLimiter, ByteBudget
+from any_parser.deadline import CancellationToken, deadline
+from any_parser.extraction_schema import ExtractionSchema
+from any_parser.file_handle import FileHandle
+from any_parser.hedging import HedgePolicy
+from any_parser.image_preprocessing import ImagePreprocessOptions
+from any_parser.jobs import ParseJob, as_completed
+from any_parser.local_extraction import LocalExtractionOptions
+from any_parser.model_router import ModelRouter, ModelRoutingOptions
+from any_parser.router import HybridRouter
+from any_parser.scheduler import FairScheduler, Priority, schedule_as
 
-__all__ = ["AnyParser"]
+__all__ = [
+    "AdaptiveLimiter",
+    "AnyParser",
+    "ByteBudget",
+    "CallbackReceiver",
+    "CancellationToken",
+    "CircuitBreakerRegistry",
+    "ExtractionSchema",
+    "FairScheduler",
+    "FileHandle",
+    "HedgePolicy",
+    "HybridRouter",
+    "ImagePreprocessOptions",
+    "LocalExtractionOptions",
+    "ModelRouter",
+    "ModelRoutingOptions",
+    "ParseJob",
+    "Priority",
+    "ProcessResult",
+    "as_completed",
+    "deadline",
+    "schedule_as",
+]
 
 __version__ = "0.0.25"
@@ -1,20 +1,72 @@
 """AnyParser: Real-time parser for any data format."""
 
 import base64
+import functools
+import hashlib
+import io
+import logging
+import threading
 import time
 import uuid
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
 from io import StringIO
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
+import requests
+from pydantic import BaseModel
+
+from any_parser.archive import input_exists, input_size, iter_members, open_input
 from any_parser.async_parser import AsyncParser
 from any_parser.batch_parser import BatchParser
+from any_parser.callbacks import CallbackReceiver
+from any_parser.circuit_breaker import CIRCUIT_OPEN_ERROR, CircuitBreakerRegistry
+from any_parser.concurrency import AdaptiveLimiter
 from any_parser.constants import (
     PUBLIC_BATCH_BASE_URL,
     PUBLIC_SHARED_BASE_URL,
+    TIMEOUT,
     ProcessType,
 )
+from any_parser.deadline import (
+    CancellationToken,
+    Cancelled,
+    DeadlineExceeded,
+    check_deadline,
+    deadline,
+    new_deadline,
+    run_in_context,
+    sleep,
+)
+from any_parser.dedup import ContentHashIndex, file_sha256, stream_sha256
+from any_parser.downloads import ResultDownloader
+from any_parser.extraction_schema import ExtractionSchema
+from any_parser.file_handle import (
+    NO_UPLOAD_URL,
+    FileHandle,
+    FileHandleRegistry,
+    FileUploader,
+)
+from any_parser.hedging import HedgePolicy
+from any_parser.image_preprocessing import ImagePreprocessOptions, ImagePreprocessor
+from any_parser.incremental import (
+    PAGE_STORE_ENTRIES,
+    PdfPages,
+    merge_page_results,
+    store_key,
+)
+from any_parser.jobs import JobPoller, ParseJob
+from any_parser.local_extraction import LocalExtractionOptions, LocalExtractor
+from any_parser.model_router import ModelRouter
+from any_parser.preflight import inspect_file, preflight, preflight_content
+from any_parser.router import HybridRouter
+from any_parser.scheduler import FairScheduler, release_slot, schedule_as, scheduled
+from any_parser.singleflight import SingleFlight, freeze
 from any_parser.sync_parser import (
+    BaseSyncParser,
     ExtractKeyValueSyncParser,
     ExtractPIISyncParser,
     ExtractTablesSyncParser,
@@ -22,23 +74,156 @@ from any_parser.sync_parser import (
     ParseSyncParser,
     ParseTextractSyncParser,
 )
-from any_parser.utils import validate_file_inputs
+from any_parser.utils import (
+    SUPPORTED_FILE_EXTENSIONS,
+    ValidationError,
+    base64_content,
+    is_binary_input,
+    read_binary,
+    validate_file_inputs,
+)
+
+PARSE_TYPES = (ProcessType.PARSE, ProcessType.PARSE_PRO, ProcessType.PARSE_TEXTRACT)
+# Parse models whose plain results local DOCX/PPTX extraction stands in for
+LOCAL_PARSE_TYPES = (ProcessType.PARSE, ProcessType.PARSE_PRO)
+
+logger = logging.getLogger(__name__)
+
+# Sync responses that mean the document is too slow for the sync endpoint
+SYNC_TIMEOUT_ERRORS = ("Error: sync request timed out", "Error: 408", "Error: 504")
+
+
+def _is_error(result, prefixes) -> bool:
+    return isinstance(result, str) and result.startswith(prefixes)
+
 
+Operation = Union[str, ProcessType, Tuple[Union[str, ProcessType], Dict[str, Any]]]
 
-def handle_file_processing(func):
+
+class ProcessResult(BaseModel):
+    """
+    Combined result of several operations on one document.
+    """
+
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    timings: Dict[str, str] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __getitem__(self, operation: str) -> Any:
+        return self.results[operation]
+
+
+def _load_file_input(
+    file_path=None,
+    file_content=None,
+    file_type=None,
+    max_file_size_mb=None,
+    image_preprocessor: Optional[ImagePreprocessor] = None,
+):
+    """Validate file inputs and return base64 content.
+
+    The content can be a file path, base64 content (str) or the raw file
+    as bytes, bytearray, memoryview or a binary stream; raw data may also
+    be passed in place of the path. It is base64-encoded once, into bytes.
+    Images are downscaled and recompressed first if an image_preprocessor
+    is given. A FileHandle passed as file_path or file_content is returned
+    as the content, so requests refer to the uploaded file.
+
+    Returns:
+        tuple: (file_path, file_content, file_type, error_message). The error
+        message is "" on success.
+    """
+    handle = next(
+        (item for item in (file_path, file_content) if isinstance(item, FileHandle)),
+        None,
+    )
+    if handle is not None:
+        if handle.expired:
+            return (
+                handle.file_name,
+                handle,
+                handle.file_type,
+                f"Error: file handle {handle.file_id} has expired, upload the file again",
+            )
+        return handle.file_name, handle, handle.file_type, ""
+
+    if file_content is None and is_binary_input(file_path):
+        file_path, file_content = None, file_path
+
+    try:
+        data = None
+        if is_binary_input(file_content):
+            # Streams are read once; bytes-like content is used in place
+            data = file_content = read_binary(file_content)
+    except Exception as e:
+        return file_path, file_content, file_type, f"Error: {e}"
+
+    is_valid, error_message = validate_file_inputs(
+        file_path=file_path,
+        file_content=file_content,
+        file_type=file_type,
+        max_file_size_mb=max_file_size_mb,
+    )
+
+    if not is_valid:
+        return file_path, file_content, file_type, error_message
+
+    try:
+        if data is None and file_path:
+            with open_input(file_path) as file:
+                data = file.read()
+            file_type = Path(file_path).suffix.lower().lstrip(".")
+        else:
+            # generate a random file path for genrating presigned url
+            file_path = f"/tmp/{uuid.uuid4()}.{file_type}"
+            if isinstance(file_content, str):
+                file_content = base64_content(file_content)
+
+        if image_preprocessor is not None and image_preprocessor.applies_to(file_type):
+            if data is None:
+                data = base64.b64decode(file_content)
+            data = image_preprocessor.process(data, file_type)
+
+        # Encode the file content in base64 if it was read, passed as bytes
+        # or preprocessed; request bodies are built from the bytes as is
+        if data is not None:
+            file_content = base64.b64encode(data)
+    except Exception as e:
+        return file_path, file_content, file_type, f"Error: {e}"
+
+    return file_path, file_content, file_type, ""
+
+
+def handle_file_processing(func=None, *, schedule: bool = True):
     """
     Decorator to handle file input validation and processing.
 
-    Supports both file path and base64 file content inputs. When a file path
-    is provided, reads and base64-encodes the file content automatically.
+    Supports file path, base64 file content and raw bytes/stream inputs. When
+    a file path or raw data is provided, reads and base64-encodes the file
+    content automatically.
 
     Args:
         func: The decorated function that performs parsing or extraction.
+        schedule: Whether the call takes a scheduler slot (and is coalesced).
+            Methods fanning out to several scheduled calls set it to False,
+            so they do not hold a slot while waiting for their calls.
 
     Decorated function parameters:
         file_path (str, optional): Path to the file to process.
-        file_content (str, optional): Base64-encoded file content.
+        file_content (str, bytes, memoryview or binary stream, optional):
+            Base64-encoded file content (str) or the raw file. Raw data can
+            also be passed in place of file_path.
         file_type (str, optional): File extension (e.g., 'pdf'). Auto-detected from file_path.
+        timeout (float, optional): Deadline in seconds for the whole call,
+            including retries, uploads, polling and downloads.
+        cancel_token (CancellationToken, optional): Stops the call when cancelled.
+        tenant (str, optional): Tenant the call is scheduled as, if the client
+            has a scheduler. Defaults to the ``schedule_as`` tag.
+        priority (Priority, optional): Priority class of the call.
 
     Returns:
         tuple: (result, timing_info) on success, (error_message, "") on failure.
@@ -46,48 +231,160 @@ def handle_file_processing(func):
     Note:
         Either file_path or file_content must be provided, but not both.
     """
+    if func is None:
+        return functools.partial(handle_file_processing, schedule=schedule)
 
+    @functools.wraps(func)
     def wrapper(
         self,
         file_path=None,
         file_content=None,
         file_type=None,
         *args,
+        timeout=None,
+        cancel_token=None,
+        tenant=None,
+        priority=None,
         **kwargs,
     ):
         # pylint: disable=too-many-arguments
-        # Validate inputs
-        is_valid, error_message = validate_file_inputs(
-            file_path=file_path,
-            file_content=file_content,
-            file_type=file_type,
-        )
-
-        if not is_valid:
-            return error_message, ""
-
-        # Encode the file content in base64 if file_path is provided
-        if file_path:
+        with deadline(timeout, cancel_token) as active, schedule_as(tenant, priority):
             try:
-                with open(file_path, "rb") as file:
-                    file_content = base64.b64encode(file.read()).decode("utf-8")
-                    file_type = Path(file_path).suffix.lower().lstrip(".")
-            except Exception as e:
+                file_path, file_content, file_type, error_message = _load_file_input(
+                    file_path=file_path,
+                    file_content=file_content,
+                    file_type=file_type,
+                    max_file_size_mb=self._max_file_size_mb,
+                    image_preprocessor=self.image_preprocessor,
+                )
+
+                if error_message:
+                    return error_message, ""
+                if not schedule:
+                    return func(
+                        self,
+                        file_path=file_path,
+                        file_content=file_content,
+                        file_type=file_type,
+                        *args,
+                        **kwargs,
+                    )
+                return _call_loaded(
+                    self, func, file_path, file_content, file_type, args, kwargs
+                )
+            except (Cancelled, DeadlineExceeded) as e:
                 return f"Error: {e}", ""
-        else:
-            # generate a random file path for genrating presigned url
-            file_path = f"/tmp/{uuid.uuid4()}.{file_type}"
+            except requests.Timeout:
+                if active.expired:
+                    return "Error: Deadline exceeded", ""
+                raise
 
-        return func(
-            self,
-            file_path=file_path,
-            file_content=file_content,
-            file_type=file_type,
-            *args,
-            **kwargs,
+    return wrapper
+
+
+def _call_loaded(parser, func, file_path, file_content, file_type, args, kwargs):
+    """Call an undecorated method on loaded input in a scheduler slot.
+
+    Identical calls are coalesced if the parser has a SingleFlight.
+    """
+
+    def call():
+        with scheduled(parser.scheduler):
+            return func(
+                parser,
+                file_path=file_path,
+                file_content=file_content,
+                file_type=file_type,
+                *args,
+                **kwargs,
+            )
+
+    if parser.singleflight is None:
+        return call()
+    key = (
+        func.__name__,
+        _content_key(file_content),
+        file_type,
+        freeze(args),
+        freeze(kwargs),
+    )
+    # Results with no timing info are errors
+    return parser.singleflight.do(key, call, failed=lambda result: not result[1])[0]
+
+
+def _is_rewindable(value) -> bool:
+    """Whether value is a seekable binary stream positioned at its start."""
+    try:
+        return (
+            hasattr(value, "read")
+            and not isinstance(value, (str, Path))
+            and value.seekable()
+            and value.tell() == 0
         )
+    except (AttributeError, OSError):
+        return False
 
-    return wrapper
+
+def _size_error(size: int, max_file_size_mb: Optional[float]) -> str:
+    if size == 0:
+        return ValidationError.FILE_EMPTY.value.format("file_content")
+    if max_file_size_mb and size > max_file_size_mb * 1024 * 1024:
+        return ValidationError.FILE_TOO_LARGE.value.format(
+            max_file_size_mb, "file_content"
+        )
+    return ""
+
+
+def _content_key(file_content) -> str:
+    """Identity of a document for coalescing identical calls."""
+    if isinstance(file_content, FileHandle):
+        return f"file_id:{file_content.file_id}"
+    if isinstance(file_content, str):
+        file_content = file_content.encode("utf-8")
+    return hashlib.sha256(file_content).hexdigest()
+
+
+def convert_tables(extracted_result, return_type="html"):
+    """Convert an extract_tables result to a single HTML or CSV string.
+
+    Module-level so it can also run in worker processes.
+    """
+    # Handle the new result format where tables are in a dict with 'markdown' key
+    if isinstance(extracted_result, dict) and "markdown" in extracted_result:
+        extracted_html = extracted_result["markdown"]
+    else:
+        extracted_html = extracted_result
+
+    # Convert list of HTML strings to a single HTML string
+    if isinstance(extracted_html, list):
+        extracted_html = AnyParser.flatten_to_string(extracted_html)
+
+    if return_type.lower() == "csv":
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("Please install pandas to use CSV return_type")
+
+        # Ensure we have a string for pandas
+        if isinstance(extracted_html, list):
+            extracted_html = "".join(str(item) for item in extracted_html)
+
+        # Wrap the HTML tables in a proper HTML structure for pandas
+        html_content = f"<html><body>{extracted_html}</body></html>"
+
+        try:
+            df_list = pd.read_html(StringIO(html_content))
+            combined_df = pd.concat(df_list, ignore_index=True)
+            csv_output = combined_df.to_csv(index=False)
+            return csv_output
+        except ValueError as e:
+            if "No tables found" in str(e):
+                # Return the raw HTML if pandas can't parse it
+                return extracted_html
+            else:
+                raise e
+
+    return extracted_html
 
 
 class AnyParser:
@@ -102,6 +399,25 @@ class AnyParser:
         api_key: str,
         base_url: str = PUBLIC_SHARED_BASE_URL,
         batch_url: str = PUBLIC_BATCH_BASE_URL,
+        poll_interval: float = 3,
+        job_workers: int = 4,
+        router: Optional[HybridRouter] = None,
+        max_file_size_mb: Optional[float] = None,
+        image_preprocess: Optional[ImagePreprocessOptions] = None,
+        file_handles: Optional[FileHandleRegistry] = None,
+        upload_url: Optional[str] = None,
+        job_limiter: Optional[AdaptiveLimiter] = None,
+        scheduler: Optional[FairScheduler] = None,
+        breakers: Optional[CircuitBreakerRegistry] = None,
+        fallbacks: Optional[Dict[ProcessType, ProcessType]] = None,
+        async_fallback: bool = False,
+        hedging: Optional[HedgePolicy] = None,
+        coalesce: bool = False,
+        page_store: Optional[ContentHashIndex] = None,
+        local_extraction: Optional[LocalExtractionOptions] = None,
+        model_router: Optional[ModelRouter] = None,
+        callbacks: Optional[CallbackReceiver] = None,
+        downloader: Optional[ResultDownloader] = None,
     ) -> None:
         """Initialize AnyParser with API credentials.
 
@@ -109,6 +425,50 @@ class AnyParser:
             api_key: Authentication key for API access
             base_url: API endpoint URL, defaults to public endpoint
             batch_url: Batch API endpoint URL, defaults to public batch endpoint
+            poll_interval: Seconds between status checks of submitted jobs
+            job_workers: Threads shared by job submission and polling
+            router: Sync/async routing model used by auto_parse; pass one
+                instance to several clients to share what it learns
+            max_file_size_mb: Reject larger files before reading them
+            image_preprocess: Downscale and recompress jpg/png/gif inputs
+                before upload (requires Pillow); savings are reported in
+                ``image_preprocessor.stats``
+            file_handles: Registry of uploaded files used by ``upload``;
+                pass one instance to several clients to share uploads
+            upload_url: Presigned upload endpoint of a deployment that
+                accepts uploaded files by ``file_id`` (see FileUploader for
+                the assumed contract); ``upload`` needs it
+            job_limiter: Adapt the number of concurrent job status checks
+                to the server's latency and overload responses
+            scheduler: Priority and per-tenant fair scheduling of sync,
+                async-job and batch requests; share one instance between
+                clients to schedule them together
+            breakers: Per-endpoint circuit breakers; while an endpoint is
+                degraded its calls fail fast with "Error: Circuit open ..."
+            fallbacks: Parse model to use while another one's circuit is
+                open, e.g. ``{ProcessType.PARSE_PRO: ProcessType.PARSE}``
+                (requires ``breakers``)
+            async_fallback: Run sync parses as async jobs while the sync
+                endpoint's circuit is open (requires ``breakers``)
+            hedging: Send a duplicate of sync requests that are slower than
+                usual and use whichever answers first; see ``HedgePolicy``
+                for the threshold and budget
+            coalesce: Let concurrent calls with the same method, document
+                and arguments share one request and its result
+            page_store: Page results kept by ``parse_incremental``; give it
+                a path to reuse them across runs. Defaults to the last
+                ``PAGE_STORE_ENTRIES`` page results, in memory.
+            local_extraction: Convert simple DOCX/PPTX files to markdown
+                locally instead of calling the parse endpoints; files with
+                images, charts or complex layout still go to the API.
+                Counts are reported in ``local_extractor.stats``
+            model_router: Chooses the parse model in ``parse_routed`` from
+                the PDF's text layer; its ``decisions()`` report the choices
+            callbacks: Listener for job-completion notifications; jobs from
+                the submit_* methods are then resolved by callback and only
+                polled every ``callbacks.poll_interval`` seconds
+            downloader: Pool downloading the results of completed jobs,
+                with its connection pool and size limits
         """
         self._async_parser = AsyncParser(api_key, base_url)
         self._sync_parse = ParseSyncParser(api_key, base_url)
@@ -117,7 +477,185 @@ class AnyParser:
         self._sync_extract_key_value = ExtractKeyValueSyncParser(api_key, base_url)
         self._sync_extract_pii = ExtractPIISyncParser(api_key, base_url)
         self._sync_extract_tables = ExtractTablesSyncParser(api_key, base_url)
-        self.batches = BatchParser(api_key, batch_url)
+        self.scheduler = scheduler
+        self.batches = BatchParser(api_key, batch_url, scheduler=scheduler)
+        self._sync_parsers = {
+            ProcessType.PARSE: self._sync_parse,
+            ProcessType.PARSE_PRO: self._sync_parse_pro,
+            ProcessType.PARSE_TEXTRACT: self._sync_parse_textract,
+            ProcessType.EXTRACT_PII: self._sync_extract_pii,
+            ProcessType.EXTRACT_TABLES: self._sync_extract_tables,
+            ProcessType.EXTRACT_KEY_VALUE: self._sync_extract_key_value,
+        }
+        if (fallbacks or async_fallback) and breakers is None:
+            raise ValueError("fallbacks and async_fallback require breakers")
+        if any(
+            t not in PARSE_TYPES for pair in (fallbacks or {}).items() for t in pair
+        ):
+            raise ValueError("fallbacks can only map parse models to parse models")
+        self.breakers = breakers
+        self.fallbacks = dict(fallbacks or {})
+        self.async_fallback = async_fallback
+        for parser in [self._async_parser, *self._sync_parsers.values()]:
+            parser.breakers = breakers
+        self.hedging = hedging
+        self.singleflight = SingleFlight() if coalesce else None
+        self.page_store = (
+            page_store
+            if page_store is not None
+            else ContentHashIndex(max_entries=PAGE_STORE_ENTRIES)
+        )
+        for sync_parser in self._sync_parsers.values():
+            sync_parser.hedging = hedging
+        self._poll_interval = poll_interval
+        self._job_workers = job_workers
+        self._job_limiter = job_limiter
+        self.callbacks = callbacks
+        self.downloader = downloader or ResultDownloader()
+        self._job_poller: Optional[JobPoller] = None
+        self._job_poller_lock = threading.Lock()
+        self.router = router or HybridRouter()
+        self.model_router = model_router or ModelRouter()
+        self._max_file_size_mb = max_file_size_mb
+        self.image_preprocessor = (
+            ImagePreprocessor(image_preprocess) if image_preprocess else None
+        )
+        self.local_extractor = (
+            LocalExtractor(local_extraction) if local_extraction else None
+        )
+        self._uploader = FileUploader(api_key, base_url, upload_url)
+        self.file_handles = (
+            file_handles if file_handles is not None else FileHandleRegistry()
+        )
+
+    def sync_parser(self, process_type: ProcessType) -> BaseSyncParser:
+        """The real-time parser behind a process type."""
+        return self._sync_parsers[process_type]
+
+    def upload(self, file_path=None, file_content=None, file_type=None) -> FileHandle:
+        """Upload a file once and return a handle to pass to any method.
+
+        The file is streamed from disk, or from a seekable binary stream
+        positioned at its start. If the same content was uploaded before
+        and its handle has not expired, that handle is returned without
+        uploading again.
+
+        Args:
+            file_path: Path to input file
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
+            file_type: File format extension
+
+        Returns:
+            FileHandle: Use it in place of file_path or file_content.
+
+        Raises:
+            ValueError: If the file inputs are invalid or no upload_url is set.
+            Exception: If the upload fails.
+        """
+        if self._uploader.upload_url is None:
+            raise ValueError(NO_UPLOAD_URL)
+        if file_content is None and is_binary_input(file_path):
+            file_path, file_content = None, file_path
+        preprocess = self.image_preprocessor is not None and (
+            self.image_preprocessor.applies_to(
+                Path(file_path).suffix.lower().lstrip(".") if file_path else file_type
+            )
+        )
+        stream = None
+        if _is_rewindable(file_content) and not preprocess:
+            stream = file_content
+        elif is_binary_input(file_content):
+            file_content = read_binary(file_content)
+
+        is_valid, error_message = validate_file_inputs(
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            max_file_size_mb=self._max_file_size_mb,
+        )
+        if not is_valid:
+            raise ValueError(error_message)
+
+        data = None
+        if file_path:
+            file_type = Path(file_path).suffix.lower().lstrip(".")
+            file_name = Path(file_path).name
+            if preprocess:
+                with open_input(file_path) as file:
+                    data = self.image_preprocessor.process(file.read(), file_type)
+        else:
+            file_name = f"{uuid.uuid4()}.{file_type}"
+            if stream is None:
+                data = file_content
+                if isinstance(data, str):
+                    data = base64.b64decode(data)
+                if preprocess:
+                    data = self.image_preprocessor.process(data, file_type)
+
+        if data is not None:
+            sha256 = hashlib.sha256(data).hexdigest()
+            size_bytes = len(data)
+            info = inspect_file(io.BytesIO(data), file_type, size_bytes)
+        elif stream is not None:
+            # Hash and inspect the stream in place, then rewind it for upload
+            sha256 = stream_sha256(stream)
+            size_bytes = stream.tell()
+            error_message = _size_error(size_bytes, self._max_file_size_mb)
+            if error_message:
+                raise ValueError(error_message)
+            stream.seek(0)
+            info = inspect_file(stream, file_type, size_bytes)
+            stream.seek(0)
+        else:
+            sha256 = file_sha256(file_path)
+            size_bytes = input_size(file_path)
+            info = preflight(file_path)
+
+        handle = self.file_handles.get(sha256, file_type)
+        if handle is not None:
+            return handle
+
+        if data is not None:
+            file = io.BytesIO(data)
+        elif stream is not None:
+            # The caller's stream stays open
+            file = nullcontext(stream)
+        else:
+            file = open_input(file_path)
+        with file as source:
+            handle = self._uploader.upload(
+                source,
+                file_name=file_name,
+                file_type=file_type,
+                size_bytes=size_bytes,
+                sha256=sha256,
+                page_count=info.page_count,
+            )
+        self.file_handles.put(handle)
+        return handle
+
+    def _upload_loaded(self, file_path, file_content, file_type) -> FileHandle:
+        """Upload base64 content loaded by handle_file_processing.
+
+        The content is already preprocessed, so unlike ``upload`` it is sent
+        as is. The handle of an earlier upload of the same content is reused.
+        """
+        data = base64.b64decode(file_content)
+        sha256 = hashlib.sha256(data).hexdigest()
+        handle = self.file_handles.get(sha256, file_type)
+        if handle is not None:
+            return handle
+        info = inspect_file(io.BytesIO(data), file_type, len(data))
+        handle = self._uploader.upload(
+            io.BytesIO(data),
+            file_name=Path(file_path).name,
+            file_type=file_type,
+            size_bytes=len(data),
+            sha256=sha256,
+            page_count=info.page_count,
+        )
+        self.file_handles.put(handle)
+        return handle
 
     @handle_file_processing
     def parse(
@@ -126,23 +664,28 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_args=None,
+        force_remote=False,
     ):
         """Extract full content from a file synchronously.
 
         Args:
             file_path: Path to input file
-            file_content: Base64 encoded file content
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
             file_type: File format extension
             extract_args: Additional extraction parameters
+            force_remote: Send DOCX/PPTX files to the API even if
+                ``local_extraction`` is enabled
 
         Returns:
             tuple: (result, timing_info) or (error_message, "")
         """
-        return self._sync_parse.parse(
+        return self._sync_or_fallback(
+            ProcessType.PARSE,
             file_path=file_path,
             file_content=file_content,
             file_type=file_type,
             extract_args=extract_args,
+            force_remote=force_remote,
         )
 
     @handle_file_processing
@@ -152,23 +695,28 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_args=None,
+        force_remote=False,
     ):
         """Extract full content from a file synchronously using pro model with multi-language support.
 
         Args:
             file_path: Path to input file
-            file_content: Base64 encoded file content
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
             file_type: File format extension
             extract_args: Additional extraction parameters
+            force_remote: Send DOCX/PPTX files to the API even if
+                ``local_extraction`` is enabled
 
         Returns:
             tuple: (result, timing_info) or (error_message, "")
         """
-        return self._sync_parse_pro.parse(
+        return self._sync_or_fallback(
+            ProcessType.PARSE_PRO,
             file_path=file_path,
             file_content=file_content,
             file_type=file_type,
             extract_args=extract_args,
+            force_remote=force_remote,
         )
 
     @handle_file_processing
@@ -178,26 +726,617 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_tables=False,
+        force_remote=False,
     ):
         """Extract content from a file synchronously using AWS Textract.
 
         Args:
             file_path: Path to input file
-            file_content: Base64 encoded file content
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
             file_type: File format extension
             extract_tables: Whether to extract tables
+            force_remote: Kept for symmetry with ``parse``; Textract calls
+                are never answered by ``local_extraction``
 
         Returns:
             tuple: (result, timing_info) or (error_message, "")
         """
         extract_args = {"extract_tables": extract_tables} if extract_tables else None
-        return self._sync_parse_textract.parse(
+        return self._sync_or_fallback(
+            ProcessType.PARSE_TEXTRACT,
             file_path=file_path,
             file_content=file_content,
             file_type=file_type,
             extract_args=extract_args,
+            force_remote=force_remote,
         )
 
+    @handle_file_processing
+    def parse_routed(
+        self,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        extract_args=None,
+        process_type: Optional[ProcessType] = None,
+    ):
+        """Parse a file with the cheapest parse model suited to it.
+
+        Sampled pages of a PDF are checked for a text layer, its script and
+        image coverage (requires pypdf): born-digital PDFs go to ``parse``,
+        scanned ones to ``parse_textract`` and non-Latin scripts to
+        ``parse_pro``; see ``ModelRoutingOptions``. Decisions are reported by
+        ``self.model_router.decisions()``.
+
+        Args:
+            file_path: Path to input file
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
+            file_type: File format extension
+            extract_args: Additional extraction parameters
+            process_type: Use this parse model instead of routing
+
+        Returns:
+            tuple: (result, timing_info) or (error_message, "")
+        """
+        if process_type is not None and process_type not in PARSE_TYPES:
+            return f"Error: parse_routed does not support {process_type.value}", ""
+        local = not isinstance(file_content, FileHandle) and file_type == "pdf"
+        decision = self.model_router.route(
+            base64.b64decode(file_content) if local else None,
+            file_type,
+            file_path=file_path or "",
+            override=process_type,
+        )
+        return self._sync_or_fallback(
+            decision.process_type,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            extract_args=extract_args,
+        )
+
+    @handle_file_processing(schedule=False)
+    def process(
+        self,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        operations: Optional[List[Operation]] = None,
+    ):
+        """Run several real-time operations on one document concurrently.
+
+        The file is read, preprocessed and base64-encoded once, into bytes,
+        and the operations share that encoding instead of each loading the
+        file. If the client has an ``upload_url``, the file is uploaded once
+        instead (or its earlier FileHandle reused) and every operation refers
+        to it by file id. Each operation is a call of its own: it takes its
+        own scheduler slot and is coalesced with identical calls.
+
+        Args:
+            file_path: Path to input file
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
+            file_type: File format extension
+            operations: Operations to run, by name ("parse", "parse_pro",
+                "parse_textract", "extract_pii", "extract_tables",
+                "extract_key_value") or ProcessType, optionally paired with
+                keyword arguments of that method, e.g.
+                ``("extract_key_value", {"extract_instruction": schema})``.
+                Defaults to parse, extract_tables and extract_pii.
+
+        Returns:
+            tuple: (ProcessResult, timing_info) or (error_message, "")
+        """
+        if operations is None:
+            operations = ["parse", "extract_tables", "extract_pii"]
+        calls = {}
+        for operation in operations:
+            name, kwargs = (
+                operation if isinstance(operation, tuple) else (operation, {})
+            )
+            name = ProcessType(name).value
+            if name in calls:
+                raise ValueError(f"Duplicate operation: {name}")
+            # The undecorated methods skip loading the file again
+            calls[name] = (getattr(AnyParser, name).__wrapped__, kwargs)
+
+        start_time = time.time()
+        if (
+            len(calls) > 1
+            and self._uploader.upload_url is not None
+            and not isinstance(file_content, FileHandle)
+        ):
+            try:
+                file_content = self._upload_loaded(file_path, file_content, file_type)
+            except (Cancelled, DeadlineExceeded):
+                raise
+            except Exception as e:
+                logger.warning(f"Upload failed, sending the file inline: {e}")
+        with ThreadPoolExecutor(max_workers=len(calls) or 1) as executor:
+            futures = {
+                name: run_in_context(
+                    executor,
+                    _call_loaded,
+                    self,
+                    method,
+                    file_path,
+                    file_content,
+                    file_type,
+                    (),
+                    kwargs,
+                )
+                for name, (method, kwargs) in calls.items()
+            }
+        process_result = ProcessResult()
+        for name, future in futures.items():
+            try:
+                result, timing_info = future.result()
+            except Exception as e:
+                result, timing_info = f"Error: {e}", ""
+            if timing_info:
+                process_result.results[name] = result
+                process_result.timings[name] = timing_info
+            else:
+                process_result.errors[name] = str(result)
+        elapsed = time.time() - start_time
+        return process_result, f"Time Elapsed: {elapsed:.2f} seconds"
+
+    @handle_file_processing
+    def parse_incremental(
+        self,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        extract_args=None,
+        process_type: ProcessType = ProcessType.PARSE,
+        max_workers: int = 4,
+    ):
+        """Parse a PDF, sending only the pages that were not parsed before.
+
+        Every page is looked up in ``self.page_store`` by a digest of its
+        content; new and changed pages are parsed one page per request and
+        stored, and the full result is put together in page order. A
+        revision that changes a few pages of a long document only costs
+        those pages. As pages are parsed separately, content that spans
+        pages (e.g. a table across a page break) is split at the break.
+        Requires pypdf; other file types are parsed whole.
+
+        Args:
+            file_path: Path to input file
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
+            file_type: File format extension
+            extract_args: Additional extraction parameters
+            process_type: Parse model, defaults to ProcessType.PARSE
+            max_workers: Pages parsed concurrently
+
+        Returns:
+            tuple: (result, timing_info) or (error_message, "")
+        """
+        if process_type not in PARSE_TYPES:
+            return f"Error: parse_incremental does not support {process_type.value}", ""
+        if file_type != "pdf" or isinstance(file_content, FileHandle):
+            return self._sync_or_fallback(
+                process_type,
+                file_path=file_path,
+                file_content=file_content,
+                file_type=file_type,
+                extract_args=extract_args,
+            )
+
+        start_time = time.time()
+        try:
+            pages = PdfPages(base64.b64decode(file_content))
+        except ImportError:
+            raise
+        except Exception as e:
+            # e.g. encrypted or damaged PDFs the server may still read
+            logger.warning(
+                f"Cannot split {file_path} into pages, parsing it whole: {e}"
+            )
+            return self._sync_or_fallback(
+                process_type,
+                file_path=file_path,
+                file_content=file_content,
+                file_type=file_type,
+                extract_args=extract_args,
+            )
+        keys = [
+            store_key(process_type.value, extract_args, digest)
+            for digest in pages.digests
+        ]
+        # Identical pages are sent once; pages are split off one at a time
+        # here as the reader is not thread-safe
+        results = {}
+        missing = {}
+        for index, key in enumerate(keys):
+            if key in results or key in missing:
+                continue
+            stored = self.page_store.get(key)
+            if stored is None:
+                missing[key] = index
+            else:
+                results[key] = stored
+        parser = self._sync_parsers[process_type]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                key: run_in_context(
+                    executor,
+                    parser.parse,
+                    file_content=base64.b64encode(pages.page_pdf(index)),
+                    file_type="pdf",
+                    extract_args=extract_args,
+                )
+                for key, index in missing.items()
+            }
+        errors = []
+        for key, future in futures.items():
+            try:
+                result, timing_info = future.result()
+            except Exception as e:
+                result, timing_info = f"Error: {e}", ""
+            if timing_info:
+                results[key] = result
+                self.page_store.put(key, result)
+            else:
+                errors.append(result)
+        self.page_store.save()
+        if errors:
+            return f"{errors[0]} ({len(errors)} of {len(pages)} pages failed)", ""
+
+        # Taken from this call's results, as the store may evict pages
+        result = merge_page_results([results[key] for key in keys])
+        elapsed = time.time() - start_time
+        logger.info(
+            f"Parsed {len(missing)} of {len(pages)} pages, "
+            f"{len(pages) - len(missing)} from the page store"
+        )
+        return result, (
+            f"Time Elapsed: {elapsed:.2f} seconds "
+            f"({len(missing)} of {len(pages)} pages parsed)"
+        )
+
+    def iter_parse(
+        self,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        extract_args=None,
+        process_type: ProcessType = ProcessType.PARSE,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> Iterator[str]:
+        """Stream the parsed markdown as text chunks while it downloads.
+
+        The response body is decoded incrementally, so memory use does not
+        grow with the size of the result and the first chunk is available
+        before the whole response has arrived. Page results are separated
+        by newlines.
+
+        Args:
+            file_path: Path to input file
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
+            file_type: File format extension
+            extract_args: Additional extraction parameters
+            process_type: Sync endpoint to use, defaults to ProcessType.PARSE
+            timeout: Deadline in seconds for the request and the download
+            cancel_token: Stops the download when cancelled
+
+        Yields:
+            str: Decoded chunks of the result.
+
+        Raises:
+            ValueError: If the file inputs are invalid.
+            DeadlineExceeded, Cancelled: If the call runs out of time or
+                is cancelled.
+            Exception: If the request fails.
+        """
+        call_deadline = new_deadline(timeout, cancel_token)
+        try:
+            file_path, file_content, file_type, error_message = _load_file_input(
+                file_path=file_path,
+                file_content=file_content,
+                file_type=file_type,
+                max_file_size_mb=self._max_file_size_mb,
+                image_preprocessor=self.image_preprocessor,
+            )
+            if error_message:
+                raise ValueError(error_message)
+
+            yield from self._sync_parsers[process_type].iter_result(
+                file_content=file_content,
+                file_type=file_type,
+                extract_args=extract_args,
+                deadline=call_deadline,
+            )
+        finally:
+            call_deadline.close()
+
+    def iter_archive(
+        self,
+        archive_path: str,
+        operation: Union[str, ProcessType] = ProcessType.PARSE,
+        extensions: Iterable[str] = SUPPORTED_FILE_EXTENSIONS,
+        **kwargs,
+    ) -> Iterator[Tuple[str, Any, str]]:
+        """Run a real-time operation on every document in a zip or tar archive.
+
+        Members are read from the archive one at a time, in archive order,
+        and only the current one is held in memory; nothing is extracted to
+        disk. This works for compressed tar files too, which cannot be read
+        by member key efficiently.
+
+        Args:
+            archive_path: Path to the zip or tar archive
+            operation: Method to run, by name ("parse", "extract_tables",
+                ...) or ProcessType
+            extensions: File types to process; other members are skipped
+            **kwargs: Passed to the method, e.g. extract_args or timeout
+
+        Yields:
+            tuple: (member_key, result, timing_info), where member_key is
+            ``<archive_path>!/<member path>`` and result and timing_info
+            are what the method returned for the member.
+        """
+        method = getattr(self, ProcessType(operation).value)
+        max_bytes = (
+            self._max_file_size_mb * 1024 * 1024 if self._max_file_size_mb else None
+        )
+        for member in iter_members(archive_path, extensions):
+            if member.size == 0:
+                error = ValidationError.FILE_EMPTY.value.format(member.key)
+            elif max_bytes and member.size > max_bytes:
+                error = ValidationError.FILE_TOO_LARGE.value.format(
+                    self._max_file_size_mb, member.key
+                )
+            else:
+                yield (
+                    member.key,
+                    *method(
+                        file_content=member.read(),
+                        file_type=member.file_type,
+                        **kwargs,
+                    ),
+                )
+                continue
+            yield member.key, error, ""
+
+    @handle_file_processing
+    def parse_to_file(
+        self,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        output_path=None,
+        extract_args=None,
+        process_type: ProcessType = ProcessType.PARSE,
+    ):
+        """Parse a file and stream the markdown straight into output_path.
+
+        Args:
+            file_path: Path to input file
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
+            file_type: File format extension
+            output_path: Path of the UTF-8 file to write the result to
+            extract_args: Additional extraction parameters
+            process_type: Sync endpoint to use, defaults to ProcessType.PARSE
+
+        Returns:
+            tuple: (output_path, timing_info) or (error_message, "")
+        """
+        if not output_path:
+            return "Error: output_path must be provided", ""
+
+        start_time = time.time()
+        try:
+            with open(output_path, "w", encoding="utf-8") as file:
+                for chunk in self._sync_parsers[process_type].iter_result(
+                    file_content=file_content,
+                    file_type=file_type,
+                    extract_args=extract_args,
+                ):
+                    file.write(chunk)
+        except Exception as e:
+            return f"Error: {e}", ""
+
+        return output_path, f"Time Elapsed: {time.time() - start_time:.2f} seconds"
+
+    @handle_file_processing
+    def auto_parse(
+        self,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        extract_args=None,
+        process_type: ProcessType = ProcessType.PARSE,
+        page_count: Optional[int] = None,
+        async_timeout: float = TIMEOUT,
+        force_remote: bool = False,
+    ):
+        """Parse a file on the sync or async-job endpoint, whichever is faster.
+
+        The choice is made per document by ``self.router`` from the file
+        size, the page count and the latencies of past calls. A sync call
+        that times out is retried as an async job. The return shape is the
+        same as ``parse`` either way.
+
+        Args:
+            file_path: Path to input file
+            file_content: Base64 encoded file content, or raw bytes or a binary stream
+            file_type: File format extension
+            extract_args: Additional extraction parameters
+            process_type: PARSE, PARSE_PRO or PARSE_TEXTRACT
+            page_count: Number of pages; read from the file if not given
+            async_timeout: Maximum seconds to wait for an async job
+            force_remote: Send DOCX/PPTX files to the API even if
+                ``local_extraction`` is enabled
+
+        Returns:
+            tuple: (result, timing_info) or (error_message, "")
+        """
+        if process_type not in PARSE_TYPES:
+            return f"Error: auto_parse does not support {process_type.value}", ""
+        if not force_remote:
+            local = self._local_parse(
+                process_type, file_content, file_type, extract_args
+            )
+            if local is not None:
+                return local
+
+        if isinstance(file_content, FileHandle):
+            file_size = file_content.size_bytes
+            if page_count is None:
+                page_count = file_content.page_count
+        else:
+            file_size = len(file_content) * 3 // 4
+            if page_count is None:
+                if input_exists(file_path):
+                    page_count = preflight(file_path).page_count
+                else:
+                    page_count = preflight_content(file_content, file_type).page_count
+        decision = self.router.choose(file_size, page_count)
+
+        if decision.mode == "sync":
+            start_time = time.time()
+            try:
+                result, info = self._sync_parsers[process_type].parse(
+                    file_path=file_path,
+                    file_content=file_content,
+                    file_type=file_type,
+                    extract_args=extract_args,
+                )
+            except requests.Timeout:
+                # Out of time for the whole call, not just the sync endpoint
+                check_deadline()
+                result, info = "Error: sync request timed out", ""
+            elapsed = time.time() - start_time
+            if _is_error(result, CIRCUIT_OPEN_ERROR):
+                # The sync endpoint is degraded, not slow for this document
+                pass
+            elif not _is_error(result, SYNC_TIMEOUT_ERRORS):
+                self.router.record("sync", decision.pages, elapsed)
+                return result, info
+            else:
+                # Too large for the sync endpoint: penalise and retry as a job
+                self.router.record(
+                    "sync", decision.pages, max(elapsed, self.router.sync_timeout)
+                )
+
+        start_time = time.time()
+        result, info = self._run_job(
+            process_type,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            extract_args=extract_args,
+            timeout=async_timeout,
+        )
+        if info:
+            self.router.record("async", decision.pages, time.time() - start_time)
+        return result, info
+
+    def _run_job(
+        self,
+        process_type: ProcessType,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        extract_args=None,
+        timeout: float = TIMEOUT,
+    ):
+        """Run an async job and wait for it, returning (result, timing_info).
+
+        The scheduler slot of the calling method is given back once the job
+        is submitted, so waiting for it does not keep other calls queued.
+        """
+        start_time = time.time()
+        try:
+            job_id = self._async_parser.send_async_request(
+                process_type=process_type,
+                file_path=file_path,
+                file_content=file_content,
+                file_type=file_type,
+                extract_args=extract_args,
+            )
+            job = self.job_poller.track(job_id, process_type, file_path)
+            release_slot()
+            result = job.result(timeout=timeout)
+        except FutureTimeoutError:
+            return f"Timeout: Job did not complete within {timeout} seconds", ""
+        except Exception as e:
+            return f"Error: {e}", ""
+        return result, f"Time Elapsed: {time.time() - start_time:.2f} seconds"
+
+    def _local_parse(
+        self, process_type: ProcessType, file_content, file_type, extract_args=None
+    ) -> Optional[Tuple[List[str], str]]:
+        """(markdown, timing_info) if the file can be converted locally.
+
+        Only plain parse and parse_pro calls are; extraction arguments such
+        as Textract's ``extract_tables`` ask for what only the API returns.
+        """
+        if (
+            self.local_extractor is None
+            or process_type not in LOCAL_PARSE_TYPES
+            or extract_args
+            or not self.local_extractor.applies_to(file_type)
+            or isinstance(file_content, FileHandle)
+        ):
+            return None
+        start_time = time.time()
+        markdown = self.local_extractor.extract(
+            base64.b64decode(file_content), file_type
+        )
+        if markdown is None:
+            return None
+        return markdown, f"Time Elapsed: {time.time() - start_time:.2f} seconds (local)"
+
+    def _sync_or_fallback(
+        self,
+        process_type: ProcessType,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        extract_args=None,
+        force_remote=False,
+    ):
+        """Sync parse that falls back while the endpoint's circuit is open.
+
+        Simple DOCX/PPTX files are converted locally first for plain parse
+        and parse_pro calls, unless ``force_remote`` is set. Tries the model
+        in ``self.fallbacks`` if its endpoint is healthy, then an async job
+        if ``self.async_fallback`` is set; otherwise the circuit-open error
+        is returned at once.
+        """
+        if not force_remote:
+            local = self._local_parse(
+                process_type, file_content, file_type, extract_args
+            )
+            if local is not None:
+                return local
+        kwargs = dict(
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            extract_args=extract_args,
+        )
+        result, info = self._sync_parsers[process_type].parse(**kwargs)
+        if not _is_error(result, CIRCUIT_OPEN_ERROR):
+            return result, info
+
+        fallback = self.fallbacks.get(process_type)
+        if fallback is not None and self.breakers.allows(
+            self._sync_parsers[fallback].url
+        ):
+            logger.warning(
+                f"{process_type.value} unavailable, falling back to {fallback.value}"
+            )
+            result, info = self._sync_parsers[fallback].parse(**kwargs)
+            if not _is_error(result, CIRCUIT_OPEN_ERROR):
+                return result, info
+        if self.async_fallback:
+            logger.warning(f"{process_type.value} unavailable, running as async job")
+            return self._run_job(process_type, **kwargs)
+        return result, info
+
     @handle_file_processing
     def extract_pii(
         self,
@@ -263,42 +1402,9 @@ class AnyParser:
             file_type=file_type,
         )
 
-        # Handle the new result format where tables are in a dict with 'markdown' key
-        if isinstance(extracted_result, dict) and "markdown" in extracted_result:
-            extracted_html = extracted_result["markdown"]
-        else:
-            extracted_html = extracted_result
-
-        # Convert list of HTML strings to a single HTML string
-        if isinstance(extracted_html, list):
-            extracted_html = AnyParser.flatten_to_string(extracted_html)
-
-        if return_type.lower() == "csv":
-            try:
-                import pandas as pd
-            except ImportError:
-                raise ImportError("Please install pandas to use CSV return_type")
-
-            # Ensure we have a string for pandas
-            if isinstance(extracted_html, list):
-                extracted_html = "".join(str(item) for item in extracted_html)
-
-            # Wrap the HTML tables in a proper HTML structure for pandas
-            html_content = f"<html><body>{extracted_html}</body></html>"
-
-            try:
-                df_list = pd.read_html(StringIO(html_content))
-                combined_df = pd.concat(df_list, ignore_index=True)
-                csv_output = combined_df.to_csv(index=False)
-                return csv_output, time_elapsed
-            except ValueError as e:
-                if "No tables found" in str(e):
-                    # Return the raw HTML if pandas can't parse it
-                    return extracted_html, time_elapsed
-                else:
-                    raise e
-
-        return extracted_html, time_elapsed
+        if not time_elapsed:
+            return extracted_result, time_elapsed
+        return convert_tables(extracted_result, return_type), time_elapsed
 
     @handle_file_processing
     def extract_key_value(
@@ -312,36 +1418,29 @@ class AnyParser:
 
         Args:
             file_path (str): The path to the file to be parsed.
-            file_content (str): Base64 encoded file content.
+            file_content (str or bytes): Base64 encoded file content, or the raw file.
             file_type (str): File format extension.
-            extract_instruction (Dict or List): A dictionary containing the keys to be
-                extracted, with their values as the description of those keys.
-                Or a list of dictionaries with 'key' and 'description' fields.
+            extract_instruction (Dict, List or ExtractionSchema): A dictionary
+                containing the keys to be extracted, with their values as the
+                description of those keys. Or a list of dictionaries with 'key'
+                and 'description' fields, or a compiled ExtractionSchema to
+                reuse over many documents.
         Returns:
             tuple(str, str): The extracted data and the time taken.
         """
-        # Convert extract_instruction to the correct API format\
         if not file_type:
             file_type = file_path.split(".")[-1] if "." in file_path else ""
-        formatted_instruction = None
-        if extract_instruction:
-            if isinstance(extract_instruction, dict):
-                # Convert dict format to list of key-description pairs
-                formatted_instruction = [
-                    {"key": key, "description": description}
-                    for key, description in extract_instruction.items()
-                ]
-            elif isinstance(extract_instruction, list):
-                # Already in correct format
-                formatted_instruction = extract_instruction
-            else:
-                raise ValueError("extract_instruction must be a dict or list")
+        schema = (
+            ExtractionSchema.compile(extract_instruction)
+            if extract_instruction
+            else None
+        )
 
         return self._sync_extract_key_value.extract(
             file_path=file_path,
             file_content=file_content,
             file_type=file_type,
-            extract_args={"extract_instruction": formatted_instruction},
+            extract_args={"extract_instruction": schema},
         )
 
     # Async methods
@@ -352,6 +1451,7 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_args=None,
+        callback_url=None,
     ):
         """Extract full content from a file asynchronously."""
         return self._async_parser.send_async_request(
@@ -359,6 +1459,7 @@ class AnyParser:
             file_path=file_path,  # type: ignore
             file_content=file_content,  # type: ignore
             extract_args=extract_args,
+            callback_url=callback_url,
         )
 
     @handle_file_processing
@@ -368,6 +1469,7 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_args=None,
+        callback_url=None,
     ):
         """Extract full content from a file asynchronously using pro model."""
         return self._async_parser.send_async_request(
@@ -376,6 +1478,7 @@ class AnyParser:
             file_content=file_content,  # type: ignore
             file_type=file_type,  # type: ignore
             extract_args=extract_args,
+            callback_url=callback_url,
         )
 
     @handle_file_processing
@@ -385,6 +1488,7 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_tables=False,
+        callback_url=None,
     ):
         """Extract content from a file asynchronously using AWS Textract."""
         extract_args = {"extract_tables": extract_tables} if extract_tables else None
@@ -394,6 +1498,7 @@ class AnyParser:
             file_content=file_content,  # type: ignore
             file_type=file_type,  # type: ignore
             extract_args=extract_args,
+            callback_url=callback_url,
         )
 
     @handle_file_processing
@@ -403,6 +1508,7 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_args=None,
+        callback_url=None,
     ):
         """Extract PII from a file asynchronously."""
         return self._async_parser.send_async_request(
@@ -411,16 +1517,20 @@ class AnyParser:
             file_content=file_content,  # type: ignore
             file_type=file_type,  # type: ignore
             extract_args=None,
+            callback_url=callback_url,
         )
 
     @handle_file_processing
-    def async_extract_tables(self, file_path=None, file_content=None, file_type=None):
+    def async_extract_tables(
+        self, file_path=None, file_content=None, file_type=None, callback_url=None
+    ):
         """Extract tables from a file asynchronously."""
         return self._async_parser.send_async_request(
             process_type=ProcessType.EXTRACT_TABLES,
             file_path=file_path,  # type: ignore
             file_content=file_content,  # type: ignore
             file_type=file_type,  # type: ignore
+            callback_url=callback_url,
         )
 
     @handle_file_processing
@@ -430,28 +1540,146 @@ class AnyParser:
         file_content=None,
         file_type=None,
         extract_instruction=None,
+        callback_url=None,
     ):
         """Extract key-value pairs from a file asynchronously.
 
         Args:
             file_path (str): The path to the file to be parsed.
-            file_content (str): Base64 encoded file content.
+            file_content (str or bytes): Base64 encoded file content, or the raw file.
             file_type (str): File format extension.
-            extract_instruction (Dict or List): A dictionary containing the keys to be
-                extracted, with their values as the description of those keys.
-                Or a list of dictionaries with 'key' and 'description' fields.
+            extract_instruction (Dict, List or ExtractionSchema): A dictionary
+                containing the keys to be extracted, with their values as the
+                description of those keys. Or a list of dictionaries with 'key'
+                and 'description' fields, or a compiled ExtractionSchema to
+                reuse over many documents.
+            callback_url (str): URL notified when the job finishes.
 
         Returns:
             tuple: (job_id, timing_info) or (error_message, "")
         """
         if not file_type:
             file_type = file_path.split(".")[-1] if "." in file_path else ""
+        schema = (
+            ExtractionSchema.compile(extract_instruction)
+            if extract_instruction
+            else None
+        )
         return self._async_parser.send_async_request(
             process_type=ProcessType.EXTRACT_KEY_VALUE,
             file_path=file_path,  # type: ignore
             file_content=file_content,  # type: ignore
             file_type=file_type,  # type: ignore
-            extract_args={"extract_instruction": extract_instruction},
+            extract_args={"extract_instruction": schema},
+            callback_url=callback_url,
+        )
+
+    # Job futures
+    @property
+    def job_poller(self) -> JobPoller:
+        """Shared background poller resolving the jobs from submit_* methods."""
+        with self._job_poller_lock:
+            if self._job_poller is None:
+                self._job_poller = JobPoller(
+                    self.get_job_status,
+                    poll_interval=self._poll_interval,
+                    max_workers=self._job_workers,
+                    limiter=self._job_limiter,
+                    callbacks=self.callbacks,
+                    downloader=self.downloader,
+                )
+            return self._job_poller
+
+    def _submit(self, method, process_type: ProcessType, **kwargs) -> ParseJob:
+        return self.job_poller.submit(
+            lambda **callback: method(**kwargs, **callback),
+            process_type=process_type,
+            file_path=kwargs.get("file_path"),
+        )
+
+    def submit_parse(
+        self, file_path=None, file_content=None, file_type=None, extract_args=None
+    ) -> ParseJob:
+        """Submit an async parse job and return a ParseJob future.
+
+        Submission and polling happen in the background; use
+        ``job.result(timeout)``, ``job.add_done_callback`` or
+        ``any_parser.as_completed`` to collect results.
+        """
+        return self._submit(
+            self.async_parse,
+            ProcessType.PARSE,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            extract_args=extract_args,
+        )
+
+    def submit_parse_pro(
+        self, file_path=None, file_content=None, file_type=None, extract_args=None
+    ) -> ParseJob:
+        """Submit an async pro-model parse job and return a ParseJob future."""
+        return self._submit(
+            self.async_parse_pro,
+            ProcessType.PARSE_PRO,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            extract_args=extract_args,
+        )
+
+    def submit_parse_textract(
+        self, file_path=None, file_content=None, file_type=None, extract_tables=False
+    ) -> ParseJob:
+        """Submit an async Textract parse job and return a ParseJob future."""
+        return self._submit(
+            self.async_parse_textract,
+            ProcessType.PARSE_TEXTRACT,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            extract_tables=extract_tables,
+        )
+
+    def submit_extract_pii(
+        self, file_path=None, file_content=None, file_type=None
+    ) -> ParseJob:
+        """Submit an async PII extraction job and return a ParseJob future."""
+        return self._submit(
+            self.async_extract_pii,
+            ProcessType.EXTRACT_PII,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+        )
+
+    def submit_extract_tables(
+        self, file_path=None, file_content=None, file_type=None
+    ) -> ParseJob:
+        """Submit an async table extraction job and return a ParseJob future."""
+        return self._submit(
+            self.async_extract_tables,
+            ProcessType.EXTRACT_TABLES,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+        )
+
+    def submit_extract_key_value(
+        self,
+        file_path=None,
+        file_content=None,
+        file_type=None,
+        extract_instruction=None,
+    ) -> ParseJob:
+        """Submit an async key-value extraction job and return a ParseJob future."""
+        return self._submit(
+            self.async_extract_key_value,
+            ProcessType.EXTRACT_KEY_VALUE,
+            file_path=file_path,
+            file_content=file_content,
+            file_type=file_type,
+            extract_instruction=extract_instruction,
         )
 
     def get_job_status(self, job_id: str):
@@ -470,6 +1698,8 @@ class AnyParser:
         file_id: str,
         sync_timeout: int = 180,
         sync_interval: int = 3,
+        output_path: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
     ) -> str:
         """Fetches extraction results asynchronously.
 
@@ -482,56 +1712,37 @@ class AnyParser:
                 seconds. Defaults to 180.
             sync_interval (int, optional): Time interval between polling
                 attempts in seconds. Defaults to 3.
+            output_path (str, optional): If set, the result is streamed into
+                this file instead of being decoded in memory, and the path is
+                returned.
+            cancel_token (CancellationToken, optional): Stops polling and the
+                result download when cancelled.
 
         Returns:
             str: The extracted results as a markdown string, or error message if failed.
         """
-        start_time = time.time()
-        while time.time() < start_time + sync_timeout:
-            try:
-                job_status = self.get_job_status(file_id)
-
-                if job_status.get("status") == "completed":
-                    # Handle presigned URL if present
-                    presigned_url = job_status.get("result_url")
-                    if presigned_url:
-                        try:
-                            import requests
-
-                            presigned_resp = requests.get(presigned_url)
-                            presigned_resp.raise_for_status()
-                            result_json = presigned_resp.json()
-                            if "markdown" in result_json:
-                                return result_json["markdown"]
-                            elif "result" in result_json:
-                                return str(result_json["result"])
-                            else:
-                                return str(result_json)
-                        except Exception:
-                            # Fall back to inline result if presigned URL fails
-                            pass
-
-                    # Handle inline result
-                    result = job_status.get("result", {})
-                    if "markdown" in result:
-                        return result["markdown"]
-                    elif "result" in result:
-                        return str(result["result"])
+        try:
+            with deadline(sync_timeout, cancel_token):
+                while True:
+                    job_status = self.get_job_status(file_id)
+
+                    if job_status.get("status") == "completed":
+                        return self.downloader.fetch(job_status, output_path)
+                    elif job_status.get("status") == "failed":
+                        error_msg = job_status.get("error_message") or job_status.get(
+                            "error", "Job failed"
+                        )
+                        return f"Error: {error_msg}"
+                    elif job_status.get("status") in ["pending", "processing"]:
+                        print("Waiting for response...")
+                        sleep(sync_interval)
+                        continue
                     else:
-                        return str(result)
-                elif job_status.get("status") == "failed":
-                    error_msg = job_status.get("error_message") or job_status.get(
-                        "error", "Job failed"
-                    )
-                    return f"Error: {error_msg}"
-                elif job_status.get("status") in ["pending", "processing"]:
-                    print("Waiting for response...")
-                    time.sleep(sync_interval)
-                    continue
-                else:
-                    return f"Unknown status: {job_status.get('status')}"
-
-            except Exception as e:
-                return f"Error fetching results: {e}"
-
-        return f"Timeout: Job did not complete within {sync_timeout} seconds"
+                        return f"Unknown status: {job_status.get('status')}"
+
+        except DeadlineExceeded:
+            return f"Timeout: Job did not complete within {sync_timeout} seconds"
+        except Cancelled as e:
+            return f"Error: {e}"
+        except Exception as e:
+            return f"Error fetching results: {e}"
@@ -0,0 +1,268 @@
+"""Reading documents straight out of zip and tar archives.
+
+A document inside an archive is addressed by its member key,
+``<archive path>!/<path inside the archive>`` (e.g.
+``inbox.zip!/invoices/2024-01.pdf``), which is accepted wherever a file
+path is. Members are read from the archive as streams; nothing is
+extracted to disk.
+
+``iter_members`` walks an archive once in order and works for every
+format, including compressed tar streams. Reading single members by key
+is cheap for zip files and uncompressed tar files; a compressed tar file
+has to be decompressed up to the member on every read, so iterate over
+those instead.
+"""
+
+import functools
+import io
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Tuple, Union
+
+ARCHIVE_SEPARATOR = "!/"
+ARCHIVE_SUFFIXES = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+# Zip archives kept open for reading members by key
+MAX_OPEN_ZIPS = 16
+
+# Open zip archives by path, with the (mtime_ns, size) they were opened at;
+# the most recently used last
+_zips: "OrderedDict[str, Tuple[Tuple[int, int], zipfile.ZipFile]]" = OrderedDict()
+_zips_lock = threading.Lock()
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    """Whether ``path`` is an existing zip or tar file, judged by its suffix."""
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def _normalize(name: str) -> str:
+    # "./a.pdf" and "dir//a.pdf" name the same member, as they would once
+    # the key goes through Path()
+    return posixpath.normpath(name).lstrip("/")
+
+
+def member_key(archive_path: Union[str, Path], name: str) -> str:
+    return f"{archive_path}{ARCHIVE_SEPARATOR}{_normalize(name)}"
+
+
+def split_member_key(path: Union[str, Path]) -> Optional[Tuple[str, str]]:
+    """(archive_path, member_name) of a member key, None for other paths."""
+    archive_path, separator, name = str(path).partition(ARCHIVE_SEPARATOR)
+    if not separator or not archive_path.lower().endswith(ARCHIVE_SUFFIXES):
+        return None
+    return archive_path, name
+
+
+def _matches(name: str, extensions: Optional[Iterable[str]]) -> bool:
+    return extensions is None or Path(name).suffix.lower().lstrip(".") in extensions
+
+
+class ArchiveMember:
+    """A document in an archive, as yielded by ``iter_members``."""
+
+    def __init__(self, archive_path: str, name: str, size: int, file: IO[bytes]):
+        self.name = _normalize(name)
+        self.key = member_key(archive_path, name)
+        self.file_type = Path(name).suffix.lower().lstrip(".")
+        self.size = size
+        self.file = file
+
+    def read(self) -> bytes:
+        return self.file.read()
+
+
+def iter_members(
+    archive_path: Union[str, Path], extensions: Optional[Iterable[str]] = None
+) -> Iterator[ArchiveMember]:
+    """Stream the regular files of an archive in order.
+
+    Only members whose extension is in ``extensions`` are yielded (all if
+    None). A member's file is only valid until the next one is yielded.
+    """
+    archive_path = str(archive_path)
+    extensions = set(extensions) if extensions is not None else None
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _matches(info.filename, extensions):
+                    continue
+                with archive.open(info) as file:
+                    yield ArchiveMember(
+                        archive_path, info.filename, info.file_size, file
+                    )
+        return
+    # Stream mode reads the (possibly compressed) tar file front to back once
+    with tarfile.open(archive_path, "r|*") as archive:
+        for info in archive:
+            if not info.isfile() or not _matches(info.name, extensions):
+                continue
+            file = archive.extractfile(info)
+            yield ArchiveMember(archive_path, info.name, info.size, file)
+
+
+def list_members(
+    archive_path: Union[str, Path], extensions: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[str, int]]:
+    """(member_key, size) of the matching regular files, without reading them."""
+    archive_path = str(archive_path)
+    extensions = set(extensions) if extensions is not None else None
+    for name, info in _index(*_stat_key(archive_path)).items():
+        if _matches(name, extensions):
+            yield member_key(archive_path, name), _size(info)
+
+
+def _stat_key(archive_path: str) -> Tuple[str, int, int]:
+    # Cached archive indexes are invalidated when the file changes
+    stat = os.stat(archive_path)
+    return os.path.abspath(archive_path), stat.st_mtime_ns, stat.st_size
+
+
+def _size(info: Union[zipfile.ZipInfo, tarfile.TarInfo]) -> int:
+    return info.file_size if isinstance(info, zipfile.ZipInfo) else info.size
+
+
+@contextmanager
+def _zip(path: str, mtime_ns: int, size: int) -> Iterator[zipfile.ZipFile]:
+    """The open zip archive at ``path``, for use while the context is held.
+
+    ZipFile reads members through a locked shared file, so one open
+    archive serves concurrent readers. Archives are closed when they are
+    evicted or changed on disk; members opened before stay readable, as
+    the file is only closed once the last of them is.
+    """
+    with _zips_lock:
+        cached = _zips.pop(path, None)
+        if cached is not None and cached[0] == (mtime_ns, size):
+            archive = cached[1]
+        else:
+            if cached is not None:
+                cached[1].close()
+            archive = zipfile.ZipFile(path)
+        _zips[path] = ((mtime_ns, size), archive)
+        while len(_zips) > MAX_OPEN_ZIPS:
+            _, (_, evicted) = _zips.popitem(last=False)
+            evicted.close()
+        yield archive
+
+
+def close_archives() -> None:
+    """Close the zip archives kept open for reading members by key."""
+    with _zips_lock:
+        while _zips:
+            _, (_, archive) = _zips.popitem()
+            archive.close()
+
+
+@functools.lru_cache(maxsize=16)
+def _index(path: str, mtime_ns: int, size: int):
+    """Regular files of an archive by name."""
+    try:
+        if zipfile.is_zipfile(path):
+            with _zip(path, mtime_ns, size) as archive:
+                return {
+                    _normalize(info.filename): info
+                    for info in archive.infolist()
+                    if not info.is_dir()
+                }
+        with tarfile.open(path, "r:*") as archive:
+            return {
+                _normalize(info.name): info
+                for info in archive.getmembers()
+                if info.isfile()
+            }
+    except (tarfile.TarError, zipfile.BadZipFile) as e:
+        raise OSError(f"Cannot read archive {path}: {e}") from e
+
+
+class _TarMemberFile(io.IOBase):
+    """Member file that also closes the archive it was opened from."""
+
+    def __init__(self, archive: tarfile.TarFile, info: tarfile.TarInfo) -> None:
+        self.name = info.name
+        self._archive = archive
+        self._file = archive.extractfile(info)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+            self._archive.close()
+        super().close()
+
+
+def _lookup(
+    key: str,
+) -> Tuple[Tuple[str, int, int], Union[zipfile.ZipInfo, tarfile.TarInfo]]:
+    archive_path, name = split_member_key(key)
+    stat_key = _stat_key(archive_path)
+    info = _index(*stat_key).get(_normalize(name))
+    if info is None:
+        raise FileNotFoundError(f"No file {name} in archive {archive_path}")
+    return stat_key, info
+
+
+def open_member(key: str) -> IO[bytes]:
+    """Open a member by key as a seekable binary stream."""
+    stat_key, info = _lookup(key)
+    if isinstance(info, zipfile.ZipInfo):
+        with _zip(*stat_key) as archive:
+            return archive.open(info)
+    return _TarMemberFile(tarfile.open(stat_key[0], "r:*"), info)
+
+
+def member_size(key: str) -> int:
+    return _size(_lookup(key)[1])
+
+
+def open_input(path: Union[str, Path]) -> IO[bytes]:
+    """Open a file path or member key for binary reading."""
+    if split_member_key(path) is not None:
+        return open_member(str(path))
+    return open(path, "rb")
+
+
+def input_size(path: Union[str, Path]) -> int:
+    """Size in bytes of a file path or member key; OSError if there is none."""
+    if split_member_key(path) is not None:
+        return member_size(str(path))
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"File does not exist: {path}")
+    return os.path.getsize(path)
+
+
+def input_exists(path: Union[str, Path]) -> bool:
+    """Whether ``path`` is an existing file or archive member."""
+    try:
+        input_size(path)
+    except OSError:
+        return False
+    return True
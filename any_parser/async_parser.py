@@ -7,7 +7,12 @@ from typing import Dict, Optional
 import requests
 
 from any_parser.base_parser import BaseParser
+from any_parser.circuit_breaker import guarded, is_failure_status
+from any_parser.concurrency import OVERLOAD_STATUS, ServerBusy
 from any_parser.constants import ProcessType
+from any_parser.deadline import request_timeout
+from any_parser.extraction_schema import PAYLOAD_KEY, ExtractionSchema
+from any_parser.utils import encode_json_payload
 
 TIMEOUT = 180
 
@@ -23,6 +28,7 @@ class AsyncParser(BaseParser):
         file_content: str,
         file_type: str = None,
         extract_args: Optional[Dict] = None,
+        callback_url: Optional[str] = None,
     ) -> str:
         """Submit an async processing job and return the job ID.
 
@@ -32,6 +38,8 @@ class AsyncParser(BaseParser):
             file_content (str): The content of the file to be parsed.
             file_type (str): The type of the file to be parsed.
             extract_args (Optional[Dict]): Additional extraction arguments.
+            callback_url (Optional[str]): URL the server notifies with the
+                job status when the job finishes.
 
         Returns:
             str: The job_id of the submitted job.
@@ -52,35 +60,33 @@ class AsyncParser(BaseParser):
             raise ValueError(f"Unsupported process type: {process_type}")
 
         # Get file type from file path
-        file_type = file_path.split(".")[-1] if "." in file_path else ""
-
-        # Create the payload
-        payload = {
-            "file_content": file_content,
-            "file_type": file_type,
-        }
+        if not file_type:
+            file_type = file_path.split(".")[-1] if "." in file_path else ""
 
+        payload_args = None
         if extract_args:
             if process_type == ProcessType.EXTRACT_KEY_VALUE:
-                input_keys = list(extract_args["extract_instruction"].keys())
-                input_descriptions = list(extract_args["extract_instruction"].values())
-                extract_instruction = [
-                    {"key": key, "description": description}
-                    for key, description in zip(input_keys, input_descriptions)
-                ]
-                payload["extract_input_key_description_pairs"] = extract_instruction
+                instruction = extract_args.get("extract_instruction")
+                if instruction is not None:
+                    payload_args = {PAYLOAD_KEY: ExtractionSchema.compile(instruction)}
             elif process_type == ProcessType.EXTRACT_TABLES:
-                payload["extract_tables"] = True
+                payload_args = {"extract_tables": True}
             else:
-                payload.update(extract_args)
+                payload_args = extract_args
+        if callback_url:
+            payload_args = dict(payload_args or {}, callback_url=callback_url)
 
         # Send the POST request
-        response = requests.post(
-            f"{self._base_url}{endpoint}",
-            headers=self._headers,
-            data=json.dumps(payload),
-            timeout=TIMEOUT,
-        )
+        url = f"{self._base_url}{endpoint}"
+        with guarded(self.breakers, url) as call:
+            response = requests.post(
+                url,
+                headers=self._headers,
+                data=encode_json_payload(file_content, file_type, payload_args),
+                timeout=request_timeout(TIMEOUT),
+            )
+            if call is not None and is_failure_status(response.status_code):
+                call.fail()
 
         if response.status_code != 200:
             raise Exception(f"Error {response.status_code}: {response.text}")
@@ -100,9 +106,11 @@ class AsyncParser(BaseParser):
         response = requests.get(
             f"{self._base_url}/anyparser/job_status/{job_id}",
             headers=self._headers,
-            timeout=TIMEOUT,
+            timeout=request_timeout(TIMEOUT),
         )
 
+        if response.status_code in OVERLOAD_STATUS:
+            raise ServerBusy(f"Error {response.status_code}: {response.text}")
         if response.status_code != 200:
             raise Exception(f"Error {response.status_code}: {response.text}")
 
@@ -9,3 +9,5 @@ class BaseParser:
             "Content-Type": "application/json",
             "x-api-key": self._api_key,
         }
+        # Set to a CircuitBreakerRegistry to guard requests per endpoint
+        self.breakers = None
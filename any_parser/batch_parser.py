@@ -1,15 +1,32 @@
 """Batch parser implementation."""
 
+import hashlib
+import io
 import logging
 import os
+import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import requests
 from pydantic import BaseModel, Field
 
+from any_parser.archive import input_exists, is_archive, list_members, open_input
 from any_parser.base_parser import BaseParser
+from any_parser.concurrency import OVERLOAD_STATUS, AdaptiveLimiter, ServerBusy
+from any_parser.deadline import check_deadline, request_timeout, run_in_context
+from any_parser.dedup import ContentHashIndex, group_by_content
+from any_parser.preflight import estimate_pages, inspect_file
+from any_parser.scheduler import FairScheduler, scheduled
+from any_parser.utils import (
+    SUPPORTED_FILE_EXTENSIONS,
+    BinaryInput,
+    is_binary_input,
+    read_binary,
+    validate_file_inputs,
+)
 
 TIMEOUT = 60
 MAX_WORKERS = 10
@@ -25,6 +42,8 @@ class UploadResponse(BaseModel):
     fileName: str
     requestId: str
     requestStatus: str
+    # Local file path or archive member key the response is for
+    filePath: Optional[str] = None
 
 
 class UsageResponse(BaseModel):
@@ -52,8 +71,18 @@ class FileStatusResponse(BaseModel):
 
 
 class BatchParser(BaseParser):
-    def __init__(self, api_key: str, base_url: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        upload_limiter: Optional[AdaptiveLimiter] = None,
+        scheduler: Optional[FairScheduler] = None,
+    ) -> None:
         super().__init__(api_key, base_url)
+        self.scheduler = scheduler
+        # Folder uploads run MAX_WORKERS at a time, or as many as the
+        # limiter allows when one is given
+        self.upload_limiter = upload_limiter
         self._file_upload_url = f"{self._base_url}/files/"
         self._processing_status_url = f"{self._base_url}/files/" + "{request_id}"
         self._usage_url = f"{self._base_url}/users/current/usage"
@@ -61,79 +90,242 @@ class BatchParser(BaseParser):
         # remove "Content-Type" from headers
         self._headers.pop("Content-Type")
 
-    def create(self, file_path: str) -> Union[UploadResponse, List[UploadResponse]]:
-        """Upload a single file or folder for batch processing.
+    def create(
+        self,
+        file_path: Union[str, BinaryInput],
+        check_quota: bool = False,
+        dedupe: bool = False,
+        hash_index: Optional[ContentHashIndex] = None,
+        file_type: Optional[str] = None,
+    ) -> Union[UploadResponse, List[UploadResponse]]:
+        """Upload a single file, folder or archive for batch processing.
 
         Args:
-            file_path: Path to the file or folder to upload
+            file_path: Path to the file or folder to upload. A zip or tar
+                archive is uploaded like a folder: its members with a
+                supported extension are read from it one at a time, without
+                extracting it. A member key (``docs.zip!/a.pdf``) uploads
+                a single member. The file itself can be passed instead of
+                a path, as bytes, a memoryview or a binary stream, together
+                with its file_type.
+            check_quota: Preflight the page count of every file and refuse to
+                upload if it exceeds the remaining page quota
+            dedupe: Upload byte-identical files in a folder only once; every
+                copy gets the response (and requestId) of the uploaded one.
+                Off by default, so every file gets its own request
+            hash_index: Content hashes already uploaded, e.g. by earlier runs.
+                Matching files are not uploaded again and new uploads are
+                added to the index (saved at the end if it is persistent)
+            file_type: File format extension of content passed as file_path
 
         Returns:
             If file: Single UploadResponse object containing upload details
-            If folder: List of UploadResponse objects for each file
+            If folder or archive: List of UploadResponse objects for each
+            file, whose filePath is the file's path or member key
         """
+        if is_binary_input(file_path):
+            return self._create_from_content(
+                file_path, file_type, check_quota, hash_index
+            )
         path = Path(file_path)
-        if path.is_file():
-            return self._upload_single_file(path)
-        elif path.is_dir():
-            return self._upload_folder(path)
+        files, single = self._input_files(path)
+
+        if hash_index is not None or (dedupe and len(files) > 1):
+            groups = group_by_content(files)
         else:
-            raise ValueError(f"Path {file_path} does not exist")
+            groups = {str(f): [f] for f in files}
+
+        if check_quota:
+            self._check_pages([paths[0] for paths in groups.values()])
+
+        if single:
+            response = self._upload_group(*next(iter(groups.items())), hash_index)[0]
+            if hash_index is not None:
+                hash_index.save()
+            return response
+        return self._upload_folder(path, groups=groups, hash_index=hash_index)
+
+    def check_quota(self, file_path: str, dedupe: bool = False) -> int:
+        """Check that a file or folder fits in the remaining page quota.
+
+        Args:
+            file_path: Path to the file or folder
+            dedupe: Count byte-identical files once, as uploads with
+                dedupe=True are charged
+
+        Returns:
+            The estimated number of pages
+
+        Raises:
+            Exception: If the estimate exceeds ``get_usage().pageRemaining``
+        """
+        files, _ = self._input_files(Path(file_path))
+        if dedupe:
+            files = [paths[0] for paths in group_by_content(files).values()]
+        return self._check_pages(files)
+
+    def _create_from_content(
+        self,
+        content: BinaryInput,
+        file_type: Optional[str],
+        check_quota: bool,
+        hash_index: Optional[ContentHashIndex],
+    ) -> UploadResponse:
+        """Upload a file passed as bytes or a binary stream."""
+        data = read_binary(content)
+        is_valid, error_message = validate_file_inputs(None, data, file_type)
+        if not is_valid:
+            raise ValueError(error_message)
+        if check_quota:
+            info = inspect_file(io.BytesIO(data), file_type, len(data))
+            self._check_page_count(info.page_count or 1)
+
+        digest = hashlib.sha256(data).hexdigest()
+        known = hash_index.get(digest) if hash_index is not None else None
+        if known is not None:
+            return UploadResponse(**known)
+        with scheduled(self.scheduler), self._upload_slot():
+            response = self._post_file(f"{uuid.uuid4()}.{file_type}", data)
+        if hash_index is not None:
+            hash_index.put(digest, response.model_dump())
+            hash_index.save()
+        return response
+
+    def _upload_slot(self):
+        if self.upload_limiter is None:
+            return nullcontext()
+        return self.upload_limiter.slot()
+
+    def _check_pages(self, files: List[Path]) -> int:
+        return self._check_page_count(estimate_pages(files))
+
+    def _check_page_count(self, pages: int) -> int:
+        usage = self.get_usage()
+        if pages > usage.pageRemaining:
+            raise Exception(
+                f"Insufficient quota: {pages} pages needed, "
+                f"{usage.pageRemaining} remaining"
+            )
+        return pages
+
+    def _input_files(self, path: Path) -> Tuple[List[Path], bool]:
+        """(files, is_single_file) for a file, folder or archive path."""
+        if is_archive(path):
+            members = list_members(path, SUPPORTED_FILE_EXTENSIONS)
+            return [Path(key) for key, _ in members], False
+        if input_exists(path):
+            return [path], True
+        if path.is_dir():
+            return self._list_files(path), False
+        raise ValueError(f"Path {path} does not exist")
+
+    @staticmethod
+    def _list_files(folder_path: Path) -> List[Path]:
+        """All files in a folder and its subfolders."""
+        files = []
+        for root, _, filenames in os.walk(folder_path):
+            for filename in filenames:
+                files.append(Path(root) / filename)
+        return files
 
     def _upload_single_file(self, file_path: Path) -> UploadResponse:
         """Upload a single file for batch processing."""
-        if not os.path.isfile(file_path):
+        if not input_exists(file_path):
             raise FileNotFoundError(f"The file path '{file_path}' does not exist.")
 
-        with open(file_path, "rb") as f:
-            files = {"file": f}
-            response = requests.post(
-                self._file_upload_url,
-                headers=self._headers,
-                files=files,
-                timeout=TIMEOUT,
-            )
+        with open_input(file_path) as f:
+            return self._post_file(Path(file_path).name, f)
 
-            if response.status_code != 200:
-                raise Exception(f"Upload failed: {response.text}")
+    def _post_file(self, file_name: str, file: BinaryInput) -> UploadResponse:
+        """Post a file's content to the batch upload endpoint."""
+        check_deadline()
+        response = requests.post(
+            self._file_upload_url,
+            headers=self._headers,
+            files={"file": (file_name, file)},
+            timeout=request_timeout(TIMEOUT),
+        )
 
-            data = response.json()
-            return UploadResponse(
-                fileName=data["fileName"],
-                requestId=data["requestId"],
-                requestStatus=data["requestStatus"],
-            )
+        if response.status_code in OVERLOAD_STATUS:
+            raise ServerBusy(f"Upload failed: {response.text}")
+        if response.status_code != 200:
+            raise Exception(f"Upload failed: {response.text}")
+
+        data = response.json()
+        return UploadResponse(
+            fileName=data["fileName"],
+            requestId=data["requestId"],
+            requestStatus=data["requestStatus"],
+        )
 
-    def _upload_folder(self, folder_path: Path) -> List[UploadResponse]:
+    def _upload_group(
+        self,
+        digest: str,
+        paths: List[Path],
+        hash_index: Optional[ContentHashIndex] = None,
+    ) -> List[UploadResponse]:
+        """Upload the first of a group of identical files and fan out the response."""
+        known = hash_index.get(digest) if hash_index is not None else None
+        if known is not None:
+            response = UploadResponse(**known)
+        else:
+            with scheduled(self.scheduler), self._upload_slot():
+                response = self._upload_single_file(paths[0])
+            if hash_index is not None:
+                hash_index.put(digest, response.model_dump())
+        return [response.model_copy(update={"filePath": str(paths[0])})] + [
+            response.model_copy(update={"fileName": path.name, "filePath": str(path)})
+            for path in paths[1:]
+        ]
+
+    def _upload_folder(
+        self,
+        folder_path: Path,
+        groups: Optional[Dict[str, List[Path]]] = None,
+        hash_index: Optional[ContentHashIndex] = None,
+    ) -> List[UploadResponse]:
         """Upload all files in a folder for batch processing.
 
         Args:
             folder_path: Path to the folder containing files to upload
+            groups: Files grouped by content hash; only the first file of
+                each group is uploaded. Defaults to one group per file.
+            hash_index: Content hashes uploaded before
 
         Returns:
             List of UploadResponse objects for each uploaded file
         """
-        # Get all files in folder and subfolders
-        files = []
-        for root, _, filenames in os.walk(folder_path):
-            for filename in filenames:
-                files.append(Path(root) / filename)
+        if groups is None:
+            # Get all files in folder and subfolders
+            groups = {str(f): [f] for f in self._list_files(folder_path)}
 
         # Upload files concurrently using thread pool
         responses = []
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            future_to_file = {
-                executor.submit(self._upload_single_file, file_path): file_path
-                for file_path in files
+        # With a limiter, one thread per allowed upload; it decides how many run
+        max_workers = (
+            self.upload_limiter.max_limit if self.upload_limiter else MAX_WORKERS
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_files = {
+                run_in_context(
+                    executor, self._upload_group, digest, paths, hash_index
+                ): paths
+                for digest, paths in groups.items()
             }
 
-            for future in as_completed(future_to_file):
-                file_path = future_to_file[future]
+            for future in as_completed(future_to_files):
+                paths = future_to_files[future]
                 try:
-                    response = future.result()
-                    responses.append(response)
+                    responses.extend(future.result())
                 except Exception as e:
-                    logger.error(f"Failed to upload {file_path}: {str(e)}")
-
+                    for file_path in paths:
+                        logger.error(f"Failed to upload {file_path}: {str(e)}")
+
+        duplicates = sum(len(paths) - 1 for paths in groups.values())
+        if duplicates:
+            logger.info(f"Skipped uploading {duplicates} duplicate files")
+        if hash_index is not None:
+            hash_index.save()
         return responses
 
     def retrieve(self, request_id: str) -> FileStatusResponse:
@@ -148,7 +340,7 @@ class BatchParser(BaseParser):
         response = requests.get(
             self._processing_status_url.format(request_id=request_id),
             headers=self._headers,
-            timeout=TIMEOUT,
+            timeout=request_timeout(TIMEOUT),
         )
 
         if response.status_code != 200:
@@ -166,7 +358,7 @@ class BatchParser(BaseParser):
         response = requests.get(
             self._usage_url,
             headers=self._headers,
-            timeout=TIMEOUT,
+            timeout=request_timeout(TIMEOUT),
         )
 
         if response.status_code != 200:
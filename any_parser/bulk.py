@@ -0,0 +1,516 @@
+"""Concurrent bulk processing of many files."""
+
+import base64
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import nullcontext
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from any_parser.archive import (
+    input_size,
+    is_archive,
+    list_members,
+    open_input,
+    split_member_key,
+)
+from any_parser.concurrency import (
+    AdaptiveLimiter,
+    BudgetMetrics,
+    ByteBudget,
+    LimiterMetrics,
+    is_overload_error,
+)
+from any_parser.deadline import (
+    CancellationToken,
+    check_deadline,
+    deadline,
+    run_in_context,
+)
+from any_parser.dedup import file_sha256
+from any_parser.image_preprocessing import (
+    IMAGE_FILE_TYPES,
+    ImagePreprocessOptions,
+    ImagePreprocessor,
+)
+from any_parser.sync_parser import BaseSyncParser
+from any_parser.utils import (
+    SUPPORTED_FILE_EXTENSIONS,
+    encode_json_payload,
+    percentile,
+    validate_file_inputs,
+)
+
+MAX_WORKERS = 10
+# Copies of a document alive during a sync call, relative to its size: the
+# file bytes, their base64 encoding and the JSON request body
+REQUEST_COPIES = 1 + 4 / 3 + 4 / 3
+# Expected size of the response (markdown or JSON) relative to the document
+RESPONSE_RATIO = 0.5
+REQUEST_OVERHEAD = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class BulkResult(BaseModel):
+    """
+    Result of processing one file in a bulk run.
+    """
+
+    file_path: str
+    result: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    duplicate_of: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkStats(BaseModel):
+    """
+    Throughput and latency summary of a bulk run.
+    """
+
+    files: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    wall_time: float = 0.0
+    throughput: float = 0.0
+    latency_p50: float = 0.0
+    latency_p95: float = 0.0
+    latency_max: float = 0.0
+    concurrency: Optional[LimiterMetrics] = None
+    memory: Optional[BudgetMetrics] = None
+
+
+def estimate_request_bytes(file_path: str) -> int:
+    """Estimated peak memory of one sync call for a file, in bytes."""
+    try:
+        size = input_size(file_path)
+    except OSError:
+        size = 0
+    return int(size * (REQUEST_COPIES + RESPONSE_RATIO)) + REQUEST_OVERHEAD
+
+
+def iter_input_files(
+    inputs: Iterable[str], extensions: Iterable[str] = SUPPORTED_FILE_EXTENSIONS
+) -> Iterator[Tuple[Path, Path]]:
+    """Expand files, directories and archives into (file_path, relative_name) pairs.
+
+    Directories are walked recursively and zip/tar archives are listed, both
+    filtered by extension; the relative name of a file found in a directory
+    is its path inside it, that of an archive member is the archive's name
+    joined with the member's path. Archive members are yielded as member
+    keys, read from the archive without extracting it.
+    """
+    extensions = set(extensions)
+    for item in inputs:
+        path = Path(item)
+        if is_archive(path):
+            for key, _ in list_members(path, extensions):
+                _, name = split_member_key(key)
+                yield Path(key), Path(path.name) / name
+        elif path.is_dir():
+            for root, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    file_path = Path(root) / filename
+                    if file_path.suffix.lower().lstrip(".") in extensions:
+                        yield file_path, file_path.relative_to(path)
+        else:
+            yield path, Path(path.name)
+
+
+class RateLimiter:
+    """Token bucket limiting calls to ``rate`` per second."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self._rate = rate
+        self._capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self._rate
+            time.sleep(delay)
+
+
+class BulkRunner:
+    """Run an AnyParser call over many files concurrently.
+
+    ``func`` takes a file path and returns ``(result, timing_info)`` like the
+    AnyParser methods, where an empty timing_info marks an error. Results
+    are yielded as they complete. Byte-identical files are processed once
+    and the result is fanned out to every copy.
+
+    Each file gets ``timeout`` seconds. Cancelling ``cancel_token`` stops
+    the run: no new files are started and in-flight calls stop at their
+    next checkpoint. An interrupt (e.g. Ctrl-C) or closing the result
+    iterator early stops the run the same way.
+
+    With a ``limiter`` the number of concurrent calls adapts to the
+    server's latency and overload errors, up to ``max_workers``; its
+    final state is reported in ``stats.concurrency``.
+
+    With a ``memory_budget`` a file is only started once its estimated
+    memory (``estimate_request_bytes``) fits in the budget, so a few large
+    files run at lower concurrency than many small ones. The peak is
+    reported in ``stats.memory``.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[str], Tuple[Any, str]],
+        max_workers: int = MAX_WORKERS,
+        rate_limit: Optional[float] = None,
+        dedupe: bool = True,
+        progress: Optional[Callable[[BulkResult, int, int], None]] = None,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        memory_budget: Optional[ByteBudget] = None,
+    ) -> None:
+        self._func = func
+        self._max_workers = max_workers
+        self._rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self._dedupe = dedupe
+        self._progress = progress
+        self._timeout = timeout
+        self._cancel_token = cancel_token
+        self._limiter = limiter
+        self._memory_budget = memory_budget
+        self._run_token = CancellationToken()
+        self.stats = BulkStats()
+
+    def _call(self, file_path: str, nbytes: int = 0) -> BulkResult:
+        try:
+            return self._timed_call(file_path)
+        finally:
+            if self._memory_budget is not None:
+                self._memory_budget.release(nbytes)
+
+    def _timed_call(self, file_path: str) -> BulkResult:
+        start_time = time.time()
+        try:
+            with deadline(self._timeout, self._run_token):
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire()
+                check_deadline()
+                limit = self._limiter.slot() if self._limiter else nullcontext()
+                with limit as slot:
+                    start_time = time.time()
+                    result, timing_info = self._func(file_path)
+                    if slot is not None and not timing_info:
+                        slot.fail(overloaded=is_overload_error(str(result)))
+            error = None if timing_info else str(result)
+        except Exception as e:
+            result, error = None, f"Error: {e}"
+        return BulkResult(
+            file_path=file_path,
+            result=None if error else result,
+            error=error,
+            elapsed=time.time() - start_time,
+        )
+
+    def _groups(self, file_paths: List[str]) -> List[List[str]]:
+        """Group paths by content; unreadable files get their own group."""
+        if not self._dedupe:
+            return [[file_path] for file_path in file_paths]
+
+        def digest(file_path: str) -> str:
+            try:
+                return file_sha256(file_path)
+            except OSError:
+                return f"unreadable:{file_path}"
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            digests = list(executor.map(digest, file_paths))
+        groups: Dict[str, List[str]] = {}
+        for key, file_path in zip(digests, file_paths):
+            groups.setdefault(key, []).append(file_path)
+        return list(groups.values())
+
+    def run(self, file_paths: Iterable[str]) -> Iterator[BulkResult]:
+        """Process the files and yield a BulkResult per file as it completes."""
+        file_paths = [str(file_path) for file_path in file_paths]
+        total = len(file_paths)
+        self.stats = BulkStats()
+        latencies: List[float] = []
+        start_time = time.time()
+        groups = self._groups(file_paths)
+
+        def finish(result: BulkResult) -> BulkResult:
+            self.stats.files += 1
+            if result.ok:
+                self.stats.succeeded += 1
+            else:
+                self.stats.failed += 1
+            if result.duplicate_of:
+                self.stats.duplicates += 1
+            else:
+                latencies.append(result.elapsed)
+            if self._progress is not None:
+                self._progress(result, self.stats.files, total)
+            return result
+
+        def collect(done) -> Iterator[BulkResult]:
+            for future in done:
+                paths = in_flight.pop(future)
+                reserved.pop(future, None)
+                result = future.result()
+                yield finish(result)
+                for duplicate in paths[1:]:
+                    yield finish(
+                        result.model_copy(
+                            update={
+                                "file_path": duplicate,
+                                "duplicate_of": result.file_path,
+                            }
+                        )
+                    )
+
+        self._run_token = run_token = CancellationToken()
+        remove = (
+            self._cancel_token.add_callback(run_token.cancel)
+            if self._cancel_token is not None
+            else None
+        )
+        in_flight = {}
+        reserved: Dict[Future, int] = {}
+        executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        try:
+            for paths in groups:
+                # Bound the number of queued futures to keep memory flat
+                while len(in_flight) >= 2 * self._max_workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+                if run_token.cancelled:
+                    break
+                nbytes = 0
+                if self._memory_budget is not None:
+                    nbytes = estimate_request_bytes(paths[0])
+                    # Wait for running calls to free enough of the budget
+                    while in_flight and not self._memory_budget.try_acquire(nbytes):
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        yield from collect(done)
+                    if not in_flight:
+                        # Shared budget held by others: block until it fits
+                        self._memory_budget.acquire(nbytes)
+                future = run_in_context(executor, self._call, paths[0], nbytes)
+                in_flight[future] = paths
+                reserved[future] = nbytes
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+        except BaseException:
+            # Interrupted or closed early: stop the outstanding calls
+            run_token.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if self._memory_budget is not None:
+                # Calls cancelled before they started never release their bytes
+                for future, nbytes in reserved.items():
+                    if future.cancelled():
+                        self._memory_budget.release(nbytes)
+            if remove is not None:
+                remove()
+
+        wall_time = time.time() - start_time
+        self.stats.wall_time = wall_time
+        self.stats.throughput = self.stats.files / wall_time if wall_time else 0.0
+        self.stats.latency_p50 = percentile(latencies, 0.5)
+        self.stats.latency_p95 = percentile(latencies, 0.95)
+        self.stats.latency_max = max(latencies, default=0.0)
+        if self._limiter is not None:
+            self.stats.concurrency = self._limiter.metrics()
+        if self._memory_budget is not None:
+            self.stats.memory = self._memory_budget.metrics()
+        logger.info(f"Bulk run finished: {self.stats}")
+
+
+# Blocks are created in one process and unlinked by the reader in another,
+# so the creator must not leave them to its resource tracker.
+_UNTRACKED = {"track": False} if sys.version_info >= (3, 13) else {}
+
+
+def _to_shared_memory(data: bytes) -> Tuple[str, int]:
+    """Copy bytes into a new shared memory block; the reader unlinks it."""
+    block = shared_memory.SharedMemory(
+        create=True, size=max(1, len(data)), **_UNTRACKED
+    )
+    if not _UNTRACKED:
+        resource_tracker.unregister(block._name, "shared_memory")
+    block.buf[: len(data)] = data
+    name = block.name
+    block.close()
+    return name, len(data)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    return shared_memory.SharedMemory(name=name, **_UNTRACKED)
+
+
+def _release(block: shared_memory.SharedMemory) -> None:
+    block.close()
+    block.unlink()
+
+
+def _discard(name: str) -> None:
+    """Unlink a block unless its reader already did, e.g. after it failed."""
+    try:
+        _release(_attach(name))
+    except FileNotFoundError:
+        pass
+
+
+def _prepare_payload(
+    file_path: str,
+    file_type: str,
+    payload_args: Optional[Dict[str, Any]],
+    image_options: Optional[ImagePreprocessOptions],
+) -> Tuple[str, int]:
+    """Worker process: read, preprocess, encode and serialize a request body.
+
+    Returns:
+        tuple: (shared_memory_name, size) of the JSON request body
+    """
+    with open_input(file_path) as file:
+        data = file.read()
+    if image_options is not None and file_type in IMAGE_FILE_TYPES:
+        # The worker processes are the pool
+        preprocessor = ImagePreprocessor(image_options, max_workers=None)
+        data = preprocessor.process(data, file_type)
+    body = encode_json_payload(base64.b64encode(data), file_type, payload_args)
+    return _to_shared_memory(body)
+
+
+def _decode_result(
+    name: str,
+    size: int,
+    result_key: str,
+    postprocess: Optional[Callable[[Any], Any]],
+) -> Any:
+    """Worker process: decode a response body and post-process the result."""
+    block = _attach(name)
+    try:
+        response = json.loads(bytes(block.buf[:size]))
+    finally:
+        _release(block)
+    result = response.get(result_key, "")
+    return postprocess(result) if postprocess is not None else result
+
+
+class ProcessPoolRunner(BulkRunner):
+    """BulkRunner that runs the CPU-bound stages in worker processes.
+
+    Reading, image preprocessing, base64 encoding and JSON serialization of
+    each request, and decoding and post-processing of each response (e.g.
+    HTML to CSV), run in a pool of ``processes``. Only the HTTP calls stay
+    on the ``max_workers`` I/O threads. Bodies are passed between them
+    through shared memory and posted without another copy.
+
+    ``postprocess`` must be picklable, e.g. a module-level function or a
+    ``functools.partial`` of one. Workers are started with ``mp_context``,
+    the platform default if None; with "spawn" or "forkserver" the calling
+    script needs an ``if __name__ == "__main__"`` guard.
+    """
+
+    def __init__(
+        self,
+        parser: BaseSyncParser,
+        extract_args: Optional[Dict[str, Any]] = None,
+        postprocess: Optional[Callable[[Any], Any]] = None,
+        processes: Optional[int] = None,
+        image_options: Optional[ImagePreprocessOptions] = None,
+        max_file_size_mb: Optional[float] = None,
+        mp_context=None,
+        **kwargs,
+    ) -> None:
+        super().__init__(self._process_file, **kwargs)
+        self._parser = parser
+        self._payload_args = parser.payload_args(extract_args)
+        self._postprocess = postprocess
+        self._processes = processes or os.cpu_count() or 1
+        self._image_options = image_options
+        self._max_file_size_mb = max_file_size_mb
+        self._mp_context = mp_context
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _process_file(self, file_path: str) -> Tuple[Any, str]:
+        is_valid, error_message = validate_file_inputs(
+            file_path, None, None, self._max_file_size_mb
+        )
+        if not is_valid:
+            return error_message, ""
+        file_type = Path(file_path).suffix.lower().lstrip(".")
+
+        name, size = self._pool.submit(
+            _prepare_payload,
+            file_path,
+            file_type,
+            self._payload_args,
+            self._image_options,
+        ).result()
+        block = _attach(name)
+        try:
+            body = block.buf[:size]
+            try:
+                response, info = self._parser.post_payload(self._parser.url, body)
+            finally:
+                body.release()
+        finally:
+            _release(block)
+        if response is None:
+            return info, ""
+
+        name, size = _to_shared_memory(response.content)
+        try:
+            result = self._pool.submit(
+                _decode_result, name, size, self._parser.result_key, self._postprocess
+            ).result()
+        except BaseException:
+            # The worker may have failed before attaching, e.g. when the
+            # postprocess function cannot be pickled
+            _discard(name)
+            raise
+        return result, info
+
+    def run(self, file_paths: Iterable[str]) -> Iterator[BulkResult]:
+        with ProcessPoolExecutor(
+            max_workers=self._processes, mp_context=self._mp_context
+        ) as pool:
+            self._pool = pool
+            try:
+                yield from super().run(file_paths)
+            finally:
+                self._pool = None
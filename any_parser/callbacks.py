@@ -0,0 +1,151 @@
+"""Local HTTP receiver for job-completion callbacks.
+
+Jobs submitted with a callback URL are reported by the server when they
+finish, so they do not have to be polled. Every job gets its own
+unguessable URL, registered before the job is sent: a notification for a
+job that has not returned its ID yet still finds it, and notifications
+for unknown URLs are rejected.
+
+A notification body is a JSON job status, as returned by
+``get_job_status``. A body without a ``status`` only signals that the
+job changed; its status is then fetched once.
+"""
+
+import json
+import logging
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+# Jobs waiting for a callback are still polled this often
+CALLBACK_POLL_INTERVAL = 60
+MAX_NOTIFICATION_BYTES = 16 * 1024 * 1024
+CALLBACK_PATH = "/any-parser/jobs/"
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(format % args)
+
+    def _reply(self, code: int) -> None:
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self) -> None:
+        receiver = self.server.receiver
+        key = (
+            self.path[len(CALLBACK_PATH) :]
+            if self.path.startswith(CALLBACK_PATH)
+            else ""
+        )
+        handler = receiver._handler(key)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if handler is None:
+            receiver._count("rejected")
+            return self._reply(404)
+        if not 0 <= length <= MAX_NOTIFICATION_BYTES:
+            receiver._count("rejected")
+            return self._reply(413)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("notification is not a JSON object")
+        except ValueError:
+            receiver._count("rejected")
+            return self._reply(400)
+        receiver._count("notifications")
+        self._reply(200)
+        try:
+            handler(body)
+        except Exception as e:
+            logger.error(f"Callback handler failed: {e}")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, receiver: "CallbackReceiver") -> None:
+        super().__init__(address, _Handler)
+        self.receiver = receiver
+
+
+class CallbackReceiver:
+    """HTTP listener resolving jobs from completion notifications.
+
+    Pass one to ``AnyParser(callbacks=...)``; jobs from the submit_*
+    methods are then sent with a callback URL and polled only every
+    ``poll_interval`` seconds as a safety net.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on; 0 picks a free port
+        public_url: Base URL under which the server reaches this listener
+            (e.g. behind a proxy or tunnel); defaults to the listening address
+        poll_interval: Seconds between safety-net polls of a job
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        public_url: Optional[str] = None,
+        poll_interval: float = CALLBACK_POLL_INTERVAL,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, Callable[[Dict], None]] = {}
+        self._stats = {"notifications": 0, "rejected": 0}
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="any-parser-callbacks",
+            daemon=True,
+        )
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        self.url = (public_url or f"http://{host}:{port}").rstrip("/")
+
+    def register(self, handler: Callable[[Dict], None]) -> str:
+        """Route notifications to ``handler`` and return their callback URL."""
+        key = secrets.token_urlsafe(16)
+        with self._lock:
+            self._handlers[key] = handler
+        return f"{self.url}{CALLBACK_PATH}{key}"
+
+    def unregister(self, callback_url: str) -> None:
+        """Stop accepting notifications for a callback URL."""
+        with self._lock:
+            self._handlers.pop(callback_url.rsplit("/", 1)[-1], None)
+
+    def _handler(self, key: str) -> Optional[Callable[[Dict], None]]:
+        with self._lock:
+            return self._handlers.get(key)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Notifications accepted and rejected, and jobs waiting for one."""
+        with self._lock:
+            return dict(self._stats, waiting=len(self._handlers))
+
+    def close(self) -> None:
+        """Stop listening."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "CallbackReceiver":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,262 @@
+"""Per-endpoint circuit breakers that fail fast while an endpoint is degraded.
+
+A breaker watches the outcome of the last ``window`` calls to one
+endpoint. When at least ``min_calls`` were made and the share of failed
+(timeouts, connection errors, 5xx/429) or slow calls reaches its
+threshold, the breaker opens and calls fail immediately with CircuitOpen
+instead of waiting for a timeout. After ``open_seconds`` it lets
+``half_open_probes`` calls through; if they succeed it closes again,
+otherwise it stays open for another period.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from enum import Enum
+from typing import ContextManager, Deque, Dict, Iterator, Optional, Tuple
+
+import requests
+from pydantic import BaseModel
+
+from any_parser.deadline import Cancelled, current_deadline
+
+logger = logging.getLogger(__name__)
+
+# Error prefix of sync calls rejected by an open breaker
+CIRCUIT_OPEN_ERROR = "Error: Circuit open"
+
+
+def is_failure_status(status_code: int) -> bool:
+    """Whether a response status means the endpoint is degraded."""
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        super().__init__(
+            f"Circuit open for {endpoint}; retry in {max(retry_after, 0.0):.1f}s"
+        )
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class BreakerStats(BaseModel):
+    """
+    State and counters of one CircuitBreaker.
+    """
+
+    state: BreakerState
+    calls: int = 0
+    failures: int = 0
+    slow_calls: int = 0
+    rejected: int = 0
+    opened: int = 0
+    failure_rate: float = 0.0
+    slow_call_rate: float = 0.0
+
+
+class Call:
+    """One call let through by a breaker; mark it before it ends."""
+
+    def __init__(self, probe_generation: Optional[int]) -> None:
+        self.failed = False
+        self.neutral = False
+        self.probe_generation = probe_generation
+
+    def fail(self) -> None:
+        self.failed = True
+
+
+class CircuitBreaker:
+    """Open on high error or slow-call rates, probe before closing again."""
+
+    def __init__(
+        self,
+        name: str = "",
+        window: int = 20,
+        min_calls: int = 5,
+        failure_threshold: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ) -> None:
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_threshold = slow_call_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        # (failed, slow) for the most recent calls
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = BreakerState.CLOSED
+        self._opened_at = 0.0
+        # Bumped on every transition so late results of old probes are ignored
+        self._generation = 0
+        self._probes = 0
+        self._probe_successes = 0
+        self._stats = BreakerStats(state=BreakerState.CLOSED)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> BreakerState:
+        if (
+            self._state == BreakerState.OPEN
+            and time.monotonic() >= self._opened_at + self.open_seconds
+        ):
+            self._transition(BreakerState.HALF_OPEN)
+        return self._state
+
+    def allows(self) -> bool:
+        """Whether a call would be let through now (without taking a probe)."""
+        with self._lock:
+            state = self._current_state()
+            return state == BreakerState.CLOSED or (
+                state == BreakerState.HALF_OPEN and self._probes < self.half_open_probes
+            )
+
+    def acquire(self) -> Call:
+        """Let a call through or raise CircuitOpen."""
+        with self._lock:
+            state = self._current_state()
+            if state == BreakerState.CLOSED:
+                return Call(None)
+            if state == BreakerState.HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return Call(self._generation)
+            self._stats.rejected += 1
+            retry_after = self._opened_at + self.open_seconds - time.monotonic()
+        raise CircuitOpen(self.name, retry_after)
+
+    def release(self, call: Call, latency: float) -> None:
+        """Record the outcome of a call returned by ``acquire``."""
+        with self._lock:
+            is_probe = (
+                call.probe_generation is not None
+                and call.probe_generation == self._generation
+            )
+            if is_probe:
+                self._probes -= 1
+            if call.neutral:
+                return
+            slow = latency >= self.slow_call_seconds
+            self._stats.calls += 1
+            self._stats.failures += call.failed
+            self._stats.slow_calls += slow
+            if is_probe:
+                if call.failed or slow:
+                    self._transition(BreakerState.OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(BreakerState.CLOSED)
+            elif self._state == BreakerState.CLOSED:
+                self._outcomes.append((call.failed, slow))
+                self._check_rates()
+
+    @contextmanager
+    def guard(self) -> Iterator[Call]:
+        """Run the enclosed request through the breaker.
+
+        Timeouts and connection errors count as failures, unless the
+        caller's own deadline ran out or the call was cancelled.
+        """
+        call = self.acquire()
+        start_time = time.monotonic()
+        try:
+            yield call
+        except Cancelled:
+            call.neutral = True
+            raise
+        except (requests.Timeout, requests.ConnectionError):
+            active = current_deadline()
+            if active is not None and active.expired:
+                call.neutral = True
+            else:
+                call.fail()
+            raise
+        except BaseException:
+            call.neutral = True
+            raise
+        finally:
+            self.release(call, time.monotonic() - start_time)
+
+    def _check_rates(self) -> None:
+        if len(self._outcomes) < self.min_calls:
+            return
+        failure_rate = sum(f for f, _ in self._outcomes) / len(self._outcomes)
+        slow_rate = sum(s for _, s in self._outcomes) / len(self._outcomes)
+        self._stats.failure_rate = failure_rate
+        self._stats.slow_call_rate = slow_rate
+        if (
+            failure_rate >= self.failure_threshold
+            or slow_rate >= self.slow_call_threshold
+        ):
+            self._transition(BreakerState.OPEN)
+
+    def _transition(self, state: BreakerState) -> None:
+        logger.warning(f"Circuit for {self.name}: {self._state.value} -> {state.value}")
+        self._state = state
+        self._generation += 1
+        self._probes = 0
+        self._probe_successes = 0
+        if state == BreakerState.OPEN:
+            self._opened_at = time.monotonic()
+            self._stats.opened += 1
+        elif state == BreakerState.CLOSED:
+            self._outcomes.clear()
+
+    def stats(self) -> BreakerStats:
+        with self._lock:
+            return self._stats.model_copy(update={"state": self._current_state()})
+
+
+class CircuitBreakerRegistry:
+    """One CircuitBreaker per endpoint URL, created on first use.
+
+    Keyword arguments are passed to every CircuitBreaker. Share one
+    registry between clients that call the same endpoints.
+    """
+
+    def __init__(self, **options) -> None:
+        self._options = options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, **self._options)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def allows(self, endpoint: str) -> bool:
+        return self.get(endpoint).allows()
+
+    def stats(self) -> Dict[str, BreakerStats]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {endpoint: breaker.stats() for endpoint, breaker in breakers.items()}
+
+
+def guarded(
+    breakers: Optional[CircuitBreakerRegistry], endpoint: str
+) -> ContextManager[Optional[Call]]:
+    """The breaker guard for ``endpoint``, or a no-op without a registry."""
+    return breakers.get(endpoint).guard() if breakers is not None else nullcontext()
@@ -0,0 +1,395 @@
+"""Command-line interface for bulk parsing with AnyParser."""
+
+import argparse
+import functools
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from dotenv import load_dotenv
+
+from any_parser.any_parser import AnyParser, convert_tables
+from any_parser.batch_parser import MAX_WORKERS as UPLOAD_WORKERS
+from any_parser.bulk import (
+    MAX_WORKERS,
+    BulkResult,
+    BulkRunner,
+    ProcessPoolRunner,
+    iter_input_files,
+)
+from any_parser.concurrency import AdaptiveLimiter, ByteBudget
+from any_parser.constants import (
+    PUBLIC_BATCH_BASE_URL,
+    PUBLIC_SHARED_BASE_URL,
+    ProcessType,
+)
+from any_parser.dedup import ContentHashIndex
+from any_parser.extraction_schema import ExtractionSchema
+
+PARSE_MODELS = {
+    "parse": "parse",
+    "pro": "parse_pro",
+    "textract": "parse_textract",
+}
+
+
+def _read_inputs(inputs: List[str]) -> List[str]:
+    """Replace "-" with the paths listed on stdin, one per line."""
+    expanded = []
+    for item in inputs:
+        if item == "-":
+            expanded.extend(line.strip() for line in sys.stdin if line.strip())
+        else:
+            expanded.append(item)
+    return expanded
+
+
+def _output_names(files: Iterable[Tuple[Path, Path]]) -> Dict[str, Path]:
+    """Map each input file to a unique output name.
+
+    Inputs with the same relative name (e.g. ``a/x.pdf`` and ``b/x.pdf``
+    given as two arguments) would overwrite each other's result, so later
+    ones are numbered: ``x~2.pdf``, ``x~3.pdf``, ... Names are compared
+    case-insensitively, as some file systems do.
+    """
+    names: Dict[str, Path] = {}
+    taken = set()
+    for path, name in files:
+        if str(path) in names:
+            continue
+        unique, number = name, 1
+        while unique.as_posix().casefold() in taken:
+            number += 1
+            unique = name.with_name(f"{name.stem}~{number}{name.suffix}")
+        if unique != name:
+            print(
+                f"{path}: output name {name} is taken, writing {unique}",
+                file=sys.stderr,
+            )
+        taken.add(unique.as_posix().casefold())
+        names[str(path)] = unique
+    return names
+
+
+def _output_text(command: str, result: Any) -> str:
+    if isinstance(result, str):
+        return result
+    if command == "parse" and isinstance(result, list):
+        return "\n".join(str(item) for item in result)
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+
+def _output_suffix(args: argparse.Namespace) -> str:
+    if args.command == "parse":
+        return ".md"
+    if args.command == "extract-tables":
+        return f".{args.return_type}"
+    return ".json"
+
+
+def _load_instruction(instruction: str) -> ExtractionSchema:
+    if instruction.startswith("@"):
+        with open(instruction[1:], "r", encoding="utf-8") as file:
+            instruction = file.read()
+    return ExtractionSchema(json.loads(instruction))
+
+
+def _build_call(ap: AnyParser, args: argparse.Namespace) -> Callable[[str], Any]:
+    if args.command == "parse":
+        method = getattr(ap, PARSE_MODELS[args.model])
+        if args.model == "textract":
+            return lambda path: method(
+                file_path=path, extract_tables=args.extract_tables
+            )
+        return lambda path: method(file_path=path)
+    if args.command == "extract-tables":
+        return lambda path: ap.extract_tables(
+            file_path=path, return_type=args.return_type
+        )
+    if args.command == "extract-kv":
+        extract_instruction = _load_instruction(args.instruction)
+        return lambda path: ap.extract_key_value(
+            file_path=path, extract_instruction=extract_instruction
+        )
+    return lambda path: ap.extract_pii(file_path=path)
+
+
+def _build_process_runner(
+    ap: AnyParser, args: argparse.Namespace, **kwargs
+) -> ProcessPoolRunner:
+    """Runner that encodes requests and post-processes results in processes."""
+    extract_args, postprocess = None, None
+    if args.command == "parse":
+        process_type = ProcessType(PARSE_MODELS[args.model])
+        if args.model == "textract" and args.extract_tables:
+            extract_args = {"extract_tables": True}
+    elif args.command == "extract-tables":
+        process_type = ProcessType.EXTRACT_TABLES
+        postprocess = functools.partial(convert_tables, return_type=args.return_type)
+    elif args.command == "extract-kv":
+        process_type = ProcessType.EXTRACT_KEY_VALUE
+        extract_args = {"extract_instruction": _load_instruction(args.instruction)}
+    else:
+        process_type = ProcessType.EXTRACT_PII
+    return ProcessPoolRunner(
+        ap.sync_parser(process_type),
+        extract_args=extract_args,
+        postprocess=postprocess,
+        processes=args.processes,
+        **kwargs,
+    )
+
+
+class _Reporter:
+    """Write results to an output directory and/or JSONL, and report progress."""
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        names: Dict[str, Path],
+        jsonl: Optional[TextIO],
+    ) -> None:
+        self._args = args
+        self._names = names
+        self._jsonl = jsonl
+        self._output_dir = Path(args.output_dir) if args.output_dir else None
+
+    def progress(self, result: BulkResult, done: int, total: int) -> None:
+        if self._args.quiet:
+            return
+        status = "ok" if result.ok else "FAILED"
+        if result.duplicate_of:
+            status += " (duplicate)"
+        print(
+            f"[{done}/{total}] {result.file_path} {status} {result.elapsed:.2f}s",
+            file=sys.stderr,
+        )
+
+    def write(self, result: BulkResult) -> None:
+        if self._output_dir is not None and result.ok:
+            name = self._names[result.file_path]
+            output_path = self._output_dir / name.with_name(
+                name.name + _output_suffix(self._args)
+            )
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, "w", encoding="utf-8") as file:
+                file.write(_output_text(self._args.command, result.result))
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps(result.model_dump(), ensure_ascii=False))
+            self._jsonl.write("\n")
+            self._jsonl.flush()
+
+
+def _run_bulk(ap: AnyParser, args: argparse.Namespace) -> int:
+    names = _output_names(iter_input_files(_read_inputs(args.inputs)))
+    if not names:
+        print("No supported input files found", file=sys.stderr)
+        return 1
+
+    jsonl = None
+    if args.jsonl == "-":
+        jsonl = sys.stdout
+    elif args.jsonl:
+        jsonl = open(args.jsonl, "w", encoding="utf-8")
+    if args.output_dir is None and jsonl is None:
+        jsonl = sys.stdout
+
+    reporter = _Reporter(args, names, jsonl)
+    runner_args = dict(
+        max_workers=args.concurrency,
+        rate_limit=args.rate_limit,
+        dedupe=not args.no_dedupe,
+        progress=reporter.progress,
+        timeout=args.timeout,
+    )
+    if args.memory_budget:
+        runner_args["memory_budget"] = ByteBudget(int(args.memory_budget * 2**20))
+    if args.adaptive:
+        runner_args["limiter"] = AdaptiveLimiter(
+            initial_limit=min(MAX_WORKERS, args.concurrency),
+            max_limit=args.concurrency,
+        )
+    if args.processes is not None:
+        runner = _build_process_runner(ap, args, **runner_args)
+    else:
+        runner = BulkRunner(_build_call(ap, args), **runner_args)
+    try:
+        for result in runner.run(names):
+            reporter.write(result)
+    except KeyboardInterrupt:
+        # The runner has stopped its in-flight calls before re-raising
+        print(
+            f"Interrupted after {runner.stats.files} of {len(names)} files",
+            file=sys.stderr,
+        )
+        return 130
+    finally:
+        if jsonl is not None and jsonl is not sys.stdout:
+            jsonl.close()
+
+    stats = runner.stats
+    print(
+        f"{stats.files} files: {stats.succeeded} succeeded, {stats.failed} failed, "
+        f"{stats.duplicates} duplicates in {stats.wall_time:.2f}s "
+        f"({stats.throughput:.2f} files/s); latency p50 {stats.latency_p50:.2f}s, "
+        f"p95 {stats.latency_p95:.2f}s, max {stats.latency_max:.2f}s",
+        file=sys.stderr,
+    )
+    if stats.memory is not None:
+        print(
+            f"Memory budget {stats.memory.max_bytes / 2**20:.0f} MB, "
+            f"peak {stats.memory.peak_bytes / 2**20:.1f} MB estimated in flight",
+            file=sys.stderr,
+        )
+    if stats.concurrency is not None:
+        limiter = stats.concurrency
+        print(
+            f"Concurrency limit {limiter.limit} (peak in flight "
+            f"{limiter.peak_in_flight}, {limiter.increases} increases, "
+            f"{limiter.decreases} decreases, {limiter.overloads} overloads)",
+            file=sys.stderr,
+        )
+    return 1 if stats.failed else 0
+
+
+def _run_batch(ap: AnyParser, args: argparse.Namespace) -> int:
+    if args.batch_command == "upload":
+        if args.adaptive:
+            ap.batches.upload_limiter = AdaptiveLimiter(
+                initial_limit=UPLOAD_WORKERS, max_limit=4 * UPLOAD_WORKERS
+            )
+        hash_index = ContentHashIndex(args.hash_index) if args.hash_index else None
+        response = ap.batches.create(
+            args.path,
+            check_quota=args.check_quota,
+            dedupe=args.dedupe,
+            hash_index=hash_index,
+        )
+        responses = response if isinstance(response, list) else [response]
+        for item in responses:
+            print(item.model_dump_json())
+    elif args.batch_command == "status":
+        for request_id in _read_inputs(args.request_ids):
+            print(ap.batches.retrieve(request_id).model_dump_json())
+    else:
+        print(ap.batches.get_usage().model_dump_json())
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="any-parser", description="Bulk document parsing with AnyParser."
+    )
+    parser.add_argument(
+        "--api-key", help="API key, defaults to the CAMBIO_API_KEY variable"
+    )
+    parser.add_argument("--base-url", default=PUBLIC_SHARED_BASE_URL)
+    parser.add_argument("--batch-url", default=PUBLIC_BATCH_BASE_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bulk = argparse.ArgumentParser(add_help=False)
+    bulk.add_argument(
+        "inputs",
+        nargs="+",
+        help='Files, directories or zip/tar archives to process; "-" reads paths '
+        "from stdin",
+    )
+    bulk.add_argument("-j", "--concurrency", type=int, default=MAX_WORKERS)
+    bulk.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt concurrency to server latency and overload, up to --concurrency",
+    )
+    bulk.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="Start files only while their estimated request memory fits",
+    )
+    bulk.add_argument("--rate-limit", type=float, help="Maximum requests per second")
+    bulk.add_argument("--timeout", type=float, help="Deadline in seconds for each file")
+    bulk.add_argument(
+        "-p",
+        "--processes",
+        type=int,
+        nargs="?",
+        const=0,
+        help="Encode requests and convert results in worker processes "
+        "(default: one per CPU)",
+    )
+    bulk.add_argument("-o", "--output-dir", help="Write one result file per input")
+    bulk.add_argument(
+        "--jsonl", help='Write results as JSON lines to this file ("-" for stdout)'
+    )
+    bulk.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Process byte-identical files separately",
+    )
+    bulk.add_argument("-q", "--quiet", action="store_true", help="No progress output")
+
+    parse = commands.add_parser("parse", parents=[bulk], help="Parse to markdown")
+    parse.add_argument("--model", choices=sorted(PARSE_MODELS), default="parse")
+    parse.add_argument(
+        "--extract-tables",
+        action="store_true",
+        help="Extract tables (textract model only)",
+    )
+    tables = commands.add_parser(
+        "extract-tables", parents=[bulk], help="Extract tables"
+    )
+    tables.add_argument("--return-type", choices=["html", "csv"], default="html")
+    kv = commands.add_parser(
+        "extract-kv", parents=[bulk], help="Extract key-value pairs"
+    )
+    kv.add_argument(
+        "--instruction",
+        required=True,
+        help='JSON object of key descriptions, or "@file.json"',
+    )
+    commands.add_parser("extract-pii", parents=[bulk], help="Extract PII")
+
+    batch = commands.add_parser("batch", help="Batch API")
+    batch_commands = batch.add_subparsers(dest="batch_command", required=True)
+    upload = batch_commands.add_parser(
+        "upload", help="Upload a file, folder or zip/tar archive"
+    )
+    upload.add_argument("path")
+    upload.add_argument("--check-quota", action="store_true")
+    upload.add_argument(
+        "--adaptive",
+        action="store_true",
+        help=f"Adapt concurrent uploads to the server, up to {4 * UPLOAD_WORKERS}",
+    )
+    upload.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Upload byte-identical files once; the copies share its request",
+    )
+    upload.add_argument("--hash-index", help="File remembering uploads across runs")
+    status = batch_commands.add_parser("status", help="Get processing status")
+    status.add_argument(
+        "request_ids", nargs="+", help='Request IDs; "-" reads them from stdin'
+    )
+    batch_commands.add_parser("usage", help="Show page quota")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the ``any-parser`` console script."""
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+    api_key = args.api_key or os.environ.get("CAMBIO_API_KEY")
+    if not api_key:
+        print("CAMBIO_API_KEY is not set", file=sys.stderr)
+        return 2
+    ap = AnyParser(api_key, base_url=args.base_url, batch_url=args.batch_url)
+    if args.command == "batch":
+        return _run_batch(ap, args)
+    return _run_bulk(ap, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""Adaptive concurrency limiting for bulk calls."""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Iterator, List, Optional, Tuple
+
+import requests
+from pydantic import BaseModel
+
+from any_parser.deadline import check_deadline, current_deadline
+
+# Responses that mean the server wants fewer concurrent requests
+OVERLOAD_STATUS = (429, 502, 503, 504)
+MAX_DECISIONS = 100
+
+logger = logging.getLogger(__name__)
+
+
+class ServerBusy(Exception):
+    """Raised for responses with an OVERLOAD_STATUS."""
+
+
+def is_overload_error(message: str) -> bool:
+    """Whether an AnyParser error message reports overload or a timeout."""
+    if not isinstance(message, str) or not message.startswith("Error: "):
+        return False
+    detail = message[len("Error: ") :]
+    return detail.startswith(
+        tuple(str(status) for status in OVERLOAD_STATUS)
+    ) or detail.startswith(("Deadline exceeded", "sync request timed out"))
+
+
+class LimiterMetrics(BaseModel):
+    """
+    Current state and decision counts of an AdaptiveLimiter.
+    """
+
+    limit: int
+    in_flight: int
+    peak_in_flight: int = 0
+    baseline_latency: Optional[float] = None
+    smoothed_latency: Optional[float] = None
+    successes: int = 0
+    errors: int = 0
+    overloads: int = 0
+    increases: int = 0
+    decreases: int = 0
+
+
+class Slot:
+    """One acquired unit of concurrency; mark it before it is released."""
+
+    def __init__(self) -> None:
+        self.ok = True
+        self.overloaded = False
+
+    def fail(self, overloaded: bool = False) -> None:
+        self.ok = False
+        self.overloaded = self.overloaded or overloaded
+
+
+class AdaptiveLimiter:
+    """Limit in-flight calls, adapting the limit to latency and errors.
+
+    Additive increase: the limit grows by about one per limit's worth of
+    successful calls while the limit is in use. Multiplicative decrease:
+    an overload (429/5xx, timeout) multiplies it by ``backoff``.
+    Latency gradient: when the smoothed latency exceeds ``tolerance``
+    times the lowest recent latency, queues are building up at the server
+    and the limit is scaled down by their ratio before errors appear.
+    Decreases happen at most once per smoothed latency, so one burst of
+    slow or failed calls counts once. Errors that are not overload (e.g.
+    invalid files) leave the limit unchanged.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._backoff = backoff
+        self._tolerance = tolerance
+        self._smoothing = smoothing
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._metrics = LimiterMetrics(limit=int(self._limit), in_flight=0)
+        self._decisions: Deque[Tuple[float, int, str]] = deque(maxlen=MAX_DECISIONS)
+        self._lock = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        """Block until a call may start, within the current deadline."""
+        active = current_deadline()
+        with self._lock:
+            while self._in_flight >= int(self._limit):
+                check_deadline()
+                remaining = active.remaining() if active is not None else None
+                self._lock.wait(
+                    0.1 if remaining is None else max(0.0, min(0.1, remaining))
+                )
+            self._in_flight += 1
+            self._metrics.peak_in_flight = max(
+                self._metrics.peak_in_flight, self._in_flight
+            )
+
+    def release(self, latency: float, ok: bool = True, overloaded: bool = False):
+        """Record the outcome of a call started with ``acquire``."""
+        with self._lock:
+            in_use = self._in_flight >= int(self._limit) - 1
+            self._in_flight -= 1
+            if overloaded:
+                self._metrics.overloads += 1
+                self._metrics.errors += 1
+                self._on_overload()
+            elif not ok:
+                self._metrics.errors += 1
+            else:
+                self._metrics.successes += 1
+                self._on_success(latency, in_use)
+            self._lock.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[Slot]:
+        """Hold a slot for the enclosed call.
+
+        Exceptions count as errors; timeouts, connection errors and
+        ServerBusy count as overload.
+        """
+        self.acquire()
+        slot = Slot()
+        start_time = time.monotonic()
+        try:
+            yield slot
+        except (requests.Timeout, requests.ConnectionError, ServerBusy):
+            slot.fail(overloaded=True)
+            raise
+        except BaseException:
+            slot.fail()
+            raise
+        finally:
+            self.release(time.monotonic() - start_time, slot.ok, slot.overloaded)
+
+    def _on_success(self, latency: float, in_use: bool) -> None:
+        metrics = self._metrics
+        if metrics.baseline_latency is None or latency < metrics.baseline_latency:
+            metrics.baseline_latency = latency
+        else:
+            # Let the baseline follow a lasting change in service time
+            metrics.baseline_latency += 0.01 * (latency - metrics.baseline_latency)
+        if metrics.smoothed_latency is None:
+            metrics.smoothed_latency = latency
+        else:
+            metrics.smoothed_latency += self._smoothing * (
+                latency - metrics.smoothed_latency
+            )
+
+        gradient = (
+            self._tolerance * metrics.baseline_latency / metrics.smoothed_latency
+            if metrics.smoothed_latency > 0
+            else 1.0
+        )
+        if gradient < 1:
+            self._decrease(max(gradient, self._backoff), "latency")
+        elif in_use:
+            self._set_limit(self._limit + 1 / self._limit, "increase")
+
+    def _on_overload(self) -> None:
+        self._decrease(self._backoff, "overload")
+
+    def _decrease(self, factor: float, reason: str) -> None:
+        # At most one decrease per round trip, so that the calls already in
+        # flight when the limit dropped do not lower it again
+        window = self._metrics.smoothed_latency or 0.0
+        if time.monotonic() - self._last_decrease < window:
+            return
+        self._last_decrease = time.monotonic()
+        self._set_limit(self._limit * factor, reason)
+
+    def _set_limit(self, limit: float, reason: str) -> None:
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        old = int(self._limit)
+        self._limit = limit
+        if int(limit) == old:
+            return
+        if int(limit) > old:
+            self._metrics.increases += 1
+        else:
+            self._metrics.decreases += 1
+        self._decisions.append((time.time(), int(limit), reason))
+        logger.debug(f"Concurrency limit {old} -> {int(limit)} ({reason})")
+
+    def metrics(self) -> LimiterMetrics:
+        """Snapshot of the current limit and counters."""
+        with self._lock:
+            return self._metrics.model_copy(
+                update={"limit": int(self._limit), "in_flight": self._in_flight}
+            )
+
+    def decisions(self) -> List[Tuple[float, int, str]]:
+        """Recent limit changes as (timestamp, new_limit, reason)."""
+        with self._lock:
+            return list(self._decisions)
+
+
+class BudgetMetrics(BaseModel):
+    """
+    Usage of a ByteBudget.
+    """
+
+    max_bytes: int
+    in_use: int = 0
+    peak_bytes: int = 0
+    admitted: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+
+
+class ByteBudget:
+    """Admit work by its estimated memory instead of counting items.
+
+    ``acquire`` blocks while the reserved bytes plus the new item's would
+    exceed ``max_bytes``. An item larger than the whole budget is admitted
+    once nothing else is in flight, so it runs alone instead of never.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.max_bytes = max_bytes
+        self._metrics = BudgetMetrics(max_bytes=max_bytes)
+        self._lock = threading.Condition()
+
+    def _fits(self, nbytes: int) -> bool:
+        in_use = self._metrics.in_use
+        return in_use == 0 or in_use + nbytes <= self.max_bytes
+
+    def _take(self, nbytes: int) -> None:
+        self._metrics.in_use += nbytes
+        self._metrics.admitted += 1
+        self._metrics.peak_bytes = max(self._metrics.peak_bytes, self._metrics.in_use)
+
+    def try_acquire(self, nbytes: int) -> bool:
+        """Reserve ``nbytes`` if they fit now, without blocking."""
+        with self._lock:
+            if not self._fits(nbytes):
+                return False
+            self._take(nbytes)
+            return True
+
+    def acquire(self, nbytes: int) -> None:
+        """Block until ``nbytes`` fit, within the current deadline."""
+        active = current_deadline()
+        with self._lock:
+            if not self._fits(nbytes):
+                self._metrics.waits += 1
+                start_time = time.monotonic()
+                try:
+                    while not self._fits(nbytes):
+                        check_deadline()
+                        remaining = active.remaining() if active is not None else None
+                        self._lock.wait(
+                            0.1 if remaining is None else max(0.0, min(0.1, remaining))
+                        )
+                finally:
+                    self._metrics.wait_time += time.monotonic() - start_time
+            self._take(nbytes)
+
+    def release(self, nbytes: int) -> None:
+        with self._lock:
+            self._metrics.in_use -= nbytes
+            self._lock.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        """Hold ``nbytes`` of the budget for the enclosed work."""
+        self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def metrics(self) -> BudgetMetrics:
+        with self._lock:
+            return self._metrics.model_copy()
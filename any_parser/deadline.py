@@ -0,0 +1,251 @@
+"""Per-call deadlines and cooperative cancellation.
+
+A deadline set with ``deadline()`` (or the ``timeout``/``cancel_token``
+arguments of the AnyParser methods) applies to everything the call does:
+every HTTP request gets at most the remaining time as its timeout, polling
+sleeps end early, and uploads and downloads check it between chunks. The
+active deadline lives in a context variable, so nested deadlines combine
+and worker threads started through ``run_in_context`` inherit it.
+
+Cancellation is cooperative: a cancelled token stops work at the next
+checkpoint and closes streaming responses registered with it. A request
+already waiting on the server is bounded by the deadline, not interrupted.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, List, Optional
+
+import requests
+
+_current: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar(
+    "any_parser_deadline", default=None
+)
+
+
+class Cancelled(Exception):
+    """Raised when the operation's cancellation token has been cancelled."""
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised when the operation's deadline has passed."""
+
+
+class CancellationToken:
+    """Flag shared by the calls that should stop together, e.g. a bulk run."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancel and run the registered callbacks once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``callback`` on cancellation; returns a function to remove it."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def remove() -> None:
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return remove
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled("Operation cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep until cancelled or timeout; True if cancelled."""
+        return self._event.wait(timeout)
+
+
+class Deadline:
+    """Point in time by which an operation must finish, and its token."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> None:
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        self.cancel_token = cancel_token
+        self._unlink: Callable[[], None] = lambda: None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a time limit."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    @property
+    def stopped(self) -> bool:
+        """Whether the operation was cancelled or ran out of time."""
+        return self.expired or (
+            self.cancel_token is not None and self.cancel_token.cancelled
+        )
+
+    def check(self) -> None:
+        """Raise Cancelled or DeadlineExceeded if the operation must stop."""
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+        if self.expired:
+            raise DeadlineExceeded("Deadline exceeded")
+
+    def timeout(self, default: float) -> float:
+        """Timeout for the next request: default, capped at the time left."""
+        self.check()
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, waking early on cancellation, and raise if the call must stop."""
+        self.check()
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        if self.cancel_token is not None:
+            self.cancel_token.wait(seconds)
+        else:
+            time.sleep(seconds)
+        self.check()
+
+    def combine(
+        self,
+        timeout: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None,
+    ) -> "Deadline":
+        """Nested deadline: the earlier expiry and the inner token, if any."""
+        child = Deadline(timeout, cancel_token or self.cancel_token)
+        if self.expires_at is not None and (
+            child.expires_at is None or self.expires_at < child.expires_at
+        ):
+            child.expires_at = self.expires_at
+        if cancel_token is not None and self.cancel_token is not None:
+            if self.cancel_token.cancelled:
+                cancel_token.cancel()
+            else:
+                # Cancelling the outer token also stops the nested call
+                child._unlink = self.cancel_token.add_callback(cancel_token.cancel)
+        return child
+
+    def close(self) -> None:
+        """Unlink the token from the enclosing deadline's once the call ends."""
+        self._unlink()
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def use_deadline(active: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make ``active`` the deadline of the enclosed code."""
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
+
+
+def new_deadline(
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Deadline:
+    """A Deadline combined with the current one, if any."""
+    parent = _current.get()
+    if parent is None:
+        return Deadline(timeout, cancel_token)
+    return parent.combine(timeout, cancel_token)
+
+
+@contextmanager
+def deadline(
+    timeout: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> Iterator[Deadline]:
+    """Limit the enclosed AnyParser calls to ``timeout`` seconds in total.
+
+    Combines with an enclosing deadline; the earlier one wins.
+    """
+    with use_deadline(new_deadline(timeout, cancel_token)) as active:
+        try:
+            yield active
+        finally:
+            active.close()
+
+
+def request_timeout(default: float) -> float:
+    """Timeout for a request under the current deadline (default if none)."""
+    active = _current.get()
+    return default if active is None else active.timeout(default)
+
+
+def check_deadline() -> None:
+    """Raise if the current call has been cancelled or ran out of time."""
+    active = _current.get()
+    if active is not None:
+        active.check()
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep that respects the current deadline and cancellation."""
+    active = _current.get()
+    if active is None:
+        time.sleep(seconds)
+    else:
+        active.sleep(seconds)
+
+
+@contextmanager
+def closing_on_cancel(response: requests.Response) -> Iterator[requests.Response]:
+    """Close a streaming response as soon as the current call is cancelled."""
+    active = _current.get()
+    if active is None or active.cancel_token is None:
+        yield response
+        return
+    remove = active.cancel_token.add_callback(response.close)
+    try:
+        yield response
+    finally:
+        remove()
+
+
+def iter_checked(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass chunks through, checking the current deadline before each one."""
+    for chunk in chunks:
+        check_deadline()
+        yield chunk
+
+
+def run_in_context(executor: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """Submit ``fn`` so that it runs under the caller's deadline."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,163 @@
+"""Content-hash deduplication of input files."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, Union
+
+from any_parser.archive import open_input
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_WORKERS = 8
+# Rewrite an index file once it has this many lines per live entry
+COMPACT_RATIO = 2
+
+
+def file_sha256(file_path: Union[str, Path]) -> str:
+    """SHA-256 hex digest of a file or archive member, read in chunks."""
+    with open_input(file_path) as file:
+        return stream_sha256(file)
+
+
+def stream_sha256(file: IO[bytes]) -> str:
+    """SHA-256 hex digest of the rest of a binary stream, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def group_by_content(
+    file_paths: Iterable[Union[str, Path]], max_workers: int = MAX_WORKERS
+) -> Dict[str, List[Path]]:
+    """Group files by content hash, preserving input order within groups.
+
+    Files are hashed concurrently; hashlib releases the GIL on large reads.
+
+    Returns:
+        Dict mapping SHA-256 digest to the paths with that content.
+    """
+    paths = [Path(p) for p in file_paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        digests = list(executor.map(file_sha256, paths))
+    groups: Dict[str, List[Path]] = {}
+    for digest, path in zip(digests, paths):
+        groups.setdefault(digest, []).append(path)
+    return groups
+
+
+class ContentHashIndex:
+    """Map of content hash to a previous result, optionally kept on disk.
+
+    With ``index_path`` the index is loaded from and saved to a journal
+    file, so duplicates are also recognised across runs. ``save`` appends
+    the entries put since the last save, one ``[digest, value]`` JSON line
+    each; the file is only rewritten once most of its lines are stale.
+
+    With ``max_entries`` the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        index_path: Optional[Union[str, Path]] = None,
+        max_entries: Optional[int] = None,
+    ) -> None:
+        self._index_path = Path(index_path) if index_path else None
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        # Entries put since the last save
+        self._unsaved: Dict[str, Any] = {}
+        self._lines = 0
+        self._rewrite = False
+        self._lock = threading.Lock()
+        if self._index_path and self._index_path.is_file():
+            self._load()
+
+    def _load(self) -> None:
+        with open(self._index_path, "r", encoding="utf-8") as file:
+            text = file.read()
+        # A line cut off by an interrupted save would swallow the next one
+        self._rewrite = bool(text) and not text.endswith("\n")
+        for line in text.splitlines():
+            try:
+                digest, value = json.loads(line)
+            except ValueError:
+                # Blank, or cut off by an interrupted save
+                continue
+            self._entries[digest] = value
+            self._entries.move_to_end(digest)
+            self._lines += 1
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.max_entries is not None and len(self._entries) > self.max_entries:
+            digest, _ = self._entries.popitem(last=False)
+            self._unsaved.pop(digest, None)
+
+    def get(self, digest: str) -> Optional[Any]:
+        with self._lock:
+            if digest not in self._entries:
+                return None
+            self._entries.move_to_end(digest)
+            return self._entries[digest]
+
+    def put(self, digest: str, value: Any) -> None:
+        with self._lock:
+            self._entries[digest] = value
+            self._entries.move_to_end(digest)
+            self._unsaved[digest] = value
+            self._evict()
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def save(self) -> None:
+        """Append new entries to disk (no-op without index_path)."""
+        with self._lock:
+            if self._index_path is None:
+                self._unsaved.clear()
+                return
+            if not self._unsaved and not self._rewrite:
+                return
+            lines = self._lines + len(self._unsaved)
+            if self._rewrite or lines > COMPACT_RATIO * max(len(self._entries), 1):
+                self._write(self._entries, "w")
+                self._lines = len(self._entries)
+                self._rewrite = False
+            else:
+                self._write(self._unsaved, "a")
+                self._lines = lines
+            self._unsaved.clear()
+
+    def _write(self, entries: Dict[str, Any], mode: str) -> None:
+        text = "".join(
+            json.dumps([digest, value]) + "\n" for digest, value in entries.items()
+        )
+        if mode == "a":
+            with open(self._index_path, "a", encoding="utf-8") as file:
+                file.write(text)
+            return
+        # Replace the file in one step, so readers and crashes see either
+        # the old or the new index; the temporary file is unique per writer
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=self._index_path.name + ".", dir=self._index_path.parent
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self._index_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
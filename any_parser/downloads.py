@@ -0,0 +1,181 @@
+"""Downloads of completed job results.
+
+Results of finished jobs are fetched from their presigned ``result_url``
+by a dedicated pool of threads sharing pooled HTTP connections, so a
+large download does not hold up the status checks of other jobs.
+Results are streamed to a file or into memory, within size limits.
+"""
+
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from any_parser.constants import TIMEOUT
+from any_parser.deadline import (
+    Cancelled,
+    DeadlineExceeded,
+    closing_on_cancel,
+    iter_checked,
+    request_timeout,
+    run_in_context,
+)
+from any_parser.streaming import CHUNK_SIZE, write_json_field
+
+DOWNLOAD_WORKERS = 4
+# Results larger than this are not decoded in memory; pass output_path
+MAX_RESULT_BYTES = 512 * 1024 * 1024
+
+
+class ResultTooLarge(Exception):
+    """A job result exceeds the download size limit."""
+
+
+def _inline_result(result, output_path: Optional[str] = None):
+    if output_path:
+        if "markdown" in result:
+            content = result["markdown"]
+        elif "result" in result:
+            content = result["result"]
+        else:
+            content = result
+        if isinstance(content, list) and all(isinstance(i, str) for i in content):
+            content = "\n".join(content)
+        elif not isinstance(content, str):
+            content = str(content)
+        with open(output_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return output_path
+
+    if "markdown" in result:
+        return result["markdown"]
+    elif "result" in result:
+        return str(result["result"])
+    else:
+        return str(result)
+
+
+def _limited(chunks: Iterable[bytes], max_bytes: Optional[int]) -> Iterator[bytes]:
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        if max_bytes is not None and received > max_bytes:
+            raise ResultTooLarge(f"Job result exceeds {max_bytes} bytes")
+        yield chunk
+
+
+def job_result(
+    job_status: Dict,
+    output_path: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    max_bytes: Optional[int] = None,
+):
+    """Extract the result of a completed job.
+
+    Downloads the presigned ``result_url`` when present and falls back to
+    the inline result if that fails. The download is bounded by the
+    current deadline.
+
+    Args:
+        job_status (Dict): Response of the job status endpoint.
+        output_path (str, optional): If set, the result is streamed into this
+            file and the path is returned.
+        session (requests.Session, optional): Session to download with.
+        max_bytes (int, optional): Raise ResultTooLarge instead of
+            downloading more than this.
+
+    Returns:
+        The markdown (list or str), the stringified result, or output_path.
+    """
+    presigned_url = job_status.get("result_url")
+    if presigned_url:
+        http = session or requests
+        try:
+            with http.get(
+                presigned_url, stream=True, timeout=request_timeout(TIMEOUT)
+            ) as presigned_resp, closing_on_cancel(presigned_resp):
+                presigned_resp.raise_for_status()
+                length = presigned_resp.headers.get("Content-Length")
+                if max_bytes is not None and length and int(length) > max_bytes:
+                    raise ResultTooLarge(
+                        f"Job result of {length} bytes exceeds {max_bytes} bytes"
+                    )
+                chunks = _limited(
+                    iter_checked(presigned_resp.iter_content(CHUNK_SIZE)), max_bytes
+                )
+                if output_path:
+                    write_json_field(chunks, output_path)
+                    return output_path
+                data = b"".join(chunks)
+            return _inline_result(json.loads(data))
+        except (Cancelled, DeadlineExceeded, ResultTooLarge):
+            raise
+        except Exception:
+            # Fall back to inline result if presigned URL fails
+            pass
+
+    return _inline_result(job_status.get("result", {}), output_path)
+
+
+class ResultDownloader:
+    """Pool downloading job results over shared keep-alive connections.
+
+    Args:
+        max_workers: Concurrent downloads
+        max_bytes: Largest result decoded in memory
+        max_file_bytes: Largest result streamed to a file; unlimited if None
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DOWNLOAD_WORKERS,
+        max_bytes: Optional[int] = MAX_RESULT_BYTES,
+        max_file_bytes: Optional[int] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="any-parser-downloads"
+        )
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def _download(self, job_status: Dict, output_path: Optional[str]):
+        with self._lock:
+            self._active += 1
+        try:
+            return job_result(
+                job_status,
+                output_path,
+                session=self._session,
+                max_bytes=self.max_file_bytes if output_path else self.max_bytes,
+            )
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def submit(self, job_status: Dict, output_path: Optional[str] = None) -> Future:
+        """Download a completed job's result in the pool, under the caller's deadline."""
+        return run_in_context(self._executor, self._download, job_status, output_path)
+
+    def fetch(self, job_status: Dict, output_path: Optional[str] = None):
+        """Download a completed job's result and wait for it."""
+        if not job_status.get("result_url"):
+            return _inline_result(job_status.get("result", {}), output_path)
+        return self.submit(job_status, output_path).result()
+
+    def active(self) -> int:
+        """Downloads in progress."""
+        with self._lock:
+            return self._active
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        self._session.close()
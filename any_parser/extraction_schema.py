@@ -0,0 +1,120 @@
+"""Compiled key-value extraction instructions."""
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+PAYLOAD_KEY = "extract_input_key_description_pairs"
+
+Instruction = Union["ExtractionSchema", Dict[str, str], List[Dict[str, str]]]
+
+
+class ExtractionSchema:
+    """Key-value extraction instruction, validated and serialized once.
+
+    Accepts a dict mapping keys to descriptions, or a list of dicts with
+    "key" and "description" fields. The schema is immutable and hashable,
+    and carries its request payload as a pre-serialized JSON fragment, so
+    reusing one schema over many documents costs nothing per document.
+    Pass it anywhere an ``extract_instruction`` is accepted.
+    """
+
+    __slots__ = ("_pairs", "_fragment", "_hash")
+
+    def __init__(self, instruction: Instruction) -> None:
+        if isinstance(instruction, ExtractionSchema):
+            pairs = instruction.pairs
+        else:
+            pairs = _normalize(instruction)
+        self._pairs = pairs
+        self._fragment = json.dumps(self.to_list())
+        self._hash = hash(pairs)
+
+    @classmethod
+    def compile(cls, instruction: Instruction) -> "ExtractionSchema":
+        """Return a schema for the instruction, reusing recent compilations."""
+        if isinstance(instruction, ExtractionSchema):
+            return instruction
+        return _compile(_normalize(instruction))
+
+    @property
+    def pairs(self) -> Tuple[Tuple[str, str], ...]:
+        """(key, description) pairs in order."""
+        return self._pairs
+
+    @property
+    def keys(self) -> List[str]:
+        return [key for key, _ in self._pairs]
+
+    @property
+    def fragment(self) -> str:
+        """JSON text of the key-description pair list sent to the API."""
+        return self._fragment
+
+    def to_list(self) -> List[Dict[str, str]]:
+        return [{"key": key, "description": desc} for key, desc in self._pairs]
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self._pairs)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self._pairs)
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ExtractionSchema):
+            return NotImplemented
+        return self._pairs == other._pairs
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __getstate__(self) -> Tuple[Tuple[str, str], ...]:
+        return self._pairs
+
+    def __setstate__(self, pairs: Tuple[Tuple[str, str], ...]) -> None:
+        self._pairs = pairs
+        self._fragment = json.dumps(self.to_list())
+        self._hash = hash(pairs)
+
+    def __repr__(self) -> str:
+        return f"ExtractionSchema({self.keys!r})"
+
+
+def _normalize(instruction: Any) -> Tuple[Tuple[str, str], ...]:
+    """Validate an instruction and return its (key, description) pairs."""
+    if isinstance(instruction, dict):
+        items = list(instruction.items())
+    elif isinstance(instruction, (list, tuple)):
+        items = []
+        for item in instruction:
+            if not isinstance(item, dict) or "key" not in item:
+                raise ValueError(
+                    "extract_instruction list items must be dicts with "
+                    "'key' and 'description' fields"
+                )
+            items.append((item["key"], item.get("description", "")))
+    else:
+        raise ValueError("extract_instruction must be a dict or list")
+
+    if not items:
+        raise ValueError("extract_instruction must not be empty")
+    seen = set()
+    for key, description in items:
+        if not isinstance(key, str) or not key:
+            raise ValueError(f"Invalid extraction key: {key!r}")
+        if not isinstance(description, str):
+            raise ValueError(f"Description of {key!r} must be a string")
+        if key in seen:
+            raise ValueError(f"Duplicate extraction key: {key!r}")
+        seen.add(key)
+    return tuple(items)
+
+
+@lru_cache(maxsize=128)
+def _compile(pairs: Tuple[Tuple[str, str], ...]) -> ExtractionSchema:
+    schema = ExtractionSchema.__new__(ExtractionSchema)
+    schema.__setstate__(pairs)
+    return schema
@@ -0,0 +1,154 @@
+"""Upload-once file handles reusable across endpoints."""
+
+import json
+import threading
+import time
+from typing import BinaryIO, Dict, Optional, Tuple
+
+import requests
+from pydantic import BaseModel
+
+from any_parser.base_parser import BaseParser
+from any_parser.deadline import request_timeout
+from any_parser.utils import upload_file_to_presigned_url
+
+NO_UPLOAD_URL = (
+    "File handles need a deployment that accepts uploaded files by ID; "
+    "pass its presigned upload endpoint as upload_url"
+)
+TIMEOUT = 60
+# Lifetime of a handle when the server does not say how long it keeps files
+HANDLE_TTL = 3600
+# Handles this close to expiry are treated as expired so requests using
+# them do not race the server-side deletion
+EXPIRY_MARGIN = 60
+
+
+class FileHandle(BaseModel):
+    """
+    Reference to an uploaded file, usable in place of file_path/file_content.
+    """
+
+    file_id: str
+    file_name: str
+    file_type: str
+    size_bytes: int
+    sha256: str
+    page_count: Optional[int] = None
+    uploaded_at: float
+    expires_at: float
+
+    @property
+    def expired(self) -> bool:
+        return time.time() > self.expires_at - EXPIRY_MARGIN
+
+
+class FileHandleRegistry:
+    """Live file handles by content hash and file type.
+
+    Expired handles are dropped on lookup, so a file is uploaded again
+    once the server may have deleted it. Share one registry between
+    clients to share uploads.
+    """
+
+    def __init__(self) -> None:
+        self._handles: Dict[Tuple[str, str], FileHandle] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sha256: str, file_type: str) -> Optional[FileHandle]:
+        with self._lock:
+            handle = self._handles.get((sha256, file_type))
+            if handle is not None and handle.expired:
+                del self._handles[(sha256, file_type)]
+                return None
+            return handle
+
+    def put(self, handle: FileHandle) -> None:
+        with self._lock:
+            self._handles[(handle.sha256, handle.file_type)] = handle
+
+    def purge(self) -> int:
+        """Drop expired handles and return how many were removed."""
+        with self._lock:
+            expired = [key for key, h in self._handles.items() if h.expired]
+            for key in expired:
+                del self._handles[key]
+            return len(expired)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._handles)
+
+
+class FileUploader(BaseParser):
+    """Upload files through the presigned flow and return FileHandles.
+
+    Uploading needs a deployment with this contract; the public API is not
+    assumed to have it, which is why ``upload_url`` has no default:
+
+    1. ``upload_url`` takes a JSON POST of ``{"file_name": ...,
+       "file_type": ...}`` with the API key headers, and answers
+       ``{"fileId": ..., "presignedUrl": {"url": ..., "fields": ...}}``,
+       optionally with ``expiresAt`` (epoch seconds) or ``expiresIn``
+       (seconds; HANDLE_TTL if neither is given).
+    2. ``presignedUrl`` takes a multipart/form-data POST of ``fields``
+       and the file, and answers 204.
+    3. The sync and async endpoints accept ``{"file_id": ...,
+       "file_type": ...}`` in place of ``{"file_content": ...}`` until
+       the file expires.
+
+    Without ``upload_url``, uploads are not available and files are sent
+    inline as base64 content.
+    """
+
+    def __init__(
+        self, api_key: str, base_url: str, upload_url: Optional[str] = None
+    ) -> None:
+        super().__init__(api_key, base_url)
+        self.upload_url = upload_url
+
+    def upload(
+        self,
+        file: BinaryIO,
+        file_name: str,
+        file_type: str,
+        size_bytes: int,
+        sha256: str,
+        page_count: Optional[int] = None,
+    ) -> FileHandle:
+        """Upload a binary stream, reading it in chunks.
+
+        Raises:
+            ValueError: If no upload_url is configured.
+            Exception: If the upload URL cannot be obtained or the upload fails.
+        """
+        if self.upload_url is None:
+            raise ValueError(NO_UPLOAD_URL)
+        response = requests.post(
+            self.upload_url,
+            headers=self._headers,
+            data=json.dumps({"file_name": file_name, "file_type": file_type}),
+            timeout=request_timeout(TIMEOUT),
+        )
+        file_id = upload_file_to_presigned_url(
+            file, response, timeout=TIMEOUT, file_name=file_name, size=size_bytes
+        )
+        if file_id.startswith("Error: "):
+            raise Exception(file_id)
+
+        response_data = response.json()
+        uploaded_at = time.time()
+        if "expiresAt" in response_data:
+            expires_at = float(response_data["expiresAt"])
+        else:
+            expires_at = uploaded_at + float(response_data.get("expiresIn", HANDLE_TTL))
+        return FileHandle(
+            file_id=file_id,
+            file_name=file_name,
+            file_type=file_type,
+            size_bytes=size_bytes,
+            sha256=sha256,
+            page_count=page_count,
+            uploaded_at=uploaded_at,
+            expires_at=expires_at,
+        )
@@ -0,0 +1,225 @@
+"""Hedged requests: race a duplicate against a slow request.
+
+When a request has not completed by the ``percentile`` latency of recent
+requests to the same endpoint, a second identical request is sent and
+whichever succeeds first is used. The hedge budget caps the extra load:
+at most ``budget`` hedges per request on average. The losing request is
+cancelled: its response is closed without reading the body, though a
+request already waiting on the server runs until it answers or times out.
+Attempts run on a bounded pool; while it is full, slow requests are not
+hedged.
+"""
+
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from any_parser.deadline import CancellationToken, deadline
+from any_parser.utils import percentile
+
+T = TypeVar("T")
+
+# Latencies kept per endpoint for the hedge threshold
+LATENCY_HISTORY = 1000
+# Attempts of hedged calls running at once
+MAX_WORKERS = 32
+
+
+class HedgeStats(BaseModel):
+    """
+    Counters of a HedgePolicy and its current threshold per endpoint.
+    """
+
+    requests: int = 0
+    hedged: int = 0
+    hedges_won: int = 0
+    budget_denied: int = 0
+    pool_full: int = 0
+    thresholds: Dict[str, float] = {}
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+
+class _Attempt:
+    """One request of a hedged call, run on the policy's executor."""
+
+    def __init__(self, executor: ThreadPoolExecutor, fn: Callable[[], T]) -> None:
+        self.token = CancellationToken()
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        context = contextvars.copy_context()
+        self.future: Future = executor.submit(context.run, self._run, fn)
+
+    def _run(self, fn: Callable[[], T]) -> T:
+        try:
+            # The attempt's token is linked to the caller's, if any
+            with deadline(cancel_token=self.token):
+                return fn()
+        finally:
+            self.finished_at = time.monotonic()
+
+
+class HedgePolicy:
+    """When and how often to hedge requests.
+
+    Args:
+        percentile: Hedge a request once it is slower than this fraction
+            of recent requests to the same endpoint
+        budget: Maximum hedges per request, averaged over all requests
+        min_samples: Requests to observe per endpoint before hedging
+        min_delay: Never hedge earlier than this many seconds
+        max_workers: Attempts running at once, primaries and hedges
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        max_workers: int = MAX_WORKERS,
+    ) -> None:
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="any-parser-hedge"
+        )
+        self._running = 0
+        self._latencies: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=LATENCY_HISTORY)
+        )
+        self._stats = HedgeStats()
+        self._lock = threading.Lock()
+
+    def delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging a request to ``key``, if enabled yet."""
+        with self._lock:
+            return self._delay(key)
+
+    def _delay(self, key: str) -> Optional[float]:
+        latencies = self._latencies[key]
+        if len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(list(latencies), self.percentile))
+
+    def _take_budget(self) -> bool:
+        if self._stats.hedged + 1 > self.budget * self._stats.requests:
+            self._stats.budget_denied += 1
+            return False
+        self._stats.hedged += 1
+        return True
+
+    def call(
+        self,
+        key: str,
+        fn: Callable[[], T],
+        succeeded: Callable[[T], bool],
+        discard: Callable[[T], None],
+    ) -> T:
+        """Run ``fn``, hedging it with a second call if it is slow.
+
+        Args:
+            key: Endpoint the latency history is kept for
+            fn: The request; called once or twice, concurrently
+            succeeded: Whether a result may win the race; if neither
+                attempt succeeds, the first result (or error) is returned
+            discard: Called with the result of the losing attempt
+        """
+        with self._lock:
+            self._stats.requests += 1
+            delay = self._delay(key)
+        if delay is None:
+            # Still learning the latency distribution: no need for a thread
+            start_time = time.monotonic()
+            result = fn()
+            self._record(key, time.monotonic() - start_time)
+            return result
+
+        primary = self._start(fn)
+        wait([primary.future], timeout=delay)
+        if primary.future.done():
+            return self._finish(key, primary)
+        with self._lock:
+            # Queued behind a full pool, a hedge would not start in time
+            if self._running >= self.max_workers:
+                self._stats.pool_full += 1
+                hedge_allowed = False
+            else:
+                hedge_allowed = self._take_budget()
+        if not hedge_allowed:
+            return self._finish(key, primary)
+
+        hedge = self._start(fn)
+        pending = {primary.future, hedge.future}
+        attempts = {primary.future: primary, hedge.future: hedge}
+        first = winner = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = attempts[future]
+                first = first or attempt
+                if future.exception() is None and succeeded(future.result()):
+                    winner = attempt
+                    break
+        winner = winner or first
+        losers = [attempt for attempt in (primary, hedge) if attempt is not winner]
+        for loser in losers:
+            loser.token.cancel()
+            loser.future.add_done_callback(
+                lambda f: f.exception() is None and discard(f.result())
+            )
+        if winner is hedge:
+            with self._lock:
+                self._stats.hedges_won += 1
+            if not primary.future.done():
+                # The primary took at least this long; leaving it out would
+                # bias the threshold towards fast requests
+                self._record(key, time.monotonic() - primary.started_at)
+        return self._finish(key, winner)
+
+    def _start(self, fn: Callable[[], T]) -> _Attempt:
+        with self._lock:
+            self._running += 1
+        attempt = _Attempt(self._executor, fn)
+        attempt.future.add_done_callback(self._done)
+        return attempt
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._running -= 1
+
+    def _finish(self, key: str, attempt: _Attempt) -> T:
+        if attempt.future.exception() is None:
+            self._record(key, attempt.finished_at - attempt.started_at)
+        return attempt.future.result()
+
+    def _record(self, key: str, latency: float) -> None:
+        with self._lock:
+            self._latencies[key].append(latency)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the attempt threads, after running attempts if ``wait``."""
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> HedgeStats:
+        with self._lock:
+            thresholds = {key: self._delay(key) for key in self._latencies}
+            return self._stats.model_copy(
+                update={
+                    "thresholds": {
+                        key: delay
+                        for key, delay in thresholds.items()
+                        if delay is not None
+                    }
+                }
+            )
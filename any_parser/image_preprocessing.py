@@ -0,0 +1,225 @@
+"""Client-side image downscaling and recompression before upload."""
+
+import io
+import logging
+import math
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from pydantic import BaseModel
+
+IMAGE_FILE_TYPES = ("jpg", "jpeg", "png", "gif")
+MAX_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePreprocessOptions(BaseModel):
+    """
+    Options for image preprocessing.
+
+    The longest side is limited to ``max_dimension`` pixels, or to
+    ``target_dpi * page_size_inches`` if that is smaller. JPEG recompression
+    is rejected if it drops below ``min_psnr`` dB against the resized image.
+    """
+
+    max_dimension: int = 3000
+    target_dpi: Optional[int] = None
+    page_size_inches: float = 11.0
+    jpeg_quality: int = 85
+    min_psnr: float = 35.0
+    strip_metadata: bool = True
+
+
+class PreprocessReport(BaseModel):
+    """
+    Outcome of preprocessing one image.
+    """
+
+    original_bytes: int
+    processed_bytes: int
+    original_size: Tuple[int, int]
+    processed_size: Tuple[int, int]
+    psnr: Optional[float] = None
+    applied: bool = False
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+
+def _psnr(first, second) -> float:
+    from PIL import ImageChops, ImageStat
+
+    diff = ImageChops.difference(first.convert("RGB"), second.convert("RGB"))
+    mse = sum(value**2 for value in ImageStat.Stat(diff).rms) / 3
+    return float("inf") if mse == 0 else 20 * math.log10(255 / math.sqrt(mse))
+
+
+def preprocess_image(
+    data: bytes, file_type: str, options: ImagePreprocessOptions
+) -> Tuple[bytes, PreprocessReport]:
+    """Downscale and recompress an image, keeping its format.
+
+    The original bytes are returned unchanged if the result would not be
+    smaller, if the quality check fails, or for animated GIFs.
+
+    Returns:
+        tuple: (image_bytes, report)
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise ImportError("Please install Pillow to use image preprocessing")
+
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+    report = PreprocessReport(
+        original_bytes=len(data),
+        processed_bytes=len(data),
+        original_size=original_size,
+        processed_size=original_size,
+    )
+    if getattr(image, "is_animated", False):
+        return data, report
+
+    # Apply the EXIF orientation to the pixels; it is removed from the EXIF
+    image = ImageOps.exif_transpose(image)
+    exif = image.getexif()
+
+    limit = options.max_dimension
+    if options.target_dpi:
+        limit = min(limit, int(options.target_dpi * options.page_size_inches))
+    scale = limit / max(image.size)
+    if scale < 1:
+        new_size = (
+            max(1, round(image.width * scale)),
+            max(1, round(image.height * scale)),
+        )
+        image = image.resize(new_size, Image.LANCZOS)
+
+    save_args = {}
+    if not options.strip_metadata:
+        if "icc_profile" in image.info:
+            save_args["icc_profile"] = image.info["icc_profile"]
+        if exif:
+            save_args["exif"] = exif
+
+    psnr = None
+    output = io.BytesIO()
+    if file_type in ("jpg", "jpeg"):
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        for quality in (options.jpeg_quality, 95):
+            output = io.BytesIO()
+            image.save(output, "JPEG", quality=quality, optimize=True, **save_args)
+            psnr = _psnr(image, Image.open(io.BytesIO(output.getvalue())))
+            if psnr >= options.min_psnr:
+                break
+        else:
+            logger.debug(f"Recompression PSNR {psnr:.1f} dB too low, keeping original")
+            report.psnr = psnr
+            return data, report
+    elif file_type == "png":
+        image.save(output, "PNG", optimize=True, **save_args)
+    else:
+        image.save(output, "GIF", optimize=True)
+
+    processed = output.getvalue()
+    report.psnr = psnr
+    if len(processed) >= len(data):
+        return data, report
+
+    report.processed_bytes = len(processed)
+    report.processed_size = image.size
+    report.applied = True
+    return processed, report
+
+
+class ImagePreprocessor:
+    """Run image preprocessing on a shared worker pool and track savings.
+
+    At most ``max_workers`` images are decoded and re-encoded at once,
+    however many threads call ``process``, which bounds the memory of
+    large photos. Pillow releases the GIL while resampling and encoding,
+    so they run in parallel. ``submit`` returns a future so a caller can
+    overlap preprocessing with other work. With ``max_workers=None``
+    images are processed inline in the calling thread, e.g. in worker
+    processes that are already a pool. Images Pillow cannot decode or
+    encode are sent unchanged.
+    """
+
+    def __init__(
+        self,
+        options: Optional[ImagePreprocessOptions] = None,
+        max_workers: Optional[int] = MAX_WORKERS,
+    ) -> None:
+        self.options = options or ImagePreprocessOptions()
+        self._executor = (
+            ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="any-parser-images"
+            )
+            if max_workers
+            else None
+        )
+        self._lock = threading.Lock()
+        self._images = 0
+        self._failed = 0
+        self._original_bytes = 0
+        self._processed_bytes = 0
+
+    @staticmethod
+    def applies_to(file_type: Optional[str]) -> bool:
+        return file_type in IMAGE_FILE_TYPES
+
+    def submit(self, data: bytes, file_type: str) -> "Future[bytes]":
+        """Preprocess in the worker pool; the future resolves to image bytes."""
+        if self._executor is None:
+            future: "Future[bytes]" = Future()
+            try:
+                future.set_result(self._process(data, file_type))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._executor.submit(self._process, data, file_type)
+
+    def process(self, data: bytes, file_type: str) -> bytes:
+        """Preprocess an image, or return it unchanged if that fails."""
+        if self._executor is None:
+            return self._process(data, file_type)
+        return self.submit(data, file_type).result()
+
+    def shutdown(self) -> None:
+        """Stop the worker pool once queued images are done."""
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def _process(self, data: bytes, file_type: str) -> bytes:
+        try:
+            processed, report = preprocess_image(data, file_type, self.options)
+        except ImportError:
+            raise
+        except Exception as e:
+            logger.warning(f"Image preprocessing failed, sending the original: {e}")
+            with self._lock:
+                self._failed += 1
+            return data
+        with self._lock:
+            self._images += 1
+            self._original_bytes += report.original_bytes
+            self._processed_bytes += report.processed_bytes
+        logger.debug(f"Image preprocessing saved {report.bytes_saved} bytes")
+        return processed
+
+    @property
+    def stats(self) -> dict:
+        """Totals over all processed images."""
+        with self._lock:
+            return {
+                "images": self._images,
+                "failed": self._failed,
+                "original_bytes": self._original_bytes,
+                "processed_bytes": self._processed_bytes,
+                "bytes_saved": self._original_bytes - self._processed_bytes,
+            }
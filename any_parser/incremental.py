@@ -0,0 +1,119 @@
+"""Page-level incremental parsing of revised PDFs.
+
+Each page is identified by a digest of its content stream and everything
+it references (fonts, images, annotations), but not of its position in
+the document or of other pages. Results of pages parsed before are taken
+from a local store; only new or changed pages are sent, one page per
+request, and the page results are put back together in document order.
+
+Requires pypdf.
+"""
+
+import hashlib
+import io
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Page results kept by the default, in-memory page store
+PAGE_STORE_ENTRIES = 10000
+# Keys that point from a page to the document around it
+_CONTEXT_KEYS = {"/Parent", "/StructParent", "/StructParents"}
+
+
+def _pypdf():
+    try:
+        import pypdf
+    except ImportError:
+        raise ImportError("Please install pypdf to use incremental parsing")
+    return pypdf
+
+
+def _digest(obj: Any, memo: Dict[Tuple[int, int], bytes], path: Set) -> bytes:
+    """Digest of a PDF object and the objects it references."""
+    generic = _pypdf().generic
+    if isinstance(obj, generic.IndirectObject):
+        key = (obj.idnum, obj.generation)
+        if key in memo:
+            return memo[key]
+        if key in path:
+            # A reference back to an object being hashed (e.g. /P of an
+            # annotation); its content is already covered
+            return b"ref"
+        target = obj.get_object()
+        if isinstance(target, generic.DictionaryObject) and target.get("/Type") in (
+            "/Page",
+            "/Pages",
+        ):
+            # Links to other pages must not make this page depend on them
+            return b"page"
+        path.add(key)
+        memo[key] = _digest(target, memo, path)
+        path.discard(key)
+        return memo[key]
+
+    digest = hashlib.sha256()
+    if isinstance(obj, generic.StreamObject):
+        digest.update(b"stream:")
+        digest.update(obj.get_data())
+    if isinstance(obj, generic.DictionaryObject):
+        digest.update(b"dict:")
+        for key in sorted(obj.keys()):
+            if key in _CONTEXT_KEYS:
+                continue
+            digest.update(key.encode("utf-8"))
+            digest.update(_digest(obj.raw_get(key), memo, path))
+    elif isinstance(obj, generic.ArrayObject):
+        digest.update(b"array:")
+        for item in obj:
+            digest.update(_digest(item, memo, path))
+    elif not isinstance(obj, generic.StreamObject):
+        digest.update(repr(obj).encode("utf-8"))
+    return digest.digest()
+
+
+class PdfPages:
+    """The pages of a PDF, with a content digest per page."""
+
+    def __init__(self, data: bytes) -> None:
+        pypdf = _pypdf()
+        self._reader = pypdf.PdfReader(io.BytesIO(data))
+        memo: Dict[Tuple[int, int], bytes] = {}
+        # The reader copies inherited attributes (resources, page size)
+        # onto every page, so the page tree itself is not followed
+        self.digests: List[str] = [
+            hashlib.sha256(_digest(page, memo, set())).hexdigest()
+            for page in self._reader.pages
+        ]
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def page_pdf(self, index: int) -> bytes:
+        """A one-page PDF with page ``index``."""
+        writer = _pypdf().PdfWriter()
+        writer.add_page(self._reader.pages[index])
+        output = io.BytesIO()
+        writer.write(output)
+        return output.getvalue()
+
+
+def store_key(
+    operation: str, extract_args: Optional[Dict[str, Any]], digest: str
+) -> str:
+    """Key of a page result: the page digest and everything else sent with it."""
+    args = json.dumps(extract_args or {}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{operation}\n{args}\n{digest}".encode("utf-8")).hexdigest()
+
+
+def merge_page_results(results: List[Any]) -> Any:
+    """Put per-page results back together in the shape of a whole-file result.
+
+    Markdown per page (lists) is concatenated; other results are joined as
+    text.
+    """
+    if all(isinstance(result, list) for result in results):
+        return [item for result in results for item in result]
+    return "\n\n".join(
+        "\n\n".join(map(str, result)) if isinstance(result, list) else str(result)
+        for result in results
+    )
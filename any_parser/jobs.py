@@ -0,0 +1,303 @@
+"""Future-based tracking of async jobs."""
+
+import functools
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from any_parser.callbacks import CallbackReceiver
+from any_parser.concurrency import AdaptiveLimiter, ServerBusy
+from any_parser.constants import ProcessType
+from any_parser.deadline import (
+    Cancelled,
+    Deadline,
+    current_deadline,
+    run_in_context,
+    use_deadline,
+)
+from any_parser.downloads import ResultDownloader, job_result
+
+POLL_INTERVAL = 3
+MAX_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["JobPoller", "ParseJob", "as_completed", "job_result", "wait"]
+
+
+class ParseJob(Future):
+    """Future for an async AnyParser job.
+
+    ``result()`` returns what ``AnyParser.async_fetch`` would return for the
+    job; a failed job raises an Exception carrying the server error.
+    Works with ``concurrent.futures.as_completed`` and ``wait``.
+
+    The deadline current at submission bounds the whole job: when it
+    expires or its token is cancelled, polling stops and the job raises
+    DeadlineExceeded or Cancelled.
+    """
+
+    def __init__(
+        self,
+        process_type: ProcessType,
+        file_path: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> None:
+        super().__init__()
+        self.process_type = process_type
+        self.file_path = file_path
+        self.deadline = deadline
+        self.job_id: Optional[str] = None
+        self.callback_url: Optional[str] = None
+        self.submitted_at = time.time()
+        self.completed_at: Optional[float] = None
+        self._remove_callback = None
+        if deadline is not None and deadline.cancel_token is not None:
+            self._remove_callback = deadline.cancel_token.add_callback(
+                lambda: self._finish(error=Cancelled("Operation cancelled"))
+            )
+
+    def _finish(self, result: Any = None, error: Optional[BaseException] = None):
+        with self._condition:
+            if self.done():
+                return
+            if not self.running():
+                # Finished (e.g. cancelled) before it was sent
+                self.set_running_or_notify_cancel()
+            self.completed_at = time.time()
+            if error is not None:
+                self.set_exception(error)
+            else:
+                self.set_result(result)
+        if self._remove_callback is not None:
+            self._remove_callback()
+
+    def __repr__(self) -> str:
+        return (
+            f"<ParseJob {self.process_type.value} job_id={self.job_id} "
+            f"file={self.file_path} state={self._state}>"
+        )
+
+
+class JobPoller:
+    """Background poller that resolves ParseJob futures.
+
+    Submissions run on a small thread pool and every submitted job is
+    polled by a single scheduler thread, which fans status checks out to
+    the same pool. A few threads can therefore keep thousands of jobs in
+    flight.
+
+    With a ``limiter`` the number of concurrent status checks adapts to
+    the server's latency, and polls rejected as overloaded are retried on
+    the next interval instead of failing the job.
+
+    Results of completed jobs are downloaded by ``downloader``, so large
+    results do not tie up the threads checking other jobs.
+
+    With ``callbacks`` each submitted job gets a callback URL, passed to
+    ``send`` as the ``callback_url`` keyword; its completion notification
+    resolves the job, which is polled only every
+    ``callbacks.poll_interval`` seconds in case the notification is lost.
+    """
+
+    def __init__(
+        self,
+        get_job_status: Callable[[str], Dict],
+        poll_interval: float = POLL_INTERVAL,
+        max_workers: int = MAX_WORKERS,
+        limiter: Optional[AdaptiveLimiter] = None,
+        callbacks: Optional[CallbackReceiver] = None,
+        downloader: Optional[ResultDownloader] = None,
+    ) -> None:
+        self._get_job_status = get_job_status
+        self._callbacks = callbacks
+        self._owns_downloader = downloader is None
+        self._downloader = downloader or ResultDownloader()
+        self._poll_interval = poll_interval
+        self._limiter = limiter
+        if limiter is not None:
+            max_workers = max(max_workers, limiter.max_limit)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="any-parser-jobs"
+        )
+        # Heap of (next_poll_time, sequence, job)
+        self._schedule: List[Tuple[float, int, ParseJob]] = []
+        self._sequence = 0
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(
+        self,
+        send: Callable[[], Any],
+        process_type: ProcessType,
+        file_path: Optional[str] = None,
+    ) -> ParseJob:
+        """Run ``send`` (which returns a job ID) in the background and track the job."""
+        if self._closed:
+            raise RuntimeError("JobPoller has been shut down")
+        job = ParseJob(process_type, file_path, current_deadline())
+        if self._callbacks is not None:
+            job.callback_url = self._callbacks.register(
+                functools.partial(self._notified, job)
+            )
+            job.add_done_callback(
+                lambda job: self._callbacks.unregister(job.callback_url)
+            )
+            send = functools.partial(send, callback_url=job.callback_url)
+        run_in_context(self._executor, self._send, job, send)
+        return job
+
+    def track(
+        self,
+        job_id: str,
+        process_type: ProcessType,
+        file_path: Optional[str] = None,
+    ) -> ParseJob:
+        """Start polling an already submitted job and return its ParseJob."""
+        job = ParseJob(process_type, file_path, current_deadline())
+        job.set_running_or_notify_cancel()
+        job.job_id = job_id
+        self._schedule_poll(job, time.time() + self._poll_interval)
+        return job
+
+    def _send(self, job: ParseJob, send: Callable[[], Any]) -> None:
+        with job._condition:
+            if job.done() or not job.set_running_or_notify_cancel():
+                return
+        try:
+            job_id = send()
+        except Exception as e:
+            job._finish(error=e)
+            return
+        # Decorated AnyParser methods report invalid input as (error, "")
+        if isinstance(job_id, tuple):
+            job._finish(error=Exception(job_id[0]))
+            return
+        job.job_id = job_id
+        self._schedule_poll(job, time.time() + self._interval(job))
+
+    def _interval(self, job: ParseJob) -> float:
+        if job.callback_url is not None:
+            return self._callbacks.poll_interval
+        return self._poll_interval
+
+    def _notified(self, job: ParseJob, job_status: Dict) -> None:
+        """Handle a callback notification for ``job``."""
+        if not job.done():
+            run_in_context(self._executor, self._check, job, job_status)
+
+    def _schedule_poll(self, job: ParseJob, when: float) -> None:
+        remaining = job.deadline.remaining() if job.deadline is not None else None
+        if remaining is not None:
+            # Wake up at the deadline to fail the job on time
+            when = min(when, time.time() + max(0.0, remaining))
+        with self._lock:
+            self._sequence += 1
+            heapq.heappush(self._schedule, (when, self._sequence, job))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="any-parser-poller", daemon=True
+                )
+                self._thread.start()
+            self._lock.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._closed and (
+                    not self._schedule or self._schedule[0][0] > time.time()
+                ):
+                    timeout = (
+                        self._schedule[0][0] - time.time() if self._schedule else None
+                    )
+                    self._lock.wait(timeout)
+                if self._closed:
+                    return
+                now = time.time()
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    due.append(heapq.heappop(self._schedule)[2])
+
+            # Each check reschedules its job when it finishes, so a slow
+            # status request does not hold up the jobs due after it
+            for job in due:
+                try:
+                    self._executor.submit(self._check, job)
+                except RuntimeError:
+                    # Shut down while jobs were due
+                    return
+
+    def _check(self, job: ParseJob, notification: Optional[Dict] = None) -> None:
+        """Poll a job, or act on the job status sent in a notification."""
+        if job.done():
+            return
+        if notification is not None and job.job_id is None:
+            # Notified before the submission returned
+            job.job_id = notification.get("job_id")
+        if notification is not None and "status" not in notification:
+            if job.job_id is None:
+                # Still being sent; it is polled once its ID is known
+                return
+            notification = None
+        try:
+            limit = (
+                self._limiter.slot()
+                if self._limiter and notification is None
+                else nullcontext()
+            )
+            with use_deadline(job.deadline), limit:
+                if job.deadline is not None:
+                    job.deadline.check()
+                job_status = notification or self._get_job_status(job.job_id)
+            status = job_status.get("status")
+            if status == "completed":
+                # Downloaded in the download pool, still within the deadline
+                with use_deadline(job.deadline):
+                    download = self._downloader.submit(job_status)
+                download.add_done_callback(functools.partial(self._downloaded, job))
+            elif status == "failed":
+                error_msg = job_status.get("error_message") or job_status.get(
+                    "error", "Job failed"
+                )
+                job._finish(error=Exception(f"Error: {error_msg}"))
+            elif status in ["pending", "processing"]:
+                if notification is None:
+                    self._schedule_poll(job, time.time() + self._interval(job))
+            else:
+                job._finish(error=Exception(f"Unknown status: {status}"))
+        except ServerBusy as e:
+            if self._limiter is None:
+                job._finish(error=e)
+            else:
+                self._schedule_poll(job, time.time() + self._interval(job))
+        except Exception as e:
+            logger.error(f"Failed to poll job {job.job_id}: {str(e)}")
+            job._finish(error=e)
+
+    @staticmethod
+    def _downloaded(job: ParseJob, download: Future) -> None:
+        error = download.exception()
+        if error is not None:
+            logger.error(f"Failed to download result of job {job.job_id}: {error}")
+            job._finish(error=error)
+        else:
+            job._finish(result=download.result())
+
+    def pending(self) -> int:
+        """Number of submitted jobs that are still being polled."""
+        with self._lock:
+            return sum(1 for _, _, job in self._schedule if not job.done())
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop polling. Unfinished jobs are left unresolved."""
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        self._executor.shutdown(wait=wait)
+        if self._owns_downloader:
+            self._downloader.shutdown(wait=wait)
@@ -0,0 +1,465 @@
+"""Local conversion of simple DOCX and PPTX files to markdown.
+
+Born-digital Office files carry their text in the OOXML parts, so
+paragraphs, headings, lists and plain tables can be turned into markdown
+without a request. What cannot be converted faithfully (images, charts,
+embedded objects, text boxes, merged table cells, ...) lowers the
+confidence of the local result; below ``min_confidence`` the document is
+sent to the API as usual.
+"""
+
+import io
+import logging
+import posixpath
+import re
+import threading
+import zipfile
+from typing import Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from pydantic import BaseModel
+
+LOCAL_FILE_TYPES = ("docx", "pptx")
+# Zip members this large are not parsed locally (zip bombs, huge files)
+MAX_PART_BYTES = 20 * 1024 * 1024
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+V = "{urn:schemas-microsoft-com:vml}"
+O = "{urn:schemas-microsoft-com:office:office}"
+M = "{http://schemas.openxmlformats.org/officeDocument/2006/math}"
+CHART = "{http://schemas.openxmlformats.org/drawingml/2006/chart}"
+DIAGRAM = "{http://schemas.openxmlformats.org/drawingml/2006/diagram}"
+
+# Confidence lost for each kind of content the local conversion drops
+PENALTIES = {
+    "no text": 1.0,
+    "images": 0.6,
+    "charts": 0.6,
+    "diagrams": 0.6,
+    "embedded objects": 0.6,
+    "equations": 0.3,
+    "text boxes": 0.3,
+    "nested tables": 0.3,
+    "complex layout": 0.3,
+    "merged table cells": 0.2,
+    "multiple columns": 0.2,
+}
+# Text shapes on one slide beyond which its reading order is a guess
+MAX_SLIDE_SHAPES = 8
+
+logger = logging.getLogger(__name__)
+
+
+class LocalExtractionOptions(BaseModel):
+    """
+    Options for local DOCX/PPTX extraction.
+
+    Documents whose confidence is below ``min_confidence`` go to the API.
+    """
+
+    min_confidence: float = 0.8
+
+
+class LocalExtraction(BaseModel):
+    """
+    Markdown extracted locally (one entry per slide for PPTX) and the
+    content that lowered its confidence.
+    """
+
+    markdown: List[str]
+    confidence: float
+    issues: List[str] = []
+
+
+def _confidence(issues: List[str]) -> float:
+    return max(0.0, 1.0 - sum(PENALTIES[issue] for issue in set(issues)))
+
+
+def _read_xml(archive: zipfile.ZipFile, name: str) -> Optional[ElementTree.Element]:
+    try:
+        info = archive.getinfo(name)
+    except KeyError:
+        return None
+    if info.file_size > MAX_PART_BYTES:
+        raise ValueError(f"{name} is too large to convert locally")
+    return ElementTree.fromstring(archive.read(info))
+
+
+def _escape_cell(text: str) -> str:
+    return text.replace("|", "\\|").replace("\n", " ").strip()
+
+
+def _markdown_table(rows: List[List[str]]) -> str:
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = ["| " + " | ".join(_escape_cell(cell) for cell in rows[0]) + " |"]
+    lines.append("| " + " | ".join("---" for _ in range(width)) + " |")
+    lines += [
+        "| " + " | ".join(_escape_cell(cell) for cell in row) + " |" for row in rows[1:]
+    ]
+    return "\n".join(lines)
+
+
+def _join_blocks(blocks: List[Tuple[str, str]]) -> str:
+    """Join (kind, markdown) blocks; consecutive list items stay together."""
+    output = ""
+    previous = None
+    for kind, text in blocks:
+        if output:
+            output += "\n" if kind == previous == "item" else "\n\n"
+        output += text
+        previous = kind
+    return output
+
+
+def _emphasize(segments: List[Tuple[str, bool, bool]]) -> str:
+    """Markdown for runs of (text, bold, italic), merging equal neighbours."""
+    merged: List[List] = []
+    for text, bold, italic in segments:
+        if merged and merged[-1][1:] == [bold, italic]:
+            merged[-1][0] += text
+        else:
+            merged.append([text, bold, italic])
+    output = ""
+    for text, bold, italic in merged:
+        core = text.strip()
+        marker = ("**" if bold else "") + ("*" if italic else "")
+        if core and marker:
+            lead = text[: len(text) - len(text.lstrip())]
+            trail = text[len(text.rstrip()) :]
+            text = f"{lead}{marker}{core}{marker[::-1]}{trail}"
+        output += text
+    return output.strip()
+
+
+def _is_on(props: Optional[ElementTree.Element], tag: str, ns: str = W) -> bool:
+    if props is None:
+        return False
+    element = props.find(tag)
+    return element is not None and element.get(f"{ns}val") not in ("0", "false")
+
+
+class _Docx:
+    def __init__(self, archive: zipfile.ZipFile) -> None:
+        self.archive = archive
+        self.issues: List[str] = []
+        self.styles: Dict[str, str] = {}
+        styles = _read_xml(archive, "word/styles.xml")
+        if styles is not None:
+            for style in styles.iter(f"{W}style"):
+                name = style.find(f"{W}name")
+                if name is not None:
+                    self.styles[style.get(f"{W}styleId")] = name.get(f"{W}val", "")
+        # numId -> {level: numFmt}
+        self.numbering: Dict[str, Dict[str, str]] = {}
+        numbering = _read_xml(archive, "word/numbering.xml")
+        if numbering is not None:
+            abstract = {
+                item.get(f"{W}abstractNumId"): {
+                    level.get(f"{W}ilvl"): level.find(f"{W}numFmt").get(f"{W}val")
+                    for level in item.iter(f"{W}lvl")
+                    if level.find(f"{W}numFmt") is not None
+                }
+                for item in numbering.iter(f"{W}abstractNum")
+            }
+            for num in numbering.iter(f"{W}num"):
+                abstract_id = num.find(f"{W}abstractNumId")
+                if abstract_id is not None:
+                    self.numbering[num.get(f"{W}numId")] = abstract.get(
+                        abstract_id.get(f"{W}val"), {}
+                    )
+
+    def convert(self) -> LocalExtraction:
+        document = _read_xml(self.archive, "word/document.xml")
+        if document is None:
+            raise ValueError("word/document.xml is missing")
+        self._detect(document)
+        body = document.find(f"{W}body")
+        blocks = self._blocks(body) if body is not None else []
+        markdown = _join_blocks(blocks)
+        if not markdown.strip():
+            self.issues.append("no text")
+        return LocalExtraction(
+            markdown=[markdown],
+            confidence=_confidence(self.issues),
+            issues=sorted(set(self.issues)),
+        )
+
+    def _detect(self, document: ElementTree.Element) -> None:
+        checks = {
+            "images": (f"{A}blip", f"{V}imagedata"),
+            "charts": (f"{CHART}chart",),
+            "diagrams": (f"{DIAGRAM}relIds",),
+            "embedded objects": (f"{W}object", f"{O}OLEObject", f"{W}altChunk"),
+            "text boxes": (f"{W}txbxContent",),
+            "equations": (f"{M}oMath",),
+            "merged table cells": (f"{W}gridSpan", f"{W}vMerge"),
+        }
+        for issue, tags in checks.items():
+            if any(document.find(f".//{tag}") is not None for tag in tags):
+                self.issues.append(issue)
+        if document.find(f".//{W}tc//{W}tbl") is not None:
+            self.issues.append("nested tables")
+        for columns in document.iter(f"{W}cols"):
+            if int(columns.get(f"{W}num", "1")) > 1:
+                self.issues.append("multiple columns")
+
+    def _blocks(self, parent: ElementTree.Element) -> List[Tuple[str, str]]:
+        blocks = []
+        for child in parent:
+            if child.tag == f"{W}p":
+                block = self._paragraph(child)
+                if block is not None:
+                    blocks.append(block)
+            elif child.tag == f"{W}tbl":
+                rows = [
+                    [self._cell_text(cell) for cell in row.findall(f"{W}tc")]
+                    for row in child.findall(f"{W}tr")
+                ]
+                if any(rows):
+                    blocks.append(("table", _markdown_table([r for r in rows if r])))
+            elif child.tag == f"{W}sdt":
+                content = child.find(f"{W}sdtContent")
+                if content is not None:
+                    blocks += self._blocks(content)
+        return blocks
+
+    def _text(self, paragraph: ElementTree.Element) -> str:
+        segments = []
+        for run in paragraph.iter(f"{W}r"):
+            props = run.find(f"{W}rPr")
+            bold, italic = _is_on(props, f"{W}b"), _is_on(props, f"{W}i")
+            for item in run:
+                if item.tag == f"{W}t":
+                    segments.append((item.text or "", bold, italic))
+                elif item.tag in (f"{W}tab", f"{W}br", f"{W}cr"):
+                    segments.append((" ", bold, italic))
+        return _emphasize(segments)
+
+    def _cell_text(self, cell: ElementTree.Element) -> str:
+        return " ".join(text for text in map(self._text, cell.iter(f"{W}p")) if text)
+
+    def _paragraph(self, paragraph: ElementTree.Element) -> Optional[Tuple[str, str]]:
+        text = self._text(paragraph)
+        if not text:
+            return None
+        props = paragraph.find(f"{W}pPr")
+        style_id = ""
+        outline = None
+        numbering = None
+        if props is not None:
+            style = props.find(f"{W}pStyle")
+            style_id = style.get(f"{W}val", "") if style is not None else ""
+            outline = props.find(f"{W}outlineLvl")
+            numbering = props.find(f"{W}numPr")
+        name = self.styles.get(style_id, style_id).lower()
+        match = re.fullmatch(r"heading ?(\d)", name)
+        if name == "title":
+            level = 1
+        elif match:
+            level = int(match.group(1))
+        elif outline is not None:
+            level = int(outline.get(f"{W}val", "0")) + 1
+        else:
+            level = 0
+        if 0 < level <= 9:
+            return "heading", "#" * min(level, 6) + " " + text
+        if numbering is not None:
+            ilvl = numbering.find(f"{W}ilvl")
+            num_id = numbering.find(f"{W}numId")
+            depth = ilvl.get(f"{W}val", "0") if ilvl is not None else "0"
+            formats = self.numbering.get(
+                num_id.get(f"{W}val") if num_id is not None else "", {}
+            )
+            marker = "-" if formats.get(depth, "bullet") == "bullet" else "1."
+            return "item", "  " * int(depth) + f"{marker} {text}"
+        return "paragraph", text
+
+
+class _Pptx:
+    def __init__(self, archive: zipfile.ZipFile) -> None:
+        self.archive = archive
+        self.issues: List[str] = []
+
+    def _slide_names(self) -> List[str]:
+        presentation = _read_xml(self.archive, "ppt/presentation.xml")
+        rels = _read_xml(self.archive, "ppt/_rels/presentation.xml.rels")
+        if presentation is None or rels is None:
+            raise ValueError("ppt/presentation.xml is missing")
+        targets = {
+            rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{PKG}Relationship")
+        }
+        names = []
+        for slide in presentation.iter(f"{P}sldId"):
+            target = targets.get(slide.get(f"{R}id"))
+            if target:
+                names.append(posixpath.normpath(posixpath.join("ppt", target)))
+        return names
+
+    def convert(self) -> LocalExtraction:
+        slides = []
+        for name in self._slide_names():
+            slide = _read_xml(self.archive, name)
+            slides.append(self._slide(slide) if slide is not None else "")
+        if not any(text.strip() for text in slides):
+            self.issues.append("no text")
+        return LocalExtraction(
+            markdown=slides,
+            confidence=_confidence(self.issues),
+            issues=sorted(set(self.issues)),
+        )
+
+    def _slide(self, slide: ElementTree.Element) -> str:
+        tree = slide.find(f"{P}cSld/{P}spTree")
+        if tree is None:
+            return ""
+        titles: List[Tuple[str, str]] = []
+        blocks: List[Tuple[str, str]] = []
+        shapes = self._walk(tree, titles, blocks)
+        if shapes > MAX_SLIDE_SHAPES:
+            self.issues.append("complex layout")
+        return _join_blocks(titles + blocks)
+
+    def _walk(self, tree, titles, blocks) -> int:
+        """Collect the blocks of a shape tree; returns the text shapes seen."""
+        shapes = 0
+        for shape in tree:
+            if shape.tag == f"{P}sp":
+                body = shape.find(f"{P}txBody")
+                if body is None:
+                    continue
+                placeholder = shape.find(f"{P}nvSpPr/{P}nvPr/{P}ph")
+                kind = (
+                    placeholder.get("type", "body") if placeholder is not None else None
+                )
+                paragraphs = self._paragraphs(body, bulleted=kind in ("body", "obj"))
+                if not paragraphs:
+                    continue
+                shapes += 1
+                if kind in ("title", "ctrTitle"):
+                    text = " ".join(text for _, text in paragraphs)
+                    titles.append(("heading", f"# {text.lstrip('- ')}"))
+                else:
+                    blocks += paragraphs
+            elif shape.tag == f"{P}grpSp":
+                shapes += self._walk(shape, titles, blocks)
+            elif shape.tag == f"{P}graphicFrame":
+                shapes += self._graphic_frame(shape, blocks)
+            elif shape.tag == f"{P}pic":
+                self.issues.append("images")
+        return shapes
+
+    def _graphic_frame(self, frame, blocks) -> int:
+        table = frame.find(f".//{A}tbl")
+        if table is not None:
+            if (
+                table.find(f".//{A}tc[@gridSpan]") is not None
+                or table.find(f".//{A}tc[@rowSpan]") is not None
+            ):
+                self.issues.append("merged table cells")
+            rows = [
+                [
+                    " ".join(text for _, text in self._paragraphs(cell, False))
+                    for cell in row.findall(f"{A}tc")
+                ]
+                for row in table.findall(f"{A}tr")
+            ]
+            if any(rows):
+                blocks.append(("table", _markdown_table([r for r in rows if r])))
+            return 1
+        if frame.find(f".//{CHART}chart") is not None:
+            self.issues.append("charts")
+        elif frame.find(f".//{DIAGRAM}relIds") is not None:
+            self.issues.append("diagrams")
+        else:
+            self.issues.append("embedded objects")
+        return 0
+
+    def _paragraphs(self, body, bulleted: bool) -> List[Tuple[str, str]]:
+        paragraphs = []
+        for paragraph in body.iter(f"{A}p"):
+            segments = []
+            for item in paragraph:
+                if item.tag in (f"{A}r", f"{A}fld"):
+                    props = item.find(f"{A}rPr")
+                    bold = props is not None and props.get("b") in ("1", "true")
+                    italic = props is not None and props.get("i") in ("1", "true")
+                    segments.append((item.findtext(f"{A}t") or "", bold, italic))
+                elif item.tag == f"{A}br":
+                    segments.append((" ", False, False))
+            text = _emphasize(segments)
+            if not text:
+                continue
+            props = paragraph.find(f"{A}pPr")
+            level = int(props.get("lvl", "0")) if props is not None else 0
+            explicit = props is not None and (
+                props.find(f"{A}buChar") is not None
+                or props.find(f"{A}buAutoNum") is not None
+            )
+            no_bullet = props is not None and props.find(f"{A}buNone") is not None
+            if explicit or (bulleted and not no_bullet):
+                paragraphs.append(("item", "  " * level + f"- {text}"))
+            else:
+                paragraphs.append(("paragraph", text))
+        return paragraphs
+
+
+def extract_office(data: bytes, file_type: str) -> LocalExtraction:
+    """Convert a DOCX or PPTX file to markdown locally.
+
+    Raises:
+        ValueError: If the file is not a readable DOCX/PPTX.
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            converter = _Docx(archive) if file_type == "docx" else _Pptx(archive)
+            return converter.convert()
+    except (zipfile.BadZipFile, ElementTree.ParseError, KeyError) as e:
+        raise ValueError(f"Cannot read {file_type} file: {e}") from e
+
+
+class LocalExtractor:
+    """Convert simple DOCX/PPTX files locally and count how many qualified."""
+
+    def __init__(self, options: Optional[LocalExtractionOptions] = None) -> None:
+        self.options = options or LocalExtractionOptions()
+        self._lock = threading.Lock()
+        self._local = 0
+        self._remote = 0
+
+    @staticmethod
+    def applies_to(file_type: Optional[str]) -> bool:
+        return file_type in LOCAL_FILE_TYPES
+
+    def extract(self, data: bytes, file_type: str) -> Optional[List[str]]:
+        """Markdown of the document, or None if it should go to the API."""
+        try:
+            extraction = extract_office(data, file_type)
+        except ValueError as e:
+            logger.debug(f"Local extraction failed: {e}")
+            extraction = None
+        local = (
+            extraction is not None
+            and extraction.confidence >= self.options.min_confidence
+        )
+        with self._lock:
+            if local:
+                self._local += 1
+            else:
+                self._remote += 1
+        if extraction is not None and not local:
+            logger.debug(
+                f"Local extraction confidence {extraction.confidence:.2f} "
+                f"({', '.join(extraction.issues)}), sending to the API"
+            )
+        return extraction.markdown if local else None
+
+    @property
+    def stats(self) -> dict:
+        """Documents converted locally and sent to the API."""
+        with self._lock:
+            return {"local": self._local, "remote": self._remote}
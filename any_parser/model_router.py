@@ -0,0 +1,246 @@
+"""Routing of PDFs between the parse models.
+
+A few pages of the document are sampled locally for a text layer, the
+scripts it is written in and how much of each page is covered by images.
+Born-digital Latin-script PDFs go to ``parse``, scanned ones to
+``parse_textract`` and documents in other scripts to ``parse_pro``.
+
+Requires pypdf; without it, and for files that cannot be inspected, the
+default model is used.
+"""
+
+import io
+import logging
+import threading
+import time
+import unicodedata
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from any_parser.constants import ProcessType
+
+# Recent decisions kept for ``ModelRouter.decisions``
+MAX_DECISIONS = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRoutingOptions(BaseModel):
+    """
+    Thresholds of the text-layer classifier and the model for each class.
+    """
+
+    sample_pages: int = 5
+    # Pages with fewer characters of usable text count as scanned
+    min_chars_per_page: int = 100
+    # Pages whose images cover this share of the page count as scanned
+    max_image_coverage: float = 0.5
+    # Share of letters outside the Latin script that needs parse_pro
+    min_other_script_share: float = 0.2
+    text_model: ProcessType = ProcessType.PARSE
+    scanned_model: ProcessType = ProcessType.PARSE_TEXTRACT
+    multilingual_model: ProcessType = ProcessType.PARSE_PRO
+    default_model: ProcessType = ProcessType.PARSE_PRO
+
+
+class PageProfile(BaseModel):
+    """
+    What a sampled page contains.
+    """
+
+    page: int
+    chars: int
+    unreadable_chars: int = 0
+    image_coverage: float = 0.0
+    scripts: Dict[str, int] = {}
+
+
+class ModelDecision(BaseModel):
+    """
+    The model chosen for a document and why.
+    """
+
+    file_path: str = ""
+    process_type: ProcessType
+    reason: str
+    overridden: bool = False
+    pages: List[PageProfile] = []
+    timestamp: float = 0.0
+
+
+def _script(char: str) -> str:
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        return "UNKNOWN"
+    return name.split(" ", 1)[0]
+
+
+def _profile_page(page, index: int) -> PageProfile:
+    width = float(page.mediabox.width) or 1.0
+    height = float(page.mediabox.height) or 1.0
+    xobjects = page.get("/Resources", {}).get("/XObject", {})
+    covered = 0.0
+
+    def visit(operator, operands, matrix, _text_matrix):
+        nonlocal covered
+        if operator != b"Do" or not operands:
+            return
+        try:
+            subtype = xobjects[operands[0]].get_object().get("/Subtype")
+        except (KeyError, AttributeError, TypeError):
+            # Images of form XObjects are not looked up in the page resources
+            subtype = "/Image"
+        if subtype == "/Image":
+            a, b, c, d = matrix[:4]
+            covered += abs(a * d - b * c)
+
+    text = page.extract_text(visitor_operand_before=visit)
+    letters = Counter(_script(char) for char in text if char.isalpha())
+    unreadable = sum(
+        1
+        for char in text
+        if char == "�"
+        or unicodedata.category(char) in ("Co", "Cn")
+        or (unicodedata.category(char) == "Cc" and not char.isspace())
+    )
+    return PageProfile(
+        page=index,
+        chars=len("".join(text.split())),
+        unreadable_chars=unreadable,
+        image_coverage=min(covered / (width * height), 1.0),
+        scripts=dict(letters),
+    )
+
+
+def sample_indices(page_count: int, samples: int) -> List[int]:
+    """Up to ``samples`` page indices spread evenly over the document."""
+    if page_count <= samples:
+        return list(range(page_count))
+    if samples <= 1:
+        return [0]
+    step = (page_count - 1) / (samples - 1)
+    return sorted({round(i * step) for i in range(samples)})
+
+
+def profile_pdf(data: bytes, sample_pages: int = 5) -> List[PageProfile]:
+    """Profiles of up to ``sample_pages`` pages of a PDF."""
+    try:
+        import pypdf
+    except ImportError:
+        raise ImportError("Please install pypdf to use model routing")
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return [
+        _profile_page(reader.pages[index], index)
+        for index in sample_indices(len(reader.pages), sample_pages)
+    ]
+
+
+class ModelRouter:
+    """Choose the parse model for each PDF and keep the recent decisions.
+
+    Share one instance between clients to report their decisions together.
+    """
+
+    def __init__(self, options: Optional[ModelRoutingOptions] = None) -> None:
+        self.options = options or ModelRoutingOptions()
+        self._decisions: Deque[ModelDecision] = deque(maxlen=MAX_DECISIONS)
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _is_scanned(self, page: PageProfile) -> bool:
+        return (
+            page.chars - page.unreadable_chars < self.options.min_chars_per_page
+            or page.unreadable_chars > 0.1 * page.chars
+            or page.image_coverage >= self.options.max_image_coverage
+        )
+
+    def classify(self, pages: List[PageProfile]) -> ModelDecision:
+        """The model for a document with the given page profiles."""
+        options = self.options
+        if not pages:
+            return ModelDecision(
+                process_type=options.default_model, reason="no pages sampled"
+            )
+        letters: Counter = Counter()
+        for page in pages:
+            letters.update(page.scripts)
+        total = sum(letters.values())
+        other = {s: n for s, n in letters.items() if s != "LATIN"}
+        if total and sum(other.values()) >= options.min_other_script_share * total:
+            script = max(other, key=other.get).title()
+            return ModelDecision(
+                process_type=options.multilingual_model,
+                reason=f"{script} script",
+                pages=pages,
+            )
+        scanned = sum(1 for page in pages if self._is_scanned(page))
+        if scanned:
+            return ModelDecision(
+                process_type=options.scanned_model,
+                reason=f"{scanned} of {len(pages)} sampled pages scanned",
+                pages=pages,
+            )
+        return ModelDecision(
+            process_type=options.text_model,
+            reason=f"text layer on {len(pages)} sampled pages",
+            pages=pages,
+        )
+
+    def route(
+        self,
+        data: Optional[bytes],
+        file_type: Optional[str],
+        file_path: str = "",
+        override: Optional[ProcessType] = None,
+    ) -> ModelDecision:
+        """Choose the model for a file and record the decision.
+
+        Args:
+            data: File content, or None if it is not available locally
+            file_type: File format extension
+            file_path: Reported with the decision
+            override: Use this model without inspecting the file
+        """
+        if override is not None:
+            decision = ModelDecision(
+                process_type=override, reason="override", overridden=True
+            )
+        elif data is None or file_type != "pdf":
+            decision = ModelDecision(
+                process_type=self.options.default_model,
+                reason="not a local PDF" if data is None else f"{file_type} file",
+            )
+        else:
+            try:
+                decision = self.classify(profile_pdf(data, self.options.sample_pages))
+            except ImportError:
+                raise
+            except Exception as e:
+                logger.debug(f"Cannot inspect {file_path or 'PDF'}: {e}")
+                decision = ModelDecision(
+                    process_type=self.options.default_model,
+                    reason="unreadable PDF",
+                )
+        decision.file_path = str(file_path or "")
+        decision.timestamp = time.time()
+        with self._lock:
+            self._decisions.append(decision)
+            self._counts[decision.process_type.value] += 1
+        logger.debug(
+            f"Routing {decision.file_path or 'document'} to "
+            f"{decision.process_type.value} ({decision.reason})"
+        )
+        return decision
+
+    def decisions(self) -> List[ModelDecision]:
+        """Recent decisions, oldest first."""
+        with self._lock:
+            return list(self._decisions)
+
+    def stats(self) -> Dict[str, int]:
+        """Documents routed to each model."""
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,431 @@
+"""Fast file inspection before upload.
+
+Page counts, dimensions and sizes are read from file structures (PDF
+trailer and cross-reference data, the zip central directory of DOCX/PPTX
+files, image headers) without loading or decoding the whole file.
+"""
+
+import base64
+import io
+import re
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from typing import IO, Dict, Iterable, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from any_parser.archive import input_size, open_input
+from any_parser.utils import ValidationError
+
+PDF_TAIL_SIZE = 64 * 1024
+PDF_OBJECT_WINDOW = 4 * 1024
+PDF_MAX_OBJECT_SIZE = 1024 * 1024
+PDF_MAX_XREF_SECTIONS = 32
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_TRAILER = re.compile(rb"trailer\s*<<")
+_LINEARIZED_PAGES = re.compile(rb"/Linearized\b.*?/N\s+(\d+)", re.S)
+_XREF_SUBSECTION = re.compile(rb"\s*(\d+)\s+(\d+)[ \t]*(?:\r\n|\r|\n)")
+_PAGE_TYPE = re.compile(rb"/Type\s*/Page(?![s\w])")
+_WHITESPACE = re.compile(rb"\s")
+
+
+class FileInfo(BaseModel):
+    """
+    Result of a file preflight.
+    """
+
+    file_path: str
+    file_type: str
+    size_bytes: int
+    page_count: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def _ref(data: bytes, key: bytes) -> Optional[Tuple[int, int]]:
+    match = re.search(rb"/" + key + rb"\s+(\d+)\s+(\d+)\s+R", data)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _int(data: bytes, key: bytes) -> Optional[int]:
+    match = re.search(rb"/" + key + rb"\s+(\d+)\b(?!\s+\d+\s+R)", data)
+    return int(match.group(1)) if match else None
+
+
+class _PdfReader:
+    """Minimal PDF object locator working from the cross-reference data."""
+
+    def __init__(self, file: IO[bytes], size: int) -> None:
+        self._file = file
+        self._size = size
+        self._sections = []  # Newest first: ("table", offset) or ("stream", dict, data)
+        self._object_streams: Dict[int, Tuple[bytes, Dict[int, int]]] = {}
+
+    def _read(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def _object_at(self, offset: int) -> bytes:
+        """Bytes of the object starting at offset, up to ``endobj``."""
+        window = PDF_OBJECT_WINDOW
+        while True:
+            data = self._read(offset, window)
+            end = data.find(b"endobj")
+            if end != -1:
+                return data[:end]
+            if len(data) < window or window >= PDF_MAX_OBJECT_SIZE:
+                return data
+            window *= 4
+
+    def _stream_data(self, offset: int, obj: bytes) -> bytes:
+        """Decoded content of the stream object starting at offset."""
+        length = _int(obj, b"Length")
+        start = obj.find(b"stream")
+        if length is None or start == -1:
+            raise ValueError("Unsupported stream object")
+        start += len(b"stream")
+        if obj[start : start + 2] == b"\r\n":
+            start += 2
+        elif obj[start : start + 1] in (b"\n", b"\r"):
+            start += 1
+        data = self._read(offset + start, length)
+        if b"/FlateDecode" in obj:
+            data = zlib.decompress(data)
+        predictor = _int(obj, b"Predictor") or 1
+        if predictor >= 10:
+            data = self._png_unpredict(data, _int(obj, b"Columns") or 1)
+        return data
+
+    @staticmethod
+    def _png_unpredict(data: bytes, columns: int) -> bytes:
+        rows = []
+        previous = bytearray(columns)
+        for start in range(0, len(data), columns + 1):
+            kind = data[start]
+            row = bytearray(data[start + 1 : start + 1 + columns])
+            if kind == 1:
+                for i in range(1, len(row)):
+                    row[i] = (row[i] + row[i - 1]) & 0xFF
+            elif kind == 2:
+                for i in range(len(row)):
+                    row[i] = (row[i] + previous[i]) & 0xFF
+            elif kind != 0:
+                raise ValueError(f"Unsupported PNG predictor {kind}")
+            rows.append(bytes(row))
+            previous = row
+        return b"".join(rows)
+
+    def load_xref(self) -> bytes:
+        """Load the cross-reference sections and return the newest trailer."""
+        tail_start = max(0, self._size - PDF_TAIL_SIZE)
+        tail = self._read(tail_start, PDF_TAIL_SIZE)
+        matches = list(_STARTXREF.finditer(tail))
+        if not matches:
+            raise ValueError("startxref not found")
+        offset = int(matches[-1].group(1))
+
+        newest_trailer = None
+        seen = set()
+        while offset is not None and offset not in seen:
+            if len(seen) >= PDF_MAX_XREF_SECTIONS:
+                break
+            seen.add(offset)
+            head = self._read(offset, 4)
+            if head == b"xref":
+                data = self._read(offset, PDF_MAX_OBJECT_SIZE)
+                trailer_match = _TRAILER.search(data)
+                if trailer_match is None:
+                    raise ValueError("trailer not found")
+                end = data.find(b"startxref", trailer_match.start())
+                trailer = data[trailer_match.start() : end if end != -1 else None]
+                self._sections.append(("table", offset))
+                # Hybrid files keep part of the objects in an xref stream
+                stream_offset = _int(trailer, b"XRefStm")
+                if stream_offset is not None:
+                    stream_obj = self._object_at(stream_offset)
+                    self._sections.append(
+                        (
+                            "stream",
+                            stream_obj,
+                            self._stream_data(stream_offset, stream_obj),
+                        )
+                    )
+            else:
+                trailer = self._object_at(offset)
+                data = self._stream_data(offset, trailer)
+                self._sections.append(("stream", trailer, data))
+            if newest_trailer is None:
+                newest_trailer = trailer
+            offset = _int(trailer, b"Prev")
+        return newest_trailer
+
+    def _table_lookup(self, offset: int, number: int) -> Optional[int]:
+        position = offset + 4
+        while True:
+            header = self._read(position, 64)
+            if header.lstrip().startswith(b"trailer"):
+                return None
+            match = _XREF_SUBSECTION.match(header)
+            if match is None:
+                return None
+            first, count = int(match.group(1)), int(match.group(2))
+            position += match.end()
+            if first <= number < first + count:
+                entry = self._read(position + 20 * (number - first), 20)
+                if entry[17:18] != b"n":
+                    return None
+                return int(entry[:10])
+            position += 20 * count
+
+    @staticmethod
+    def _stream_lookup(trailer: bytes, data: bytes, number: int):
+        widths_match = re.search(rb"/W\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s*\]", trailer)
+        if widths_match is None:
+            return None
+        widths = [int(w) for w in widths_match.groups()]
+        size = _int(trailer, b"Size") or 0
+        index_match = re.search(rb"/Index\s*\[([\d\s]+)\]", trailer)
+        index = (
+            [int(i) for i in index_match.group(1).split()] if index_match else [0, size]
+        )
+        entry_size = sum(widths)
+        row = 0
+        for first, count in zip(index[0::2], index[1::2]):
+            if first <= number < first + count:
+                start = (row + number - first) * entry_size
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(data[start : start + width], "big"))
+                    start += width
+                kind = fields[0] if widths[0] else 1
+                if kind == 1:
+                    return ("offset", fields[1])
+                if kind == 2:
+                    return ("compressed", fields[1], fields[2])
+                return None
+            row += count
+        return None
+
+    def get_object(self, number: int) -> bytes:
+        """Bytes of indirect object ``number``."""
+        for section in self._sections:
+            if section[0] == "table":
+                offset = self._table_lookup(section[1], number)
+                if offset is not None:
+                    return self._object_at(offset)
+                continue
+            location = self._stream_lookup(section[1], section[2], number)
+            if location is None:
+                continue
+            if location[0] == "offset":
+                return self._object_at(location[1])
+            return self._from_object_stream(location[1], number)
+        raise ValueError(f"Object {number} not found")
+
+    def _from_object_stream(self, stream_number: int, number: int) -> bytes:
+        if stream_number not in self._object_streams:
+            offset = self._locate(stream_number)
+            obj = self._object_at(offset)
+            data = self._stream_data(offset, obj)
+            first = _int(obj, b"First") or 0
+            pairs = [int(v) for v in data[:first].split()]
+            offsets = dict(zip(pairs[0::2], (first + o for o in pairs[1::2])))
+            self._object_streams[stream_number] = (data, offsets)
+        data, offsets = self._object_streams[stream_number]
+        start = offsets[number]
+        later = [o for o in offsets.values() if o > start]
+        return data[start : min(later) if later else len(data)]
+
+    def _locate(self, number: int) -> int:
+        for section in self._sections:
+            if section[0] == "table":
+                offset = self._table_lookup(section[1], number)
+            else:
+                location = self._stream_lookup(section[1], section[2], number)
+                offset = location[1] if location and location[0] == "offset" else None
+            if offset is not None:
+                return offset
+        raise ValueError(f"Object {number} not found")
+
+
+def _scan_pdf_pages(file: IO[bytes]) -> Optional[int]:
+    """Fallback: count page objects in a chunked scan of the file."""
+    file.seek(0)
+    count = 0
+    carry = b""
+    while True:
+        chunk = file.read(SCAN_CHUNK_SIZE)
+        if not chunk:
+            break
+        data = carry + chunk
+        # Keep a short overlap so matches spanning chunks are found once
+        cut = max(0, len(data) - 32)
+        count += len(_PAGE_TYPE.findall(data[:cut]))
+        carry = data[cut:]
+    count += len(_PAGE_TYPE.findall(carry))
+    return count or None
+
+
+def pdf_page_count(file: IO[bytes], size: int) -> Optional[int]:
+    """Page count of a PDF from its linearization header or page tree root."""
+    file.seek(0)
+    linearized = _LINEARIZED_PAGES.search(file.read(1024))
+    if linearized:
+        return int(linearized.group(1))
+    try:
+        reader = _PdfReader(file, size)
+        trailer = reader.load_xref()
+        root = _ref(trailer, b"Root")
+        pages = _ref(reader.get_object(root[0]), b"Pages")
+        pages_obj = reader.get_object(pages[0])
+        count_ref = _ref(pages_obj, b"Count")
+        if count_ref:
+            return int(reader.get_object(count_ref[0]).split(b"obj")[-1].split()[0])
+        return _int(pages_obj, b"Count")
+    except Exception:
+        return _scan_pdf_pages(file)
+
+
+def ooxml_page_count(file: IO[bytes], file_type: str) -> Optional[int]:
+    """Slide count of a PPTX or page count of a DOCX from the zip directory."""
+    with zipfile.ZipFile(file) as archive:
+        names = archive.namelist()
+        if file_type == "pptx":
+            slides = [n for n in names if re.fullmatch(r"ppt/slides/slide\d+\.xml", n)]
+            return len(slides) or None
+        if "docProps/app.xml" in names:
+            match = re.search(
+                rb"<Pages>(\d+)</Pages>", archive.read("docProps/app.xml")
+            )
+            if match:
+                return int(match.group(1))
+    return None
+
+
+def image_dimensions(file: IO[bytes]) -> Tuple[Optional[int], Optional[int]]:
+    """(width, height) of a PNG, GIF or JPEG from its header."""
+    file.seek(0)
+    head = file.read(32)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10])
+    if head[:2] == b"\xff\xd8":
+        position = 2
+        while True:
+            file.seek(position)
+            marker = file.read(4)
+            if len(marker) < 4 or marker[0] != 0xFF:
+                break
+            kind = marker[1]
+            if kind == 0xFF:
+                position += 1
+                continue
+            length = struct.unpack(">H", marker[2:4])[0]
+            if 0xC0 <= kind <= 0xCF and kind not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", file.read(5)[1:5])
+                return width, height
+            position += 2 + length
+    return None, None
+
+
+def inspect_file(
+    file: IO[bytes], file_type: str, size: int, file_path: str = ""
+) -> FileInfo:
+    """Preflight an open binary file of the given type and size."""
+    info = FileInfo(file_path=file_path, file_type=file_type, size_bytes=size)
+    try:
+        if file_type == "pdf":
+            info.page_count = pdf_page_count(file, size)
+        elif file_type in ("docx", "pptx"):
+            info.page_count = ooxml_page_count(file, file_type)
+        elif file_type in ("jpg", "jpeg", "png", "gif"):
+            info.width, info.height = image_dimensions(file)
+            info.page_count = 1
+    except (zipfile.BadZipFile, ValueError, struct.error):
+        pass
+    return info
+
+
+def preflight(file_path: str, max_file_size_mb: Optional[float] = None) -> FileInfo:
+    """Inspect a file without loading it.
+
+    Args:
+        file_path: Path to the file or archive member.
+        max_file_size_mb: If set, files larger than this raise ValueError.
+
+    Returns:
+        FileInfo with the size and, where available, page/slide count and
+        image dimensions.
+    """
+    path = Path(file_path)
+    size = input_size(file_path)
+    if max_file_size_mb is not None and size > max_file_size_mb * 1024 * 1024:
+        raise ValueError(
+            ValidationError.FILE_TOO_LARGE.value.format(max_file_size_mb, file_path)
+        )
+    with open_input(file_path) as file:
+        return inspect_file(
+            file, path.suffix.lower().lstrip("."), size, file_path=str(file_path)
+        )
+
+
+class _Base64Reader(io.RawIOBase):
+    """Seekable binary view of base64 content decoding only what is read."""
+
+    def __init__(self, content: bytes) -> None:
+        super().__init__()
+        self._content = content
+        self.size = len(content) // 4 * 3 - content[-2:].count(b"=")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.size}
+        self._position = max(0, base[whence] + offset)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        start = self._position
+        end = min(self.size, start + len(buffer))
+        if end <= start:
+            return 0
+        # Every 4 characters decode to 3 bytes on their own
+        first, last = start // 3, -(-end // 3)
+        data = base64.b64decode(self._content[first * 4 : last * 4])
+        chunk = data[start - first * 3 : end - first * 3]
+        buffer[: len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+
+def preflight_content(file_content: Union[str, bytes], file_type: str) -> FileInfo:
+    """Inspect base64-encoded file content.
+
+    Only the parts of the file the inspection reads are decoded, unless the
+    content is broken into lines.
+    """
+    if isinstance(file_content, str):
+        file_content = file_content.encode("ascii")
+    if _WHITESPACE.search(file_content):
+        data = base64.b64decode(file_content)
+        return inspect_file(io.BytesIO(data), file_type, len(data))
+    reader = _Base64Reader(file_content)
+    return inspect_file(reader, file_type, reader.size)
+
+
+def estimate_pages(file_paths: Iterable[str]) -> int:
+    """Total pages of the given files, counting unknown page counts as 1."""
+    return sum(preflight(path).page_count or 1 for path in file_paths)
@@ -0,0 +1,130 @@
+"""Routing between the sync and async-job endpoints."""
+
+import logging
+import threading
+from typing import Optional
+
+from pydantic import BaseModel
+
+from any_parser.sync_parser import TIMEOUT as SYNC_TIMEOUT
+
+# Rough size of one page when the page count is unknown
+BYTES_PER_PAGE = 100 * 1024
+
+# Priors in seconds; refined online from observed calls
+SYNC_PRIOR = (2.0, 1.5)  # (fixed overhead, per page)
+ASYNC_PRIOR = (8.0, 1.0)
+
+logger = logging.getLogger(__name__)
+
+
+class RouteDecision(BaseModel):
+    """
+    Outcome of a routing decision.
+    """
+
+    mode: str
+    pages: float
+    predicted_sync: float
+    predicted_async: float
+
+
+class LatencyModel:
+    """Online least-squares fit of ``latency = intercept + slope * pages``.
+
+    Observations are exponentially down-weighted by ``decay`` so the model
+    follows changes in server load. The prior enters as pseudo-observations
+    at 1 and 10 pages and fades out as real calls are recorded.
+    """
+
+    def __init__(
+        self,
+        intercept: float,
+        slope: float,
+        decay: float = 0.98,
+        prior_weight: float = 2.0,
+    ) -> None:
+        self._decay = decay
+        self._n = self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._lock = threading.Lock()
+        for pages in (1.0, 10.0):
+            self._add(pages, intercept + slope * pages, prior_weight / 2)
+
+    def _add(self, pages: float, seconds: float, weight: float = 1.0) -> None:
+        self._n += weight
+        self._sx += weight * pages
+        self._sy += weight * seconds
+        self._sxx += weight * pages * pages
+        self._sxy += weight * pages * seconds
+
+    def observe(self, pages: float, seconds: float) -> None:
+        """Record one call that took ``seconds`` for ``pages`` pages."""
+        with self._lock:
+            for name in ("_n", "_sx", "_sy", "_sxx", "_sxy"):
+                setattr(self, name, getattr(self, name) * self._decay)
+            self._add(pages, seconds)
+
+    def predict(self, pages: float) -> float:
+        """Predicted latency in seconds for a document of ``pages`` pages."""
+        with self._lock:
+            mean_x = self._sx / self._n
+            mean_y = self._sy / self._n
+            var_x = self._sxx / self._n - mean_x * mean_x
+            if var_x > 1e-9:
+                slope = (self._sxy / self._n - mean_x * mean_y) / var_x
+            else:
+                slope = mean_y / mean_x if mean_x else 0.0
+            slope = max(slope, 0.0)
+            intercept = max(mean_y - slope * mean_x, 0.0)
+        return intercept + slope * pages
+
+
+class HybridRouter:
+    """Pick the sync or async-job endpoint per document.
+
+    A document goes to the async-job endpoint when its predicted sync
+    latency risks the sync timeout, and otherwise to whichever endpoint is
+    predicted to be faster. Latencies of past calls feed back into the
+    per-endpoint models.
+    """
+
+    def __init__(
+        self,
+        sync_timeout: float = SYNC_TIMEOUT,
+        safety_margin: float = 0.5,
+        bytes_per_page: int = BYTES_PER_PAGE,
+    ) -> None:
+        self.sync_timeout = sync_timeout
+        self.safety_margin = safety_margin
+        self.bytes_per_page = bytes_per_page
+        self.sync_model = LatencyModel(*SYNC_PRIOR)
+        self.async_model = LatencyModel(*ASYNC_PRIOR)
+
+    def estimate_pages(self, file_size: int, page_count: Optional[int] = None) -> float:
+        """Page count if known, otherwise an estimate from the file size."""
+        if page_count:
+            return float(page_count)
+        return max(1.0, file_size / self.bytes_per_page)
+
+    def choose(self, file_size: int, page_count: Optional[int] = None) -> RouteDecision:
+        """Choose "sync" or "async" for a document."""
+        pages = self.estimate_pages(file_size, page_count)
+        predicted_sync = self.sync_model.predict(pages)
+        predicted_async = self.async_model.predict(pages)
+        if predicted_sync > self.sync_timeout * self.safety_margin:
+            mode = "async"
+        else:
+            mode = "sync" if predicted_sync <= predicted_async else "async"
+        decision = RouteDecision(
+            mode=mode,
+            pages=pages,
+            predicted_sync=predicted_sync,
+            predicted_async=predicted_async,
+        )
+        logger.debug(f"Routing decision: {decision}")
+        return decision
+
+    def record(self, mode: str, pages: float, seconds: float) -> None:
+        """Feed back the observed latency of a routed call."""
+        model = self.sync_model if mode == "sync" else self.async_model
+        model.observe(pages, seconds)
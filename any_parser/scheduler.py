@@ -0,0 +1,319 @@
+"""Priority classes and per-tenant fair queuing of AnyParser calls.
+
+A FairScheduler shared by an AnyParser client (and its BatchParser)
+bounds how many requests run at once and decides who goes next when
+calls are queued. Priority classes are strict: a queued INTERACTIVE call
+always starts before NORMAL and BACKGROUND ones, and ``reserved`` slots
+are kept for INTERACTIVE calls only, so a backfill holding every other
+slot does not make an interactive request wait for one of its calls.
+Within a class, tenants share the slots in proportion to their weights
+(start-time fair queuing), so one tenant's large backlog does not delay
+another tenant's few requests.
+
+Calls are tagged with ``schedule_as(tenant, priority)`` or the
+``tenant``/``priority`` arguments of the AnyParser methods; the tag is
+inherited by background threads started through ``run_in_context``, so
+submit_* jobs and bulk runs are scheduled as their caller.
+"""
+
+import contextvars
+import heapq
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from enum import Enum
+from typing import ContextManager, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from any_parser.deadline import check_deadline, current_deadline
+from any_parser.utils import percentile
+
+DEFAULT_TENANT = "default"
+# Queue waits kept per tenant and priority for the stats percentiles
+WAIT_HISTORY = 1000
+
+
+class Priority(Enum):
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+_tag: contextvars.ContextVar[Tuple[str, Priority]] = contextvars.ContextVar(
+    "any_parser_schedule_tag", default=(DEFAULT_TENANT, Priority.NORMAL)
+)
+# The scheduler and waiter of the slot the current call holds, so nested
+# AnyParser calls reuse it
+_holding: contextvars.ContextVar[Optional[Tuple["FairScheduler", "_Waiter"]]] = (
+    contextvars.ContextVar("any_parser_holding_slot", default=None)
+)
+
+
+def _to_priority(priority: Union[Priority, str]) -> Priority:
+    if isinstance(priority, str):
+        try:
+            return Priority[priority.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown priority: {priority}") from None
+    return Priority(priority)
+
+
+@contextmanager
+def schedule_as(
+    tenant: Optional[str] = None, priority: Union[Priority, str, None] = None
+) -> Iterator[Tuple[str, Priority]]:
+    """Tag the enclosed AnyParser calls; None keeps the enclosing value."""
+    outer_tenant, outer_priority = _tag.get()
+    tag = (tenant or outer_tenant, _to_priority(priority or outer_priority))
+    token = _tag.set(tag)
+    try:
+        yield tag
+    finally:
+        _tag.reset(token)
+
+
+def scheduled(scheduler: Optional["FairScheduler"]) -> ContextManager:
+    """A slot of ``scheduler`` for the current tag, or a no-op without one."""
+    return scheduler.slot() if scheduler is not None else nullcontext()
+
+
+def release_slot() -> None:
+    """Give back the slot held by the current call before the call ends.
+
+    For calls that go on waiting without sending requests, such as for an
+    async job to finish. AnyParser calls made afterwards take a new slot.
+    """
+    held = _holding.get()
+    if held is not None:
+        _holding.set(None)
+        scheduler, waiter = held
+        scheduler._release(waiter)
+
+
+class QueueStats(BaseModel):
+    """
+    Slot usage and queue waits of one tenant or priority class.
+    """
+
+    granted: int = 0
+    queued: int = 0
+    running: int = 0
+    wait_p50: float = 0.0
+    wait_p99: float = 0.0
+
+
+class SchedulerStats(BaseModel):
+    """
+    Snapshot of a FairScheduler.
+    """
+
+    max_concurrent: int
+    running: int
+    queued: int
+    tenants: Dict[str, QueueStats]
+    priorities: Dict[str, QueueStats]
+
+
+class _Waiter:
+    __slots__ = ("tenant", "priority", "start", "finish", "queued_at", "state")
+
+    def __init__(self, tenant: str, priority: Priority) -> None:
+        self.tenant = tenant
+        self.priority = priority
+        self.start = 0.0
+        self.finish = 0.0
+        self.queued_at = time.monotonic()
+        self.state = "queued"  # then "granted" and "released", or "abandoned"
+
+
+class FairScheduler:
+    """Bound concurrent calls and grant slots by priority, then fair share.
+
+    Args:
+        max_concurrent: Calls allowed to run at once
+        weights: Relative share per tenant; tenants not listed weigh 1
+        reserved: Slots only INTERACTIVE calls may use
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 10,
+        weights: Optional[Dict[str, float]] = None,
+        reserved: int = 1,
+    ) -> None:
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        if not 0 <= reserved < max_concurrent:
+            raise ValueError("reserved must be between 0 and max_concurrent - 1")
+        self.max_concurrent = max_concurrent
+        self.reserved = reserved
+        self._weights: Dict[str, float] = dict(weights or {})
+        self._queues: Dict[Priority, List[Tuple[float, int, _Waiter]]] = {
+            priority: [] for priority in Priority
+        }
+        self._virtual_time: Dict[Priority, float] = defaultdict(float)
+        self._last_finish: Dict[Tuple[Priority, str], float] = {}
+        self._sequence = 0
+        self._running = 0
+        # Keyed by tenant name and by Priority
+        self._stats: Dict[Union[str, Priority], QueueStats] = defaultdict(QueueStats)
+        self._waits: Dict[Union[str, Priority], Deque[float]] = defaultdict(
+            lambda: deque(maxlen=WAIT_HISTORY)
+        )
+        self._lock = threading.Condition()
+
+    def set_weight(self, tenant: str, weight: float) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._lock:
+            self._weights[tenant] = weight
+
+    @contextmanager
+    def slot(
+        self,
+        tenant: Optional[str] = None,
+        priority: Union[Priority, str, None] = None,
+        cost: float = 1.0,
+    ) -> Iterator[None]:
+        """Wait for a slot and hold it for the enclosed call.
+
+        Tenant and priority default to the current ``schedule_as`` tag.
+        Waiting stops with Cancelled/DeadlineExceeded under the current
+        deadline. A call made while already holding a slot runs in it.
+        """
+        if _holding.get() is not None:
+            yield
+            return
+        tag_tenant, tag_priority = _tag.get()
+        waiter = self._acquire(
+            tenant or tag_tenant, _to_priority(priority or tag_priority), cost
+        )
+        token = _holding.set((self, waiter))
+        try:
+            yield
+        finally:
+            _holding.reset(token)
+            self._release(waiter)
+
+    def _acquire(self, tenant: str, priority: Priority, cost: float) -> _Waiter:
+        active = current_deadline()
+        waiter = _Waiter(tenant, priority)
+        with self._lock:
+            # Start after the tenant's previous request in this class, but
+            # never before the class's virtual time: idle tenants do not
+            # bank credit
+            key = (priority, tenant)
+            waiter.start = max(
+                self._virtual_time[priority], self._last_finish.get(key, 0.0)
+            )
+            waiter.finish = waiter.start + cost / self._weights.get(tenant, 1.0)
+            self._last_finish[key] = waiter.finish
+            self._sequence += 1
+            heapq.heappush(
+                self._queues[priority], (waiter.finish, self._sequence, waiter)
+            )
+            self._count(waiter, "queued", 1)
+            self._dispatch()
+            try:
+                while waiter.state != "granted":
+                    check_deadline()
+                    remaining = active.remaining() if active is not None else None
+                    self._lock.wait(
+                        0.1 if remaining is None else max(0.0, min(0.1, remaining))
+                    )
+            except BaseException:
+                if waiter.state == "granted":
+                    self._release_locked(waiter)
+                else:
+                    waiter.state = "abandoned"
+                    self._count(waiter, "queued", -1)
+                raise
+        return waiter
+
+    def _release(self, waiter: _Waiter) -> None:
+        with self._lock:
+            # A slot given back early by release_slot is released once
+            if waiter.state == "granted":
+                self._release_locked(waiter)
+
+    def _release_locked(self, waiter: _Waiter) -> None:
+        waiter.state = "released"
+        self._running -= 1
+        self._count(waiter, "running", -1)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to the queued calls that are next in line."""
+        granted = False
+        while self._running < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            heapq.heappop(self._queues[waiter.priority])
+            waiter.state = "granted"
+            self._virtual_time[waiter.priority] = waiter.start
+            self._running += 1
+            self._count(waiter, "queued", -1)
+            self._count(waiter, "running", 1)
+            self._count(waiter, "granted", 1)
+            wait = time.monotonic() - waiter.queued_at
+            self._waits[waiter.tenant].append(wait)
+            self._waits[waiter.priority].append(wait)
+            granted = True
+        if granted:
+            self._lock.notify_all()
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue and queue[0][2].state == "abandoned":
+                heapq.heappop(queue)
+            if not queue:
+                continue
+            if (
+                priority != Priority.INTERACTIVE
+                and self._running >= self.max_concurrent - self.reserved
+            ):
+                return None
+            return queue[0][2]
+        return None
+
+    def _count(self, waiter: _Waiter, field: str, delta: int) -> None:
+        for name in (waiter.tenant, waiter.priority):
+            stats = self._stats[name]
+            setattr(stats, field, getattr(stats, field) + delta)
+
+    def stats(self) -> SchedulerStats:
+        """Current slot usage and queue waits per tenant and priority."""
+        with self._lock:
+            snapshot = {}
+            for name, stats in self._stats.items():
+                waits = list(self._waits[name])
+                snapshot[name] = stats.model_copy(
+                    update={
+                        "wait_p50": percentile(waits, 0.5),
+                        "wait_p99": percentile(waits, 0.99),
+                    }
+                )
+            return SchedulerStats(
+                max_concurrent=self.max_concurrent,
+                running=self._running,
+                queued=sum(
+                    1
+                    for queue in self._queues.values()
+                    for _, _, waiter in queue
+                    if waiter.state == "queued"
+                ),
+                tenants={
+                    name: stats
+                    for name, stats in snapshot.items()
+                    if isinstance(name, str)
+                },
+                priorities={
+                    name.name: stats
+                    for name, stats in snapshot.items()
+                    if isinstance(name, Priority)
+                },
+            )
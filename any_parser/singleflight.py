@@ -0,0 +1,135 @@
+"""Coalescing of identical concurrent calls (singleflight)."""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from pydantic import BaseModel
+
+from any_parser.deadline import Cancelled, DeadlineExceeded, current_deadline
+
+# Errors that belong to the caller that made the call, not to the request:
+# callers waiting on it retry instead of receiving them
+_CALLER_ERRORS = (Cancelled, DeadlineExceeded)
+
+
+class SingleFlightStats(BaseModel):
+    """
+    Counters of a SingleFlight.
+    """
+
+    calls: int = 0
+    shared: int = 0
+    in_flight: int = 0
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # The error came from the running caller's deadline or cancellation
+        self.caller_error = False
+
+
+def freeze(value: Any) -> Hashable:
+    """Hashable stand-in for call arguments (dicts, lists, schemas, ...)."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v) for v in value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class SingleFlight:
+    """Run one call per key at a time and share its outcome with callers
+    that ask for the same key while it is in flight.
+
+    Nothing is kept once the call returns, so later calls run again.
+    Waiting callers stay bound by their own deadline, and if the running
+    call is cancelled or runs out of its time, one of them runs it again.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = SingleFlightStats()
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        failed: Optional[Callable[[Any], bool]] = None,
+    ) -> Tuple[Any, bool]:
+        """Return ``(fn(), shared)``; shared is True if another caller ran it.
+
+        For calls that return their errors, ``failed`` tells which results
+        are errors. An error result the running caller got once cancelled
+        or out of time is not shared, like a raised Cancelled.
+        """
+        while True:
+            with self._lock:
+                self._stats.calls += 1
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._stats.in_flight += 1
+                else:
+                    self._stats.shared += 1
+            if leader:
+                return self._run(key, call, fn, failed), False
+            self._wait(call)
+            if call.caller_error:
+                with self._lock:
+                    self._stats.calls -= 1
+                    self._stats.shared -= 1
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+    def _run(
+        self,
+        key: Hashable,
+        call: _Call,
+        fn: Callable[[], Any],
+        failed: Optional[Callable[[Any], bool]],
+    ) -> Any:
+        active = current_deadline()
+        try:
+            call.result = fn()
+            call.caller_error = (
+                failed is not None
+                and active is not None
+                and active.stopped
+                and failed(call.result)
+            )
+            return call.result
+        except BaseException as e:
+            call.error = e
+            call.caller_error = isinstance(e, _CALLER_ERRORS) or (
+                active is not None and active.stopped
+            )
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._stats.in_flight -= 1
+            call.done.set()
+
+    @staticmethod
+    def _wait(call: _Call) -> None:
+        active = current_deadline()
+        while not call.done.wait(0.1):
+            if active is not None:
+                active.check()
+
+    def stats(self) -> SingleFlightStats:
+        with self._lock:
+            return self._stats.model_copy()
@@ -0,0 +1,328 @@
+"""Incremental extraction of result fields from streamed JSON responses."""
+
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+CHUNK_SIZE = 64 * 1024
+RESULT_KEYS = ("markdown", "result")
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_WHITESPACE = " \t\r\n"
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+# Scanner states
+_SEEK = "seek"
+_VALUE = "value"
+_STRING = "string"
+_ARRAY = "array"
+_RAW = "raw"
+_DONE = "done"
+
+
+class JsonFieldStreamer:
+    """Extract one top-level field of a JSON object fed in text chunks.
+
+    String values are decoded and emitted as they arrive, so only the
+    current chunk is held in memory. A list of strings (e.g. markdown per
+    page) is emitted element by element, joined by ``separator``. Any other
+    value is emitted as raw JSON text. The first key found out of ``keys``
+    wins.
+    """
+
+    def __init__(self, keys: Sequence[str] = RESULT_KEYS, separator: str = "\n"):
+        self._keys = set(keys)
+        self._separator = separator
+        self._state = _SEEK
+        self._buf = ""
+        self._pos = 0
+        # _SEEK bookkeeping
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._expect_key = False
+        self._key_parts: Optional[List[str]] = None
+        self._last_key: Optional[str] = None
+        # value bookkeeping
+        self._in_array = False
+        self._first_element = True
+        self._raw_depth = 0
+        self._raw_in_string = False
+        self.field: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the scanner needs no more input."""
+        return self._state == _DONE
+
+    def feed(self, text: str) -> List[str]:
+        """Feed the next chunk of JSON text and return decoded output pieces."""
+        self._buf = self._buf[self._pos :] + text
+        self._pos = 0
+        out: List[str] = []
+        handlers = {
+            _SEEK: self._seek,
+            _VALUE: self._value,
+            _STRING: self._string,
+            _ARRAY: self._array,
+            _RAW: self._raw,
+        }
+        while self._state != _DONE and handlers[self._state](out):
+            pass
+        return [piece for piece in out if piece]
+
+    def close(self) -> None:
+        """Signal end of input; raises ValueError on a truncated value."""
+        if self._state not in (_SEEK, _DONE):
+            raise ValueError("Truncated JSON response")
+
+    def _seek(self, out: List[str]) -> bool:
+        buf, i, n = self._buf, self._pos, len(self._buf)
+        while i < n:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buf, i)
+                end = match.start() if match else n
+                if self._key_parts is not None:
+                    self._key_parts.append(buf[i:end])
+                if match is None:
+                    i = n
+                    break
+                if buf[end] == "\\":
+                    if end + 1 >= n:
+                        i = end
+                        break
+                    if self._key_parts is not None:
+                        self._key_parts.append(buf[end : end + 2])
+                    i = end + 2
+                    continue
+                self._in_string = False
+                i = end + 1
+                if self._key_parts is not None:
+                    self._last_key = json.loads('"' + "".join(self._key_parts) + '"')
+                    self._key_parts = None
+                continue
+
+            char = buf[i]
+            i += 1
+            if char in _WHITESPACE:
+                continue
+            if not self._started:
+                if char != "{":
+                    raise ValueError("Expected a JSON object response")
+                self._started = True
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_parts = []
+                    self._expect_key = False
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = _DONE
+                    break
+            elif char == "," and self._depth == 1:
+                self._expect_key = True
+                self._last_key = None
+            elif char == ":" and self._depth == 1 and self._last_key in self._keys:
+                self.field = self._last_key
+                self._state = _VALUE
+                break
+        self._pos = i
+        return self._state != _SEEK
+
+    def _skip_whitespace(self) -> bool:
+        buf, i, n = self._buf, self._pos, len(self._buf)
+        while i < n and buf[i] in _WHITESPACE:
+            i += 1
+        self._pos = i
+        return i < n
+
+    def _value(self, out: List[str]) -> bool:
+        if not self._skip_whitespace():
+            return False
+        char = self._buf[self._pos]
+        if char == '"':
+            self._pos += 1
+            self._state = _STRING
+        elif char == "[":
+            self._pos += 1
+            self._in_array = True
+            self._state = _ARRAY
+        else:
+            self._start_raw()
+        return True
+
+    def _array(self, out: List[str]) -> bool:
+        while self._skip_whitespace():
+            char = self._buf[self._pos]
+            if char == ",":
+                self._pos += 1
+                continue
+            if char == "]":
+                self._pos += 1
+                self._state = _DONE
+                return True
+            if not self._first_element:
+                out.append(self._separator)
+            self._first_element = False
+            if char == '"':
+                self._pos += 1
+                self._state = _STRING
+            else:
+                self._start_raw()
+            return True
+        return False
+
+    def _end_value(self) -> None:
+        self._state = _ARRAY if self._in_array else _DONE
+
+    def _string(self, out: List[str]) -> bool:
+        buf, i, n = self._buf, self._pos, len(self._buf)
+        while i < n:
+            match = _STRING_SPECIAL.search(buf, i)
+            if match is None:
+                out.append(buf[i:])
+                i = n
+                break
+            end = match.start()
+            out.append(buf[i:end])
+            if buf[end] == '"':
+                self._pos = end + 1
+                self._end_value()
+                return True
+            decoded, consumed = self._decode_escape(buf, end)
+            if consumed == 0:
+                i = end
+                break
+            out.append(decoded)
+            i = end + consumed
+        self._pos = i
+        return False
+
+    @staticmethod
+    def _decode_escape(buf: str, start: int):
+        """Decode the escape at ``start``; returns (text, 0) if incomplete."""
+        n = len(buf)
+        if start + 1 >= n:
+            return "", 0
+        char = buf[start + 1]
+        if char != "u":
+            if char not in _SIMPLE_ESCAPES:
+                raise ValueError(f"Invalid JSON escape: \\{char}")
+            return _SIMPLE_ESCAPES[char], 2
+        if start + 6 > n:
+            return "", 0
+        length = 6
+        if 0xD800 <= int(buf[start + 2 : start + 6], 16) < 0xDC00:
+            # High surrogate: decode together with the following low surrogate
+            if start + 12 > n:
+                return "", 0
+            if buf[start + 6 : start + 8] == "\\u":
+                length = 12
+        return json.loads('"' + buf[start : start + length] + '"'), length
+
+    def _start_raw(self) -> None:
+        self._raw_depth = 0
+        self._raw_in_string = False
+        self._state = _RAW
+
+    def _raw(self, out: List[str]) -> bool:
+        buf, i, n = self._buf, self._pos, len(self._buf)
+        start = i
+        while i < n:
+            if self._raw_in_string:
+                match = _STRING_SPECIAL.search(buf, i)
+                if match is None:
+                    i = n
+                    break
+                end = match.start()
+                if buf[end] == "\\":
+                    if end + 1 >= n:
+                        i = end
+                        break
+                    i = end + 2
+                    continue
+                self._raw_in_string = False
+                i = end + 1
+                continue
+
+            char = buf[i]
+            if char == '"':
+                self._raw_in_string = True
+            elif char in "{[":
+                self._raw_depth += 1
+            elif char in "}]" or (char == "," and self._raw_depth == 0):
+                if self._raw_depth == 0:
+                    out.append(buf[start:i].rstrip())
+                    self._pos = i
+                    self._end_value()
+                    return True
+                self._raw_depth -= 1
+            i += 1
+        out.append(buf[start:i])
+        self._pos = i
+        return False
+
+
+def iter_json_field(
+    chunks: Iterable[bytes],
+    keys: Sequence[str] = RESULT_KEYS,
+    separator: str = "\n",
+) -> Iterator[str]:
+    """Yield the decoded text of a top-level JSON field from byte chunks.
+
+    Reading stops as soon as the field has been fully emitted.
+
+    Args:
+        chunks: Raw response body chunks, e.g. ``response.iter_content()``.
+        keys: Candidate field names; the first one present is extracted.
+        separator: Text emitted between elements of a list value.
+
+    Raises:
+        KeyError: If none of ``keys`` is present in the top-level object.
+        ValueError: If the JSON is malformed or truncated.
+    """
+    streamer = JsonFieldStreamer(keys, separator)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        yield from streamer.feed(decoder.decode(chunk))
+        if streamer.done:
+            break
+    else:
+        yield from streamer.feed(decoder.decode(b"", final=True))
+    streamer.close()
+    if streamer.field is None:
+        raise KeyError(f"None of {list(keys)} found in response")
+
+
+def write_json_field(
+    chunks: Iterable[bytes],
+    output_path: str,
+    keys: Sequence[str] = RESULT_KEYS,
+    separator: str = "\n",
+) -> int:
+    """Stream a top-level JSON field from byte chunks into a UTF-8 file.
+
+    Returns:
+        int: Number of characters written.
+    """
+    written = 0
+    with open(output_path, "w", encoding="utf-8") as file:
+        for piece in iter_json_field(chunks, keys=keys, separator=separator):
+            file.write(piece)
+            written += len(piece)
+    return written
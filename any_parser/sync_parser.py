@@ -2,16 +2,37 @@
 
 import json
 import time
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
 
 import requests
 
 from any_parser.base_parser import BaseParser
+from any_parser.circuit_breaker import CircuitOpen, guarded, is_failure_status
+from any_parser.deadline import (
+    Deadline,
+    current_deadline,
+    request_timeout,
+    use_deadline,
+)
+from any_parser.extraction_schema import PAYLOAD_KEY, ExtractionSchema
+from any_parser.hedging import HedgePolicy
+from any_parser.streaming import CHUNK_SIZE, iter_json_field
+from any_parser.utils import encode_json_payload
 
 TIMEOUT = 60
 
 
 class BaseSyncParser(BaseParser):
+    """Base class for the sync endpoints.
+
+    Subclasses set ``endpoint`` and ``result_key`` and may override
+    ``payload_args`` to map user arguments onto the request payload.
+    """
+
+    endpoint = ""
+    result_key = "markdown"
+    # Set to a HedgePolicy to race slow requests against a duplicate
+    hedging: Optional[HedgePolicy] = None
 
     def get_sync_response(
         self,
@@ -19,21 +40,58 @@ class BaseSyncParser(BaseParser):
         file_content: str,
         file_type: str,
         extract_args: Optional[Dict[str, Any]] = None,
+        stream: bool = False,
     ) -> Tuple[Optional[requests.Response], str]:
-        payload = {
-            "file_content": file_content,
-            "file_type": file_type,
-        }
-        if extract_args:
-            payload.update(extract_args)
+        data = encode_json_payload(file_content, file_type, extract_args)
+        return self.post_payload(url_endpoint, data, stream=stream)
 
-        start_time = time.time()
-        response = requests.post(
+    @property
+    def url(self) -> str:
+        """Full URL of this parser's endpoint."""
+        return f"{self._base_url}{self.endpoint}"
+
+    def post_payload(
+        self,
+        url_endpoint: str,
+        data: Union[bytes, memoryview],
+        stream: bool = False,
+    ) -> Tuple[Optional[requests.Response], str]:
+        """Send an already serialized JSON payload (see encode_json_payload)."""
+        if self.hedging is None:
+            return self._post_once(url_endpoint, data, stream)
+
+        # Attempts stream so that the loser's body is never downloaded
+        response, info = self.hedging.call(
             url_endpoint,
-            headers=self._headers,
-            data=json.dumps(payload),
-            timeout=TIMEOUT,
+            lambda: self._post_once(url_endpoint, data, stream=True),
+            succeeded=lambda outcome: outcome[0] is not None,
+            discard=lambda outcome: outcome[0] is not None and outcome[0].close(),
         )
+        if response is not None and not stream:
+            # Read the body now, as the non-streaming request would have
+            response.content
+        return response, info
+
+    def _post_once(
+        self,
+        url_endpoint: str,
+        data: Union[bytes, memoryview],
+        stream: bool = False,
+    ) -> Tuple[Optional[requests.Response], str]:
+        start_time = time.time()
+        try:
+            with guarded(self.breakers, url_endpoint) as call:
+                response = requests.post(
+                    url_endpoint,
+                    headers=self._headers,
+                    data=data,
+                    timeout=request_timeout(TIMEOUT),
+                    stream=stream,
+                )
+                if call is not None and is_failure_status(response.status_code):
+                    call.fail()
+        except CircuitOpen as e:
+            return None, f"Error: {e}"
         end_time = time.time()
 
         if response.status_code != 200:
@@ -41,6 +99,77 @@ class BaseSyncParser(BaseParser):
 
         return response, f"{end_time - start_time:.2f} seconds"
 
+    def payload_args(
+        self, extract_args: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Map user extraction arguments onto the endpoint payload."""
+        return extract_args
+
+    def _request_result(self, file_content, file_type, extract_args=None):
+        response, info = self.get_sync_response(
+            self.url,
+            file_content=file_content,
+            file_type=file_type,
+            extract_args=self.payload_args(extract_args),
+        )
+
+        if response is None:
+            return info, ""
+
+        try:
+            response_data = response.json()
+            result = response_data[self.result_key]
+            return result, f"Time Elapsed: {info}"
+        except json.JSONDecodeError:
+            return f"Error: Invalid JSON response: {response.text}", ""
+
+    def iter_result(
+        self,
+        file_content: str,
+        file_type: str,
+        extract_args: Optional[Dict[str, Any]] = None,
+        chunk_size: int = CHUNK_SIZE,
+        deadline: Optional[Deadline] = None,
+    ) -> Iterator[str]:
+        """Stream the result field of the response as decoded text chunks.
+
+        The response body is never buffered in full; a list result (e.g.
+        markdown per page) is yielded element by element, newline-separated.
+        ``deadline`` (by default the one current when iteration starts)
+        also bounds the download.
+
+        Raises:
+            Exception: If the endpoint returns a non-200 status.
+        """
+        active = deadline or current_deadline()
+        with use_deadline(active):
+            response, info = self.get_sync_response(
+                self.url,
+                file_content=file_content,
+                file_type=file_type,
+                extract_args=self.payload_args(extract_args),
+                stream=True,
+            )
+        if response is None:
+            raise Exception(info)
+
+        def chunks() -> Iterator[bytes]:
+            for chunk in response.iter_content(chunk_size):
+                if active is not None:
+                    active.check()
+                yield chunk
+
+        with response:
+            # Stop the download as soon as the call is cancelled
+            remove = None
+            if active is not None and active.cancel_token is not None:
+                remove = active.cancel_token.add_callback(response.close)
+            try:
+                yield from iter_json_field(chunks(), keys=(self.result_key,))
+            finally:
+                if remove is not None:
+                    remove()
+
     def parse(
         self,
         file_path=None,
@@ -65,6 +194,8 @@ class BaseSyncParser(BaseParser):
 class ParseSyncParser(BaseSyncParser):
     """Parse parser implementation."""
 
+    endpoint = "/anyparser/sync_parse"
+
     def parse(
         self,
         file_path=None,
@@ -72,27 +203,14 @@ class ParseSyncParser(BaseSyncParser):
         file_type=None,
         extract_args=None,
     ):
-        response, info = self.get_sync_response(
-            f"{self._base_url}/anyparser/sync_parse",
-            file_content=file_content,  # type: ignore
-            file_type=file_type,  # type: ignore
-            extract_args=extract_args,
-        )
-
-        if response is None:
-            return info, ""
-
-        try:
-            response_data = response.json()
-            result = response_data["markdown"]
-            return result, f"Time Elapsed: {info}"
-        except json.JSONDecodeError:
-            return f"Error: Invalid JSON response: {response.text}", ""
+        return self._request_result(file_content, file_type, extract_args)
 
 
 class ParseProSyncParser(BaseSyncParser):
     """Parse Pro parser implementation for multi-language support."""
 
+    endpoint = "/anyparser/sync_parse_pro"
+
     def parse(
         self,
         file_path=None,
@@ -100,27 +218,21 @@ class ParseProSyncParser(BaseSyncParser):
         file_type=None,
         extract_args=None,
     ):
-        response, info = self.get_sync_response(
-            f"{self._base_url}/anyparser/sync_parse_pro",
-            file_content=file_content,  # type: ignore
-            file_type=file_type,  # type: ignore
-            extract_args=extract_args,
-        )
-
-        if response is None:
-            return info, ""
-
-        try:
-            response_data = response.json()
-            result = response_data["markdown"]
-            return result, f"Time Elapsed: {info}"
-        except json.JSONDecodeError:
-            return f"Error: Invalid JSON response: {response.text}", ""
+        return self._request_result(file_content, file_type, extract_args)
 
 
 class ParseTextractSyncParser(BaseSyncParser):
     """Parse Textract parser implementation."""
 
+    endpoint = "/anyparser/sync_parse_textract"
+
+    def payload_args(self, extract_args):
+        # Add extract_tables parameter if provided in extract_args
+        payload_args = {}
+        if extract_args and "extract_tables" in extract_args:
+            payload_args["extract_tables"] = extract_args["extract_tables"]
+        return payload_args
+
     def parse(
         self,
         file_path=None,
@@ -128,32 +240,18 @@ class ParseTextractSyncParser(BaseSyncParser):
         file_type=None,
         extract_args=None,
     ):
-        # Add extract_tables parameter if provided in extract_args
-        payload_args = {}
-        if extract_args and "extract_tables" in extract_args:
-            payload_args["extract_tables"] = extract_args["extract_tables"]
-
-        response, info = self.get_sync_response(
-            f"{self._base_url}/anyparser/sync_parse_textract",
-            file_content=file_content,  # type: ignore
-            file_type=file_type,  # type: ignore
-            extract_args=payload_args,
-        )
-
-        if response is None:
-            return info, ""
-
-        try:
-            response_data = response.json()
-            result = response_data["markdown"]
-            return result, f"Time Elapsed: {info}"
-        except json.JSONDecodeError:
-            return f"Error: Invalid JSON response: {response.text}", ""
+        return self._request_result(file_content, file_type, extract_args)
 
 
 class ExtractPIISyncParser(BaseSyncParser):
     """Extract PII parser implementation."""
 
+    endpoint = "/anyparser/sync_extract_pii"
+    result_key = "result"
+
+    def payload_args(self, extract_args):
+        return None
+
     def extract(
         self,
         file_path=None,
@@ -161,27 +259,17 @@ class ExtractPIISyncParser(BaseSyncParser):
         file_type=None,
         extract_args=None,
     ):
-        response, info = self.get_sync_response(
-            f"{self._base_url}/anyparser/sync_extract_pii",
-            file_content=file_content,  # type: ignore
-            file_type=file_type,  # type: ignore
-            extract_args=None,
-        )
-
-        if response is None:
-            return info, ""
-
-        try:
-            response_data = response.json()
-            result = response_data["result"]
-            return result, f"Time Elapsed: {info}"
-        except json.JSONDecodeError:
-            return f"Error: Invalid JSON response: {response.text}", ""
+        return self._request_result(file_content, file_type, extract_args)
 
 
 class ExtractTablesSyncParser(BaseSyncParser):
     """Extract tables parser implementation."""
 
+    endpoint = "/anyparser/sync_extract_tables"
+
+    def payload_args(self, extract_args):
+        return {"extract_tables": True}
+
     def extract(
         self,
         file_path=None,
@@ -189,27 +277,25 @@ class ExtractTablesSyncParser(BaseSyncParser):
         file_type=None,
         extract_args=None,
     ):
-        response, info = self.get_sync_response(
-            f"{self._base_url}/anyparser/sync_extract_tables",
-            file_content=file_content,  # type: ignore
-            file_type=file_type,  # type: ignore
-            extract_args={"extract_tables": True},
-        )
-
-        if response is None:
-            return info, ""
-
-        try:
-            response_data = response.json()
-            result = response_data["markdown"]
-            return result, f"Time Elapsed: {info}"
-        except json.JSONDecodeError:
-            return f"Error: Invalid JSON response: {response.text}", ""
+        return self._request_result(file_content, file_type, extract_args)
 
 
 class ExtractKeyValueSyncParser(BaseSyncParser):
     """Extract key-value parser implementation."""
 
+    endpoint = "/anyparser/sync_extract_key_value"
+    result_key = "result"
+
+    def payload_args(self, extract_args):
+        # Handle the key-value extraction payload structure
+        payload_args = {}
+        if extract_args and "extract_instruction" in extract_args:
+            instruction = extract_args["extract_instruction"]
+            if instruction is not None:
+                instruction = ExtractionSchema.compile(instruction)
+            payload_args[PAYLOAD_KEY] = instruction
+        return payload_args
+
     def extract(
         self,
         file_path=None,
@@ -217,34 +303,18 @@ class ExtractKeyValueSyncParser(BaseSyncParser):
         file_type=None,
         extract_args=None,
     ):
-        # Handle the key-value extraction payload structure
-        payload_args = {}
-        if extract_args and "extract_instruction" in extract_args:
-            payload_args["extract_input_key_description_pairs"] = extract_args[
-                "extract_instruction"
-            ]
-
-        response, info = self.get_sync_response(
-            f"{self._base_url}/anyparser/sync_extract_key_value",
-            file_content=file_content,  # type: ignore
-            file_type=file_type,  # type: ignore
-            extract_args=payload_args,
-        )
-
-        if response is None:
-            return info, ""
-
-        try:
-            response_data = response.json()
-            result = response_data["result"]
-            return result, f"Time Elapsed: {info}"
-        except json.JSONDecodeError:
-            return f"Error: Invalid JSON response: {response.text}", ""
+        return self._request_result(file_content, file_type, extract_args)
 
 
 class ExtractResumeKeyValueSyncParser(BaseSyncParser):
     """Extract resume key-value parser implementation."""
 
+    endpoint = "/anyparser/sync_extract_resume_key_value"
+    result_key = "extraction_result"
+
+    def payload_args(self, extract_args):
+        return None
+
     def extract(
         self,
         file_path=None,
@@ -252,19 +322,4 @@ class ExtractResumeKeyValueSyncParser(BaseSyncParser):
         file_type=None,
         extract_args=None,
     ):
-        response, info = self.get_sync_response(
-            f"{self._base_url}/anyparser/sync_extract_resume_key_value",
-            file_content=file_content,  # type: ignore
-            file_type=file_type,  # type: ignore
-            extract_args=None,
-        )
-
-        if response is None:
-            return info, ""
-
-        try:
-            response_data = response.json()
-            result = response_data["extraction_result"]
-            return result, f"Time Elapsed: {info}"
-        except json.JSONDecodeError:
-            return f"Error: Invalid JSON response: {response.text}", ""
+        return self._request_result(file_content, file_type, extract_args)
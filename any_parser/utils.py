@@ -1,12 +1,17 @@
 import base64
 import io
 import json
+import re
+import uuid
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import IO, Any, BinaryIO, Dict, List, Optional, Tuple, Union
 
 import requests
 
+from any_parser.archive import input_size
+from any_parser.deadline import check_deadline, request_timeout
+
 SUPPORTED_FILE_EXTENSIONS = [
     "pdf",
     "doc",
@@ -27,20 +32,47 @@ class ValidationError(Enum):
     UNSUPPORTED_FILE_TYPE = "Unsupported file type: {}. Supported file types: {}"
     FILE_EMPTY = "File is empty: {}"
     FILE_TOO_LARGE = "File size exceeds maximum limit of {} MB: {}"
+    INVALID_BASE64 = "file_content is not valid base64: it has non-ASCII characters"
     OTHER = "{}"
 
 
+# Raw document data accepted in place of a path or base64 content
+BinaryInput = Union[bytes, bytearray, memoryview, IO[bytes]]
+
+
+def is_binary_input(value: Any) -> bool:
+    """Whether value is raw document data: bytes-like or a binary stream."""
+    return isinstance(value, (bytes, bytearray, memoryview)) or (
+        hasattr(value, "read") and not isinstance(value, (str, Path))
+    )
+
+
+def read_binary(value: BinaryInput) -> Union[bytes, memoryview]:
+    """The bytes of raw document data; buffers are used without copying."""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return memoryview(value).cast("B")
+    data = value.read()
+    if isinstance(data, str):
+        raise TypeError("file_content stream must be opened in binary mode")
+    return data
+
+
 def validate_file_inputs(
     file_path: Optional[str],
-    file_content: Optional[str],
+    file_content: Union[str, BinaryInput, None],
     file_type: Optional[str],
+    max_file_size_mb: Optional[float] = None,
 ) -> Tuple[bool, str]:
     """Validate inputs for the parser or extractor.
 
     Args:
-        file_content (Optional[str]): Base64 encoded file content
+        file_content (Union[str, BinaryInput, None]): Base64 encoded file
+            content (str) or the raw file as bytes or a binary stream
         file_path (Optional[str]): Path to the file
         file_type (Optional[str]): File extension/type
+        max_file_size_mb (Optional[float]): Maximum file size, unlimited if None
 
     Returns:
         Tuple[bool, str]: (is_valid, error_message)
@@ -55,22 +87,52 @@ def validate_file_inputs(
     if file_content is not None and file_type is None:
         return False, ValidationError.MISSING_FILE_TYPE.value
 
+    max_bytes = max_file_size_mb * 1024 * 1024 if max_file_size_mb else None
+
     # Validate file path if provided
     if file_path is not None:
         path = Path(file_path)
 
-        # Check if file exists
-        if not path.is_file():
+        # Check if file exists (a path or a member of an archive)
+        try:
+            size = input_size(file_path)
+        except OSError:
             return False, ValidationError.NOT_FOUND.value.format(file_path)
 
         # Check if file is empty
-        if path.stat().st_size == 0:
+        if size == 0:
             return False, ValidationError.FILE_EMPTY.value.format(file_path)
 
+        # Check if file is too large
+        if max_bytes and size > max_bytes:
+            return False, ValidationError.FILE_TOO_LARGE.value.format(
+                max_file_size_mb, file_path
+            )
+
         # If file_type not provided, extract it from file_path
         if file_type is None:
             file_type = path.suffix.lower().lstrip(".")
 
+    # Check size of raw bytes
+    elif isinstance(file_content, (bytes, bytearray, memoryview)):
+        size = memoryview(file_content).nbytes
+        if size == 0:
+            return False, ValidationError.FILE_EMPTY.value.format("file_content")
+        if max_bytes and size > max_bytes:
+            return False, ValidationError.FILE_TOO_LARGE.value.format(
+                max_file_size_mb, "file_content"
+            )
+
+    # Streams are checked by their readers, which learn the size
+    elif is_binary_input(file_content):
+        pass
+
+    # Check decoded size of inline content
+    elif max_bytes and file_content and len(file_content) * 3 // 4 > max_bytes:
+        return False, ValidationError.FILE_TOO_LARGE.value.format(
+            max_file_size_mb, "file_content"
+        )
+
     # Validate file type
     if file_type not in SUPPORTED_FILE_EXTENSIONS:
         supported_types = ", ".join(sorted(SUPPORTED_FILE_EXTENSIONS))
@@ -81,25 +143,160 @@ def validate_file_inputs(
     return True, ""
 
 
+def base64_content(file_content: str) -> bytes:
+    """Return base64 file content as ASCII bytes.
+
+    The content is passed on unchanged, as before, for the server to
+    decode; only text that cannot be base64 of any alphabet is refused.
+
+    Raises:
+        ValueError: If the content has non-ASCII characters.
+    """
+    try:
+        return file_content.encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError(ValidationError.INVALID_BASE64.value) from None
+
+
+# Characters json.dumps would escape that may appear in ASCII content
+_JSON_ESCAPED = re.compile(rb'["\\\r\n]')
+
+
+def encode_json_payload(
+    file_content: Union[str, bytes, Any],
+    file_type: str,
+    extract_args: Optional[Dict[str, Any]] = None,
+) -> bytes:
+    """Serialize a request payload with base64 file content to JSON bytes.
+
+    Base64 needs no JSON escaping, so the content is scanned once for
+    characters that would need it and, if there are none, concatenated
+    into the body as bytes. That is one copy of the content (two for a
+    str, which is encoded to ASCII first) instead of the decode, escape
+    and encode copies of ``json.dumps``, which only serializes the small
+    remaining fields. Line breaks and other such characters in the
+    content are escaped by ``json.dumps`` as usual; a str with non-ASCII
+    characters raises ValueError. Values with a pre-serialized
+    ``fragment`` (ExtractionSchema) are spliced in as they are. An
+    uploaded FileHandle is sent as its ``file_id`` instead of content.
+    """
+    payload = {"file_type": file_type}
+    fragments = {}
+    for key, value in (extract_args or {}).items():
+        if hasattr(value, "fragment"):
+            fragments[key] = value.fragment
+        else:
+            payload[key] = value
+    tail = json.dumps(payload)
+    if fragments:
+        tail = tail[:-1] + "".join(
+            f", {json.dumps(key)}: {fragment}" for key, fragment in fragments.items()
+        )
+        tail += "}"
+
+    file_id = getattr(file_content, "file_id", None)
+    if file_id is not None:
+        return f'{{"file_id": {json.dumps(file_id)}, {tail[1:]}'.encode("utf-8")
+
+    content = (
+        base64_content(file_content) if isinstance(file_content, str) else file_content
+    )
+    if _JSON_ESCAPED.search(content):
+        # Not plain base64; let json escape it
+        content = json.dumps(content.decode("ascii"))[1:-1].encode("ascii")
+    return b'{"file_content": "' + content + b'", ' + tail[1:].encode("utf-8")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _MultipartStream:
+    """multipart/form-data body that streams the file part from disk.
+
+    The length is known up front, so the upload is sent with a
+    Content-Length header, which presigned POST policies require.
+    """
+
+    def __init__(
+        self, fields: Dict[str, str], file: BinaryIO, file_name: str, size: int
+    ) -> None:
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = "".join(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+            for name, value in fields.items()
+        )
+        head += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        )
+        tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+        self._parts: List[BinaryIO] = [
+            io.BytesIO(head.encode("utf-8")),
+            file,
+            io.BytesIO(tail),
+        ]
+        self._length = len(head.encode("utf-8")) + size + len(tail)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        # Called by the sending thread, so a cancelled upload stops here
+        check_deadline()
+        chunks = []
+        while self._parts and size != 0:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+
 def upload_file_to_presigned_url(
-    file_content: str, response: requests.Response, timeout: int = 10
+    file_content: Union[str, BinaryIO],
+    response: requests.Response,
+    timeout: int = 10,
+    file_name: str = "file",
+    size: Optional[int] = None,
 ) -> str:
+    """Upload a file to the presigned URL in a ``fileId``/``presignedUrl`` response.
+
+    The content is base64 (str) or a binary stream of ``size`` bytes,
+    which is streamed without reading it into memory.
+
+    Returns:
+        str: The file ID, or an error message starting with "Error: ".
+    """
     if response.status_code == 200:
         try:
             file_id = response.json().get("fileId")
             presigned_url = response.json().get("presignedUrl")
 
-            # Decode base64 content
-            decoded_content = base64.b64decode(file_content)
-
-            # Create file-like object from decoded content
-            files = {"file": ("file", io.BytesIO(decoded_content))}
+            if isinstance(file_content, str):
+                # Decode base64 content
+                decoded_content = base64.b64decode(file_content)
+                file_content = io.BytesIO(decoded_content)
+                size = len(decoded_content)
 
+            body = _MultipartStream(
+                presigned_url["fields"], file_content, file_name, size
+            )
             upload_resp = requests.post(
                 presigned_url["url"],
-                data=presigned_url["fields"],
-                files=files,
-                timeout=timeout,
+                data=body,
+                headers={"Content-Type": body.content_type},
+                timeout=request_timeout(timeout),
             )
             if upload_resp.status_code != 204:
                 return f"Error: {upload_resp.status_code} {upload_resp.text}"
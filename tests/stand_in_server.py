@@ -0,0 +1,97 @@
+"""Local HTTP server standing in for the AnyParser API in tests"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Clients that time out, are cancelled or drop an oversized download hang up
+HANG_UPS = (BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serve a route table on a free local port from a daemon thread.
+
+    ``routes`` maps ``(method, path_prefix)`` to a handler called with the
+    request; the longest matching prefix wins and other paths get a 404.
+    A handler returns ``(code, body)``, sent as JSON (raw if bytes, empty
+    if None), or None once it has written the response itself. Keyword
+    arguments become attributes of the server, for handlers to read and
+    update under ``lock``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, routes, protocol_version="HTTP/1.0", **state):
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.routes = sorted(routes.items(), key=lambda item: -len(item[0][1]))
+        self.protocol_version = protocol_version
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.__dict__.update(state)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], HANG_UPS):
+            super().handle_error(request, client_address)
+
+
+def serve(test, routes, **kwargs):
+    """Start a StandInServer that is shut down when ``test`` ends."""
+    server = StandInServer(routes, **kwargs)
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return server
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    def setup(self):
+        super().setup()
+        self.protocol_version = self.server.protocol_version
+        self._body = None
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def body(self):
+        """The request body, read once."""
+        if self._body is None:
+            self._body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        return self._body
+
+    def json(self):
+        return json.loads(self.body)
+
+    def send(self, code, body=None):
+        if body is None:
+            data = b""
+        elif isinstance(body, bytes):
+            data = body
+        else:
+            data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        # Read the body even if the handler ignores it, so the client is
+        # not reset for sending data the server never read
+        self.body
+        for (method, prefix), handler in self.server.routes:
+            if method == self.command and self.path.startswith(prefix):
+                answer = handler(self)
+                if answer is not None:
+                    self.send(*answer)
+                return
+        self.send(404, {"message": f"No route for {self.command} {self.path}"})
+
+    do_GET = do_POST = do_PUT = do_DELETE = _route
@@ -0,0 +1,172 @@
+"""Testing documents read straight out of zip and tar archives"""
+
+import io
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+sys.path.append(".")
+import any_parser.archive as module  # noqa: E402
+from any_parser import AnyParser  # noqa: E402
+from any_parser.archive import (  # noqa: E402
+    MAX_OPEN_ZIPS,
+    close_archives,
+    input_size,
+    is_archive,
+    iter_members,
+    open_input,
+    split_member_key,
+)
+from any_parser.batch_parser import BatchParser  # noqa: E402
+from any_parser.bulk import iter_input_files  # noqa: E402
+from any_parser.dedup import file_sha256  # noqa: E402
+from any_parser.preflight import preflight  # noqa: E402
+from any_parser.utils import validate_file_inputs  # noqa: E402
+
+SAMPLE_PDF = "./examples/sample_data/sample.pdf"
+SAMPLE_PNG = "./examples/sample_data/test3.png"
+
+
+class TestArchive(unittest.TestCase):
+    """Testing member keys, streaming iteration and archive inputs"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        folder = Path(cls.tmp.name)
+        cls.pdf = Path(SAMPLE_PDF).read_bytes()
+        cls.png = Path(SAMPLE_PNG).read_bytes()
+
+        cls.zip_path = str(folder / "docs.zip")
+        with zipfile.ZipFile(cls.zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("reports/sample.pdf", cls.pdf)
+            archive.writestr("images/test3.png", cls.png)
+            archive.writestr("notes.txt", b"not a document")
+            archive.writestr("empty/", b"")
+
+        cls.tar_path = str(folder / "docs.tar.gz")
+        with tarfile.open(cls.tar_path, "w:gz") as archive:
+            for name, data in (("./a/sample.pdf", cls.pdf), ("./notes.txt", b"x")):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+    @classmethod
+    def tearDownClass(cls):
+        close_archives()
+        cls.tmp.cleanup()
+
+    def test_iter_members_filters_and_streams(self):
+        """Only documents are yielded, keyed by archive path"""
+        for archive_path, expected in (
+            (self.zip_path, ["reports/sample.pdf", "images/test3.png"]),
+            (self.tar_path, ["a/sample.pdf"]),
+        ):
+            with self.subTest(archive_path=archive_path):
+                members = [
+                    (member.key, member.file_type, member.read())
+                    for member in iter_members(archive_path, ["pdf", "png"])
+                ]
+                self.assertEqual(
+                    [key for key, _, _ in members],
+                    [f"{archive_path}!/{name}" for name in expected],
+                )
+                self.assertEqual(members[0][1], "pdf")
+                self.assertEqual(members[0][2], self.pdf)
+
+    def test_member_keys_work_as_file_paths(self):
+        """Size, hash, preflight and validation read members in place"""
+        self.assertTrue(is_archive(self.zip_path))
+        self.assertFalse(is_archive(SAMPLE_PDF))
+        self.assertIsNone(split_member_key(SAMPLE_PDF))
+        sample_sha256 = file_sha256(SAMPLE_PDF)
+        for key in (
+            f"{self.zip_path}!/reports/sample.pdf",
+            f"{self.tar_path}!/a/sample.pdf",
+            # Path() normalizes keys the way members are indexed
+            str(Path(f"{self.tar_path}!/./a/sample.pdf")),
+        ):
+            with self.subTest(key=key):
+                self.assertEqual(input_size(key), len(self.pdf))
+                self.assertEqual(file_sha256(key), sample_sha256)
+                self.assertEqual(preflight(key).page_count, 9)
+                self.assertEqual(validate_file_inputs(key, None, None), (True, ""))
+                with open_input(key) as file:
+                    file.seek(-5, io.SEEK_END)
+                    self.assertEqual(file.read(), self.pdf[-5:])
+
+        is_valid, error = validate_file_inputs(
+            f"{self.zip_path}!/missing.pdf", None, None
+        )
+        self.assertFalse(is_valid)
+        self.assertIn("does not exist", error)
+
+    def test_open_zips_are_closed(self):
+        """Zip archives read by key are closed on eviction, change and request"""
+        folder = Path(self.tmp.name)
+        paths = []
+        for number in range(MAX_OPEN_ZIPS + 2):
+            path = folder / f"many-{number}.zip"
+            with zipfile.ZipFile(path, "w") as archive:
+                archive.writestr("a.pdf", self.pdf)
+            paths.append(str(path))
+
+        first = open_input(f"{paths[0]}!/a.pdf")
+        self.addCleanup(first.close)
+        first_archive = module._zips[paths[0]][1]
+        for path in paths[1:]:
+            self.assertEqual(input_size(f"{path}!/a.pdf"), len(self.pdf))
+        self.assertEqual(len(module._zips), MAX_OPEN_ZIPS)
+        self.assertNotIn(paths[0], module._zips)
+        self.assertIsNone(first_archive.fp)
+        # A member opened before the eviction is still readable
+        self.assertEqual(first.read(), self.pdf)
+
+        # A changed archive is reopened and the old handle closed
+        last_archive = module._zips[paths[-1]][1]
+        with zipfile.ZipFile(paths[-1], "w") as archive:
+            archive.writestr("a.pdf", b"%PDF changed")
+        with open_input(f"{paths[-1]}!/a.pdf") as file:
+            self.assertEqual(file.read(), b"%PDF changed")
+        self.assertIsNone(last_archive.fp)
+
+        close_archives()
+        self.assertEqual(len(module._zips), 0)
+
+    def test_archive_inputs_expand_to_members(self):
+        """Bulk inputs and batch uploads list an archive's documents"""
+        pairs = list(iter_input_files([self.zip_path, SAMPLE_PDF]))
+        self.assertEqual(
+            [(str(path), str(name)) for path, name in pairs],
+            [
+                (f"{self.zip_path}!/reports/sample.pdf", "docs.zip/reports/sample.pdf"),
+                (f"{self.zip_path}!/images/test3.png", "docs.zip/images/test3.png"),
+                (str(Path(SAMPLE_PDF)), "sample.pdf"),
+            ],
+        )
+
+        batch = BatchParser("test-key", "http://localhost")
+        files, single = batch._input_files(Path(self.tar_path))
+        self.assertEqual(
+            ([str(f) for f in files], single),
+            ([f"{self.tar_path}!/a/sample.pdf"], False),
+        )
+        files, single = batch._input_files(Path(f"{self.zip_path}!/images/test3.png"))
+        self.assertTrue(single)
+
+    def test_iter_archive_checks_sizes_before_reading(self):
+        """Members over the size limit fail without a request"""
+        ap = AnyParser("test-key", base_url="http://localhost:9", max_file_size_mb=0.01)
+        results = list(ap.iter_archive(self.tar_path))
+        self.assertEqual(len(results), 1)
+        key, error, timing_info = results[0]
+        self.assertEqual(key, f"{self.tar_path}!/a/sample.pdf")
+        self.assertIn("exceeds maximum limit", error)
+        self.assertEqual(timing_info, "")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
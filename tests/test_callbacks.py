@@ -0,0 +1,137 @@
+"""Testing job resolution through completion callbacks"""
+
+import json
+import sys
+import threading
+import unittest
+import urllib.error
+import urllib.request
+import uuid
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.callbacks import CallbackReceiver  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+
+
+def post(url, body):
+    request = urllib.request.Request(
+        url, data=body, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def job_status(job_id):
+    return {"job_id": job_id, "status": "completed", "result": {"markdown": [job_id]}}
+
+
+def submit(request):
+    """Async endpoint that reports finished jobs to their callback URL."""
+    server = request.server
+    body = request.json()
+    job_id = str(uuid.uuid4())
+    with server.lock:
+        server.callback_urls.append(body.get("callback_url"))
+    if server.notify and body.get("callback_url"):
+        notification = server.notification or job_status(job_id)
+        notify = threading.Timer(
+            server.delay,
+            post,
+            (body["callback_url"], json.dumps(notification).encode()),
+        )
+        notify.start()
+        if not server.delay:
+            # Notify before the submission has even returned its job ID
+            notify.join()
+    return 200, {"job_id": job_id}
+
+
+def check_status(request):
+    with request.server.lock:
+        request.server.status_checks += 1
+    return 200, job_status(request.path.rsplit("/", 1)[-1])
+
+
+ROUTES = {("POST", "/"): submit, ("GET", "/"): check_status}
+
+
+class TestCallbacks(unittest.TestCase):
+    """Testing the callback receiver and the polling safety net"""
+
+    def _server(self, notify=True, notification=None, delay=0.0):
+        return serve(
+            self,
+            ROUTES,
+            notify=notify,
+            notification=notification,
+            delay=delay,
+            status_checks=0,
+            callback_urls=[],
+        )
+
+    def _parser(self, server, poll_interval):
+        receiver = CallbackReceiver(poll_interval=poll_interval)
+        self.addCleanup(receiver.close)
+        ap = AnyParser("key", base_url=server.url, callbacks=receiver)
+        self.addCleanup(ap.job_poller.shutdown)
+        return ap, receiver
+
+    def setUp(self):
+        self.content = "JVBERi0xLjQK"
+
+    def test_notifications_resolve_jobs(self):
+        """Jobs finish from their notifications without status polling"""
+        server = self._server()
+        ap, receiver = self._parser(server, poll_interval=60)
+
+        jobs = [
+            ap.submit_parse(file_content=self.content, file_type="pdf")
+            for _ in range(20)
+        ]
+        results = [job.result(timeout=10) for job in jobs]
+        self.assertEqual(results, [[job.job_id] for job in jobs])
+        self.assertEqual(server.status_checks, 0)
+        self.assertEqual(len(set(server.callback_urls)), 20)
+        self.assertEqual(receiver.stats()["notifications"], 20)
+        self.assertEqual(ap.job_poller.pending(), 0)
+
+    def test_lost_notifications_are_polled(self):
+        """Without a notification the safety-net poll resolves the job"""
+        server = self._server(notify=False)
+        ap, _ = self._parser(server, poll_interval=0.2)
+
+        job = ap.submit_parse(file_content=self.content, file_type="pdf")
+        self.assertEqual(job.result(timeout=10), [job.job_id])
+        self.assertEqual(server.status_checks, 1)
+
+    def test_notification_without_status(self):
+        """A bare notification makes the job's status be fetched once"""
+        server = self._server(notification={"event": "job.finished"}, delay=0.2)
+        ap, _ = self._parser(server, poll_interval=60)
+
+        job = ap.submit_parse(file_content=self.content, file_type="pdf")
+        self.assertEqual(job.result(timeout=10), [job.job_id])
+        self.assertEqual(server.status_checks, 1)
+
+    def test_rejected_notifications(self):
+        """Unknown callback URLs and malformed bodies are rejected"""
+        with CallbackReceiver() as receiver:
+            received = []
+            url = receiver.register(received.append)
+            self.assertEqual(post(receiver.url + "/any-parser/jobs/guess", b"{}"), 404)
+            self.assertEqual(post(url, b"not json"), 400)
+            self.assertEqual(post(url, b'{"status": "completed"}'), 200)
+            receiver.unregister(url)
+            self.assertEqual(post(url, b'{"status": "completed"}'), 404)
+            self.assertEqual(received, [{"status": "completed"}])
+            self.assertEqual(
+                receiver.stats(), {"notifications": 1, "rejected": 3, "waiting": 0}
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
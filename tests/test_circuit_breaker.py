@@ -0,0 +1,89 @@
+"""Testing per-endpoint circuit breakers"""
+
+import sys
+import time
+import unittest
+
+import requests
+
+sys.path.append(".")
+from any_parser.circuit_breaker import (  # noqa: E402
+    BreakerState,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpen,
+)
+
+
+def _failing_call(breaker):
+    with breaker.guard():
+        raise requests.ConnectionError("refused")
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Testing opening, fast failure and half-open probing"""
+
+    def test_opens_on_error_rate(self):
+        """Enough failures open the breaker; further calls fail fast"""
+        breaker = CircuitBreaker("sync_parse", min_calls=3, open_seconds=60)
+        for _ in range(2):
+            with breaker.guard():
+                pass
+        with self.assertRaises(requests.ConnectionError):
+            _failing_call(breaker)
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+        with breaker.guard() as call:
+            call.fail()
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        with self.assertRaises(CircuitOpen) as context:
+            with breaker.guard():
+                self.fail("call let through an open breaker")
+        self.assertGreater(context.exception.retry_after, 0)
+        stats = breaker.stats()
+        self.assertEqual((stats.calls, stats.failures), (4, 2))
+        self.assertEqual((stats.rejected, stats.opened), (1, 1))
+
+    def test_opens_on_slow_calls(self):
+        """Calls slower than slow_call_seconds count towards opening"""
+        breaker = CircuitBreaker(min_calls=2, slow_call_seconds=0.01)
+        for _ in range(2):
+            with breaker.guard():
+                time.sleep(0.02)
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+
+    def test_half_open_probe(self):
+        """After open_seconds one probe is let through and decides the state"""
+        breaker = CircuitBreaker(min_calls=1, open_seconds=0.05)
+        with self.assertRaises(requests.ConnectionError):
+            _failing_call(breaker)
+        time.sleep(0.06)
+        self.assertTrue(breaker.allows())
+        with self.assertRaises(requests.ConnectionError):
+            _failing_call(breaker)
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        time.sleep(0.06)
+        with breaker.guard():
+            self.assertFalse(breaker.allows())
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+
+    def test_other_errors_are_neutral(self):
+        """Errors raised by the caller do not count against the endpoint"""
+        breaker = CircuitBreaker(min_calls=1)
+        with self.assertRaises(ValueError):
+            with breaker.guard():
+                raise ValueError("bad payload")
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+        self.assertEqual(breaker.stats().calls, 0)
+
+    def test_registry_per_endpoint(self):
+        """The registry keeps one breaker per endpoint with shared options"""
+        registry = CircuitBreakerRegistry(min_calls=1)
+        with self.assertRaises(requests.ConnectionError):
+            _failing_call(registry.get("/sync_parse_pro"))
+        self.assertFalse(registry.allows("/sync_parse_pro"))
+        self.assertTrue(registry.allows("/sync_parse"))
+        self.assertEqual(set(registry.stats()), {"/sync_parse_pro", "/sync_parse"})
+
+
+if __name__ == "__main__":
+    unittest.main()
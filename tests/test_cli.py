@@ -0,0 +1,286 @@
+"""Testing the any-parser command line and the bulk runner"""
+
+import base64
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.bulk import (  # noqa: E402
+    BulkRunner,
+    ProcessPoolRunner,
+    iter_input_files,
+)
+from any_parser.cli import main  # noqa: E402
+from any_parser.constants import ProcessType  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+
+SHM_DIR = "/dev/shm"
+
+
+def shout(result):
+    """Postprocess that fails for results containing ``raise``."""
+    if "raise" in result[0]:
+        raise ValueError("postprocess failed")
+    return result[0].upper()
+
+
+def sync_parse(request):
+    """Sync parse endpoint answering with the decoded file content.
+
+    Files containing ``fail`` get a 500 answer.
+    """
+    content = base64.b64decode(request.json()["file_content"])
+    with request.server.lock:
+        request.server.contents.append(content)
+    if b"fail" in content:
+        return 500, {"message": "broken"}
+    return 200, {"markdown": [content.decode()]}
+
+
+ROUTES = {("POST", "/anyparser/"): sync_parse}
+
+
+class TestCli(unittest.TestCase):
+    """Testing input expansion, output names and exit codes of bulk commands"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.server = serve(self, ROUTES, contents=[])
+
+    def _write(self, name, data):
+        path = self.directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def _main(self, *args):
+        argv = ["--api-key", "key", "--base-url", self.server.url, "parse", *args]
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            code = main(argv)
+        return code, stderr.getvalue()
+
+    def _outputs(self, output_dir):
+        return {
+            path.relative_to(output_dir).as_posix(): path.read_text()
+            for path in sorted(output_dir.rglob("*"))
+            if path.is_file()
+        }
+
+    def test_directories_and_archives(self):
+        """Directories are walked and archive members are read in place"""
+        self._write("docs/a.pdf", b"%PDF a")
+        self._write("docs/sub/b.png", b"PNG b")
+        self._write("docs/notes.txt", b"skipped")
+        archive = self.directory / "more.zip"
+        with zipfile.ZipFile(archive, "w") as file:
+            file.writestr("inner/c.pdf", b"%PDF c")
+            file.writestr("readme.md", b"skipped")
+        output_dir = self.directory / "out"
+
+        code, _ = self._main(
+            str(self.directory / "docs"), str(archive), "-o", str(output_dir), "-q"
+        )
+        self.assertEqual(code, 0)
+        self.assertEqual(
+            self._outputs(output_dir),
+            {
+                "a.pdf.md": "%PDF a",
+                "sub/b.png.md": "PNG b",
+                "more.zip/inner/c.pdf.md": "%PDF c",
+            },
+        )
+        self.assertEqual(len(self.server.contents), 3)
+
+    def test_colliding_names(self):
+        """Inputs with the same relative name get numbered output names"""
+        self._write("a/x.pdf", b"%PDF from a")
+        self._write("b/x.pdf", b"%PDF from b")
+        self._write("c/X.PDF", b"%PDF from c")
+        output_dir = self.directory / "out"
+
+        code, stderr = self._main(
+            str(self.directory / "a"),
+            str(self.directory / "b"),
+            str(self.directory / "c" / "X.PDF"),
+            "-o",
+            str(output_dir),
+            "-q",
+        )
+        self.assertEqual(code, 0)
+        self.assertEqual(
+            self._outputs(output_dir),
+            {
+                "x.pdf.md": "%PDF from a",
+                "x~2.pdf.md": "%PDF from b",
+                "X~3.PDF.md": "%PDF from c",
+            },
+        )
+        self.assertIn("writing x~2.pdf", stderr)
+
+        # The same file given twice is processed once
+        code, _ = self._main(
+            str(self.directory / "a"),
+            str(self.directory / "a" / "x.pdf"),
+            "-o",
+            str(output_dir),
+            "-q",
+        )
+        self.assertEqual(code, 0)
+        self.assertEqual(len(self.server.contents), 4)
+
+    def test_partial_failure(self):
+        """One failed file makes the exit code 1; the others are still written"""
+        self._write("docs/good.pdf", b"%PDF good")
+        self._write("docs/bad.pdf", b"%PDF fail")
+        output_dir = self.directory / "out"
+        jsonl = self.directory / "results.jsonl"
+
+        code, stderr = self._main(
+            str(self.directory / "docs"),
+            "-o",
+            str(output_dir),
+            "--jsonl",
+            str(jsonl),
+        )
+        self.assertEqual(code, 1)
+        self.assertEqual(self._outputs(output_dir), {"good.pdf.md": "%PDF good"})
+        self.assertIn("1 succeeded, 1 failed", stderr)
+        self.assertIn("FAILED", stderr)
+        results = {
+            Path(line["file_path"]).name: line
+            for line in map(json.loads, jsonl.read_text().splitlines())
+        }
+        self.assertIsNone(results["good.pdf"]["error"])
+        self.assertTrue(results["bad.pdf"]["error"].startswith("Error"))
+
+        (self.directory / "empty").mkdir()
+        code, stderr = self._main(str(self.directory / "empty"), "-q")
+        self.assertEqual(code, 1)
+        self.assertIn("No supported input files found", stderr)
+
+
+class TestBulkRunner(unittest.TestCase):
+    """Testing deduplication and statistics of the bulk runner"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_run(self):
+        """Identical files are processed once and failures are counted"""
+        for name, data in [
+            ("a.pdf", b"same"),
+            ("sub/b.pdf", b"same"),
+            ("c.pdf", b"fail"),
+            ("d.pdf", b"other"),
+        ]:
+            path = self.directory / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        file_paths = [str(path) for path, _ in iter_input_files([self.directory])]
+        self.assertEqual(len(file_paths), 4)
+
+        calls = []
+
+        def parse(file_path):
+            calls.append(file_path)
+            data = Path(file_path).read_bytes()
+            if data == b"fail":
+                return "Error: failed", ""
+            if data == b"other":
+                raise ValueError("broken")
+            return data.decode(), "Time Elapsed: 0.01 seconds"
+
+        progress = []
+        runner = BulkRunner(
+            parse, max_workers=2, progress=lambda *args: progress.append(args[1:])
+        )
+        results = {Path(r.file_path).name: r for r in runner.run(file_paths)}
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(results["a.pdf"].result, "same")
+        self.assertEqual(results["b.pdf"].result, "same")
+        # The copy that was not processed points at the one that was
+        copies = [results["a.pdf"], results["b.pdf"]]
+        original = next(r for r in copies if r.file_path in calls)
+        duplicate = next(r for r in copies if r.file_path not in calls)
+        self.assertIsNone(original.duplicate_of)
+        self.assertEqual(duplicate.duplicate_of, original.file_path)
+        self.assertEqual(results["c.pdf"].error, "Error: failed")
+        self.assertEqual(results["d.pdf"].error, "Error: broken")
+        self.assertFalse(results["d.pdf"].ok)
+        stats = runner.stats
+        self.assertEqual(
+            (stats.files, stats.succeeded, stats.failed, stats.duplicates),
+            (4, 2, 2, 1),
+        )
+        self.assertEqual(sorted(done for done, _ in progress), [1, 2, 3, 4])
+
+        runner = BulkRunner(parse, max_workers=2, dedupe=False)
+        list(runner.run(file_paths))
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(runner.stats.duplicates, 0)
+
+
+@unittest.skipUnless(os.path.isdir(SHM_DIR), "No /dev/shm")
+class TestProcessPoolRunner(unittest.TestCase):
+    """Testing that the runner's shared memory blocks are always unlinked"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        server = serve(self, ROUTES, contents=[])
+        ap = AnyParser("key", base_url=server.url)
+        self.addCleanup(ap.job_poller.shutdown)
+        self.parser = ap.sync_parser(ProcessType.PARSE)
+        self.segments = set(os.listdir(SHM_DIR))
+
+    def tearDown(self):
+        self.assertEqual(set(os.listdir(SHM_DIR)) - self.segments, set())
+
+    def _run(self, **kwargs):
+        file_paths = []
+        for name, data in [
+            ("ok.pdf", b"%PDF ok"),
+            ("server.pdf", b"%PDF fail"),
+            ("worker.pdf", b"%PDF raise"),
+            ("large.pdf", b"%PDF " + os.urandom(1 << 20).hex().encode()),
+        ]:
+            path = self.directory / name
+            path.write_bytes(data)
+            file_paths.append(str(path))
+        runner = ProcessPoolRunner(
+            self.parser, processes=2, max_workers=4, dedupe=False, **kwargs
+        )
+        return {Path(r.file_path).name: r for r in runner.run(file_paths)}
+
+    def test_results(self):
+        """Results, server errors and raising workers leave no segments"""
+        results = self._run(postprocess=shout)
+        self.assertEqual(results["ok.pdf"].result, "%PDF OK")
+        self.assertTrue(results["large.pdf"].ok)
+        self.assertTrue(results["server.pdf"].error.startswith("Error"))
+        self.assertEqual(results["worker.pdf"].error, "Error: postprocess failed")
+
+    def test_unpicklable_postprocess(self):
+        """Blocks the worker never attached to are unlinked by the runner"""
+        results = self._run(postprocess=lambda result: result)
+        self.assertTrue(results["server.pdf"].error.startswith("Error"))
+        for name in ("ok.pdf", "worker.pdf", "large.pdf"):
+            self.assertIn("pickle", results[name].error)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
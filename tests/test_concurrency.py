@@ -0,0 +1,176 @@
+"""Testing the adaptive concurrency limiter"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(".")
+from any_parser.batch_parser import MAX_WORKERS, BatchParser  # noqa: E402
+from any_parser.bulk import BulkRunner, estimate_request_bytes  # noqa: E402
+from any_parser.concurrency import (  # noqa: E402
+    AdaptiveLimiter,
+    ByteBudget,
+    ServerBusy,
+    is_overload_error,
+)
+from any_parser.deadline import DeadlineExceeded, deadline  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+
+
+def slow_upload(request):
+    """Batch upload endpoint tracking how many uploads run at once."""
+    server = request.server
+    with server.lock:
+        server.running += 1
+        server.peak = max(server.peak, server.running)
+    time.sleep(0.1)
+    with server.lock:
+        server.running -= 1
+    return 200, {"fileName": "f.pdf", "requestId": "r", "requestStatus": "UPLOADED"}
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """Testing limit increases, decreases and blocking"""
+
+    def test_increases_while_in_use(self):
+        """Successful calls at the limit raise it additively"""
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.acquire()
+            limiter.release(0.01)
+            limiter.release(0.01)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.metrics().successes, 40)
+        self.assertTrue(all(r == "increase" for _, _, r in limiter.decisions()))
+
+    def test_overload_backs_off(self):
+        """Overload halves the limit; other errors leave it alone"""
+        limiter = AdaptiveLimiter(initial_limit=8)
+        with self.assertRaises(ValueError):
+            with limiter.slot():
+                raise ValueError("bad file")
+        self.assertEqual(limiter.limit, 8)
+        with self.assertRaises(ServerBusy):
+            with limiter.slot():
+                raise ServerBusy("429")
+        self.assertEqual(limiter.limit, 4)
+        metrics = limiter.metrics()
+        self.assertEqual((metrics.errors, metrics.overloads), (2, 1))
+        self.assertEqual(metrics.in_flight, 0)
+
+    def test_latency_gradient_decreases(self):
+        """Latency far above the baseline lowers the limit"""
+        limiter = AdaptiveLimiter(initial_limit=10, smoothing=1.0)
+        limiter.acquire()
+        limiter.release(0.001)
+        limiter.acquire()
+        limiter.release(0.01)
+        self.assertLess(limiter.limit, 10)
+        self.assertEqual(limiter.decisions()[-1][2], "latency")
+
+    def test_acquire_blocks_within_deadline(self):
+        """A full limiter blocks, and gives up when the deadline passes"""
+        limiter = AdaptiveLimiter(initial_limit=1)
+        limiter.acquire()
+        with self.assertRaises(DeadlineExceeded):
+            with deadline(0.2):
+                limiter.acquire()
+        timer = threading.Timer(0.1, limiter.release, args=(0.1,))
+        timer.start()
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        limiter.release(0.1)
+
+    def test_overload_messages(self):
+        """AnyParser error strings for 429/5xx and timeouts count as overload"""
+        self.assertTrue(is_overload_error("Error: 429 Too many requests"))
+        self.assertTrue(is_overload_error("Error: Deadline exceeded"))
+        self.assertFalse(is_overload_error("Error: 400 Bad request"))
+        self.assertFalse(is_overload_error("# markdown"))
+
+
+class TestByteBudget(unittest.TestCase):
+    """Testing admission by estimated bytes"""
+
+    def test_admission_and_peak(self):
+        """Work that does not fit waits; oversized work runs alone"""
+        budget = ByteBudget(100)
+        self.assertTrue(budget.try_acquire(60))
+        self.assertFalse(budget.try_acquire(50))
+        with self.assertRaises(DeadlineExceeded):
+            with deadline(0.1):
+                budget.acquire(50)
+        budget.release(60)
+        self.assertTrue(budget.try_acquire(500))
+        self.assertFalse(budget.try_acquire(1))
+        budget.release(500)
+        metrics = budget.metrics()
+        self.assertEqual((metrics.in_use, metrics.peak_bytes), (0, 500))
+        self.assertEqual((metrics.admitted, metrics.waits), (2, 1))
+
+    def test_bulk_runner_limits_large_files(self):
+        """A bulk run starts large files only while they fit in the budget"""
+        running, peak = [], []
+        lock = threading.Lock()
+
+        def call(file_path):
+            with lock:
+                running.append(file_path)
+                peak.append(sum("big" in path for path in running))
+            time.sleep(0.02)
+            with lock:
+                running.remove(file_path)
+            return "markdown", "0.02 seconds"
+
+        with tempfile.TemporaryDirectory() as folder:
+            paths = []
+            for name, size in [("big0", 2**20), ("big1", 2**20), ("big2", 2**20)]:
+                paths.append(os.path.join(folder, name))
+                with open(paths[-1], "wb") as file:
+                    file.write(os.urandom(size))
+            for index in range(10):
+                paths.append(os.path.join(folder, f"small{index}"))
+                with open(paths[-1], "wb") as file:
+                    file.write(os.urandom(100))
+            budget = ByteBudget(int(1.5 * estimate_request_bytes(paths[0])))
+            runner = BulkRunner(call, max_workers=8, memory_budget=budget)
+            results = list(runner.run(paths))
+
+        self.assertEqual(len(results), 13)
+        self.assertEqual(max(peak), 1)
+        self.assertGreater(runner.stats.memory.peak_bytes, 2**20)
+        self.assertLessEqual(runner.stats.memory.peak_bytes, budget.max_bytes)
+        self.assertEqual(runner.stats.memory.in_use, 0)
+
+
+class TestBatchUploads(unittest.TestCase):
+    """Testing the concurrency of folder uploads"""
+
+    def test_fixed_unless_limited(self):
+        """Folders upload MAX_WORKERS at a time unless a limiter is given"""
+        server = serve(self, {("POST", "/files/"): slow_upload}, running=0, peak=0)
+        with tempfile.TemporaryDirectory() as folder:
+            for index in range(MAX_WORKERS + 5):
+                with open(os.path.join(folder, f"{index}.pdf"), "wb") as file:
+                    file.write(b"%PDF-1.4 " + str(index).encode())
+
+            batches = BatchParser("key", server.url)
+            self.assertIsNone(batches.upload_limiter)
+            self.assertEqual(len(batches.create(folder)), MAX_WORKERS + 5)
+            self.assertEqual(server.peak, MAX_WORKERS)
+
+            server.peak = 0
+            limiter = AdaptiveLimiter(initial_limit=2, max_limit=3)
+            batches = BatchParser("key", server.url, upload_limiter=limiter)
+            self.assertEqual(len(batches.create(folder)), MAX_WORKERS + 5)
+            self.assertLessEqual(server.peak, 3)
+            self.assertEqual(limiter.metrics().successes, MAX_WORKERS + 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
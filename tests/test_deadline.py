@@ -0,0 +1,192 @@
+"""Testing deadlines and cancellation"""
+
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.append(".")
+from any_parser.deadline import (  # noqa: E402
+    CancellationToken,
+    Cancelled,
+    Deadline,
+    DeadlineExceeded,
+    closing_on_cancel,
+    current_deadline,
+    deadline,
+    iter_checked,
+    request_timeout,
+    run_in_context,
+)
+from tests.stand_in_server import serve  # noqa: E402
+
+
+def slow(request):
+    """``/slow`` answers after two seconds, ``/stream`` trickles its body."""
+    if request.path == "/slow":
+        time.sleep(2)
+    request.send_response(200)
+    request.send_header("Content-Length", str(50))
+    request.end_headers()
+    for _ in range(50):
+        request.wfile.write(b"x")
+        request.wfile.flush()
+        if request.path == "/stream":
+            time.sleep(0.1)
+
+
+class TestCancellationToken(unittest.TestCase):
+    """Testing token callbacks and their removal"""
+
+    def test_callbacks(self):
+        """Callbacks run once on cancel, unless removed"""
+        token = CancellationToken()
+        calls = []
+        token.add_callback(lambda: calls.append("a"))
+        remove = token.add_callback(lambda: calls.append("b"))
+        token.add_callback(lambda: 1 / 0)
+        remove()
+        remove()
+        self.assertFalse(token.cancelled)
+        token.cancel()
+        token.cancel()
+        self.assertTrue(token.cancelled)
+        self.assertEqual(calls, ["a"])
+        with self.assertRaises(Cancelled):
+            token.raise_if_cancelled()
+
+        # Callbacks added after cancellation run immediately
+        token.add_callback(lambda: calls.append("c"))()
+        self.assertEqual(calls, ["a", "c"])
+
+    def test_wait(self):
+        """wait returns early once cancelled"""
+        token = CancellationToken()
+        self.assertFalse(token.wait(0.01))
+        threading.Timer(0.05, token.cancel).start()
+        started = time.monotonic()
+        self.assertTrue(token.wait(5))
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class TestDeadline(unittest.TestCase):
+    """Testing expiry, nesting and propagation of deadlines"""
+
+    def test_expiry(self):
+        """Timeouts are capped at the time left, then the deadline raises"""
+        active = Deadline(0.2)
+        self.assertLessEqual(active.timeout(10), 0.2)
+        self.assertIsNone(Deadline().remaining())
+        self.assertEqual(Deadline().timeout(10), 10)
+        started = time.monotonic()
+        with self.assertRaises(DeadlineExceeded):
+            active.sleep(5)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertTrue(active.expired)
+        with self.assertRaises(DeadlineExceeded):
+            active.check()
+
+    def test_cancelled_sleep(self):
+        """Sleeping under a token wakes up when it is cancelled"""
+        token = CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+        started = time.monotonic()
+        with self.assertRaises(Cancelled):
+            Deadline(cancel_token=token).sleep(5)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_combine(self):
+        """Nested deadlines keep the earlier expiry and link the tokens"""
+        self.assertLessEqual(Deadline(1).combine(10).remaining(), 1)
+        self.assertGreater(Deadline(10).combine(1).remaining(), 0.5)
+        self.assertLessEqual(Deadline(10).combine(1).remaining(), 1)
+        self.assertLessEqual(Deadline(1).combine().remaining(), 1)
+
+        outer, inner = CancellationToken(), CancellationToken()
+        child = Deadline(cancel_token=outer).combine(cancel_token=inner)
+        self.assertIs(child.cancel_token, inner)
+        self.assertIs(Deadline(cancel_token=outer).combine().cancel_token, outer)
+        outer.cancel()
+        self.assertTrue(inner.cancelled)
+
+        inner = CancellationToken()
+        Deadline(cancel_token=outer).combine(cancel_token=inner)
+        self.assertTrue(inner.cancelled)
+
+    def test_nested_deadlines_release_the_outer_token(self):
+        """Leaving a nested deadline removes its callback from the outer token"""
+        outer = CancellationToken()
+        with deadline(cancel_token=outer):
+            for _ in range(100):
+                with deadline(1, CancellationToken()) as active:
+                    self.assertIsNotNone(active.expires_at)
+            inner = CancellationToken()
+            with deadline(cancel_token=inner):
+                self.assertEqual(len(outer._callbacks), 1)
+                outer.cancel()
+                self.assertTrue(inner.cancelled)
+        self.assertEqual(outer._callbacks, [])
+
+    def test_run_in_context(self):
+        """Work submitted with run_in_context runs under the caller's deadline"""
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with deadline(5) as active:
+                self.assertIs(current_deadline(), active)
+                inherited = run_in_context(executor, current_deadline).result()
+                plain = executor.submit(current_deadline).result()
+            self.assertIs(inherited, active)
+            self.assertIsNone(plain)
+            self.assertIsNone(current_deadline())
+
+
+class TestRequests(unittest.TestCase):
+    """Testing deadlines and cancellation of real requests"""
+
+    def setUp(self):
+        self.server = serve(self, {("GET", "/"): slow})
+
+    def test_request_timeout(self):
+        """A request gets at most the time left as its timeout"""
+        self.assertEqual(request_timeout(30), 30)
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            with deadline(0.2):
+                requests.get(self.server.url + "/slow", timeout=request_timeout(30))
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_closing_on_cancel(self):
+        """Cancelling closes a streaming response and stops reading it"""
+        token = CancellationToken()
+        received = []
+        started = time.monotonic()
+        with deadline(cancel_token=token):
+            with requests.get(
+                self.server.url + "/stream", stream=True, timeout=request_timeout(5)
+            ) as response, closing_on_cancel(response):
+                threading.Timer(0.2, token.cancel).start()
+                try:
+                    for chunk in response.iter_content(1):
+                        received.append(chunk)
+                except Exception:
+                    pass
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertLess(len(received), 50)
+        with self.assertRaises(Cancelled):
+            with deadline(cancel_token=token):
+                list(iter_checked([b"x"]))
+
+        # Without cancellation the callback is removed when the block ends
+        token = CancellationToken()
+        with deadline(cancel_token=token):
+            with requests.get(self.server.url + "/fast", stream=True) as response:
+                with closing_on_cancel(response):
+                    self.assertEqual(len(token._callbacks), 1)
+                    self.assertEqual(response.content, b"x" * 50)
+        self.assertEqual(token._callbacks, [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,177 @@
+"""Testing content-hash deduplication"""
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.dedup import (  # noqa: E402
+    ContentHashIndex,
+    file_sha256,
+    group_by_content,
+    stream_sha256,
+)
+from tests.stand_in_server import serve  # noqa: E402
+
+
+def upload(request):
+    """Batch upload endpoint recording the uploaded file contents."""
+    # The file is the only part: its content ends before the boundary
+    head, _, rest = request.body.partition(b"\r\n\r\n")
+    content = rest[: rest.rindex(b"\r\n--")]
+    file_name = head.split(b'filename="')[1].split(b'"')[0].decode()
+    with request.server.lock:
+        request.server.uploads.append(content)
+        request_id = f"request-{len(request.server.uploads)}"
+    return 200, {
+        "fileName": file_name,
+        "requestId": request_id,
+        "requestStatus": "UPLOADED",
+    }
+
+
+class TestDedup(unittest.TestCase):
+    """Testing hashing, grouping and the persistent index"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def _write(self, name, data):
+        path = self.directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def test_group_by_content(self):
+        """Identical files share a group, in input order"""
+        a = self._write("a.pdf", b"%PDF-1.4 one")
+        b = self._write("sub/b.pdf", b"%PDF-1.4 two")
+        c = self._write("c.pdf", b"%PDF-1.4 one")
+        groups = group_by_content([str(c), a, b], max_workers=2)
+        self.assertEqual(
+            groups,
+            {
+                hashlib.sha256(b"%PDF-1.4 one").hexdigest(): [c, a],
+                hashlib.sha256(b"%PDF-1.4 two").hexdigest(): [b],
+            },
+        )
+        self.assertEqual(file_sha256(a), hashlib.sha256(b"%PDF-1.4 one").hexdigest())
+
+        stream = io.BytesIO(b"skip rest")
+        stream.seek(5)
+        self.assertEqual(stream_sha256(stream), hashlib.sha256(b"rest").hexdigest())
+
+    def test_index_round_trip(self):
+        """Saved entries are appended and read back by a new index"""
+        path = self.directory / "index.jsonl"
+        index = ContentHashIndex(path)
+        index.put("a", {"requestId": "1"})
+        index.put("b", ["markdown"])
+        index.save()
+        index.put("c", "text")
+        index.save()
+        index.save()
+        self.assertEqual(len(path.read_text().splitlines()), 3)
+
+        loaded = ContentHashIndex(path)
+        self.assertEqual(len(loaded), 3)
+        self.assertEqual(loaded.get("a"), {"requestId": "1"})
+        self.assertEqual(loaded.get("b"), ["markdown"])
+        self.assertIn("c", loaded)
+        self.assertIsNone(loaded.get("d"))
+
+        # Replaced entries are compacted away once most lines are stale
+        for value in range(5):
+            loaded.put("a", value)
+            loaded.save()
+        self.assertLessEqual(len(path.read_text().splitlines()), 6)
+        self.assertEqual(ContentHashIndex(path).get("a"), 4)
+        self.assertEqual(os.listdir(self.directory), ["index.jsonl"])
+
+    def test_index_recovery(self):
+        """Cut-off lines are skipped; failed rewrites keep the file"""
+        path = self.directory / "index.jsonl"
+        journal = '["a", 1]\n["b", 2]\n["x", '
+        path.write_text(journal)
+        index = ContentHashIndex(path)
+        self.assertEqual((len(index), index.get("a"), index.get("b")), (2, 1, 2))
+
+        # Rewriting the cut-off journal fails on a value JSON cannot store
+        index.put("c", object())
+        with self.assertRaises(TypeError):
+            index.save()
+        self.assertEqual(path.read_text(), journal)
+        self.assertEqual(os.listdir(self.directory), ["index.jsonl"])
+
+        index.put("c", 3)
+        index.save()
+        self.assertEqual(len(path.read_text().splitlines()), 3)
+        with open(path, "a", encoding="utf-8") as file:
+            file.write('["d", ')
+        index = ContentHashIndex(path)
+        self.assertEqual(len(index), 3)
+        index.put("e", 5)
+        index.save()
+        self.assertEqual(ContentHashIndex(path).get("e"), 5)
+
+    def test_eviction(self):
+        """The least recently used entries are evicted past max_entries"""
+        index = ContentHashIndex(max_entries=2)
+        index.put("a", 1)
+        index.put("b", 2)
+        index.get("a")
+        index.put("c", 3)
+        self.assertEqual((index.get("a"), index.get("b"), index.get("c")), (1, None, 3))
+
+        path = self.directory / "index.jsonl"
+        index = ContentHashIndex(path)
+        for key in "abcd":
+            index.put(key, key)
+        index.save()
+        index = ContentHashIndex(path, max_entries=2)
+        self.assertEqual((len(index), index.get("a"), index.get("d")), (2, None, "d"))
+
+    def test_batch_dedupe(self):
+        """A folder's identical files are uploaded once and share the response"""
+        server = serve(self, {("POST", "/files/"): upload}, uploads=[])
+        batches = AnyParser("key", batch_url=server.url).batches
+
+        folder = self.directory / "docs"
+        self._write("docs/a.pdf", b"%PDF-1.4 one")
+        self._write("docs/sub/a.pdf", b"%PDF-1.4 one")
+        self._write("docs/b.pdf", b"%PDF-1.4 two")
+
+        # Every file is uploaded unless dedupe is asked for
+        self.assertEqual(len(batches.create(str(folder))), 3)
+        self.assertEqual(len(server.uploads), 3)
+        server.uploads.clear()
+
+        responses = batches.create(str(folder), dedupe=True)
+        self.assertEqual(sorted(server.uploads), [b"%PDF-1.4 one", b"%PDF-1.4 two"])
+        by_path = {
+            Path(r.filePath).relative_to(folder).as_posix(): r for r in responses
+        }
+        self.assertEqual(sorted(by_path), ["a.pdf", "b.pdf", "sub/a.pdf"])
+        self.assertEqual(by_path["a.pdf"].requestId, by_path["sub/a.pdf"].requestId)
+        self.assertNotEqual(by_path["a.pdf"].requestId, by_path["b.pdf"].requestId)
+
+        # With an index, content uploaded by an earlier run is not sent again
+        index_path = self.directory / "uploaded.jsonl"
+        batches.create(str(folder), hash_index=ContentHashIndex(index_path))
+        self.assertEqual(len(server.uploads), 4)
+        responses = batches.create(
+            str(folder / "b.pdf"), hash_index=ContentHashIndex(index_path)
+        )
+        self.assertEqual(len(server.uploads), 4)
+        self.assertEqual(responses.fileName, "b.pdf")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+"""Testing downloads of completed job results"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.append(".")
+from any_parser.constants import ProcessType  # noqa: E402
+from any_parser.downloads import ResultDownloader, ResultTooLarge  # noqa: E402
+from any_parser.jobs import JobPoller  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+
+
+def result(request):
+    """Job result of the page count in the path; ``/slow/...`` takes a second."""
+    if request.path.startswith("/slow/"):
+        time.sleep(1)
+    pages = int(request.path.rsplit("/", 1)[-1])
+    return 200, {"markdown": ["x" * 1000] * pages}
+
+
+class TestDownloads(unittest.TestCase):
+    """Testing the download pool, its connection reuse and size limits"""
+
+    def setUp(self):
+        self.server = serve(self, {("GET", "/"): result}, protocol_version="HTTP/1.1")
+
+    def _status(self, path):
+        return {"status": "completed", "result_url": self.server.url + path}
+
+    def test_fetch_reuses_connections(self):
+        """Results are read into memory over one kept-alive connection"""
+        downloader = ResultDownloader()
+        self.addCleanup(downloader.shutdown)
+        for _ in range(5):
+            self.assertEqual(downloader.fetch(self._status("/2")), ["x" * 1000] * 2)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(
+            downloader.fetch({"status": "completed", "result": {"markdown": ["a"]}}),
+            ["a"],
+        )
+
+    def test_size_limits(self):
+        """Results over the memory or file limit raise ResultTooLarge"""
+        downloader = ResultDownloader(max_bytes=5000, max_file_bytes=50_000)
+        self.addCleanup(downloader.shutdown)
+        self.assertEqual(len(downloader.fetch(self._status("/4"))), 4)
+        with self.assertRaises(ResultTooLarge):
+            downloader.fetch(self._status("/10"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "result.md")
+            self.assertEqual(downloader.fetch(self._status("/10"), path), path)
+            with open(path, encoding="utf-8") as file:
+                self.assertEqual(file.read(), "\n".join(["x" * 1000] * 10))
+            with self.assertRaises(ResultTooLarge):
+                downloader.fetch(self._status("/100"), path)
+
+    def test_downloads_do_not_block_polling(self):
+        """A slow download leaves the poller free to finish other jobs"""
+        statuses = {"slow": self._status("/slow/1"), "fast": self._status("/1")}
+        poller = JobPoller(statuses.get, poll_interval=0.05, max_workers=1)
+        self.addCleanup(poller.shutdown)
+
+        slow = poller.track("slow", ProcessType.PARSE)
+        time.sleep(0.2)
+        fast = poller.track("fast", ProcessType.PARSE)
+        self.assertEqual(fast.result(timeout=5), ["x" * 1000])
+        self.assertFalse(slow.done())
+        self.assertEqual(slow.result(timeout=5), ["x" * 1000])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
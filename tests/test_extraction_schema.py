@@ -0,0 +1,61 @@
+"""Testing compiled key-value extraction instructions"""
+
+import json
+import pickle
+import sys
+import unittest
+
+sys.path.append(".")
+from any_parser.extraction_schema import PAYLOAD_KEY, ExtractionSchema  # noqa: E402
+from any_parser.utils import encode_json_payload  # noqa: E402
+
+INSTRUCTION = {
+    "invoice_number": "The invoice number",
+    "total": 'The total amount, e.g. "$1,000"',
+}
+
+
+class TestExtractionSchema(unittest.TestCase):
+    """Testing normalization, hashing and payload serialization"""
+
+    def test_dict_and_list_inputs_are_equal(self):
+        """Dict and list instructions compile to the same schema"""
+        as_list = [{"key": k, "description": v} for k, v in INSTRUCTION.items()]
+        schema = ExtractionSchema(INSTRUCTION)
+        self.assertEqual(schema, ExtractionSchema(as_list))
+        self.assertEqual(hash(schema), hash(ExtractionSchema(as_list)))
+        self.assertEqual(schema.to_list(), as_list)
+        self.assertEqual(schema.keys, list(INSTRUCTION))
+
+    def test_compile_reuses_schema(self):
+        """compile returns cached schemas and passes schemas through"""
+        schema = ExtractionSchema.compile(INSTRUCTION)
+        self.assertIs(ExtractionSchema.compile(dict(INSTRUCTION)), schema)
+        self.assertIs(ExtractionSchema.compile(schema), schema)
+        self.assertEqual(pickle.loads(pickle.dumps(schema)), schema)
+
+    def test_invalid_instructions(self):
+        """Invalid instructions are rejected at compile time"""
+        for instruction in ("keys", {}, [{"description": "x"}], {"": "x"}, {"a": 1}):
+            with self.subTest(instruction=instruction):
+                with self.assertRaises(ValueError):
+                    ExtractionSchema.compile(instruction)
+        with self.assertRaises(ValueError):
+            ExtractionSchema([{"key": "a"}, {"key": "a"}])
+
+    def test_payload_fragment(self):
+        """The pre-serialized fragment is spliced into the request body"""
+        schema = ExtractionSchema.compile(INSTRUCTION)
+        body = encode_json_payload("QUJD", "pdf", {PAYLOAD_KEY: schema})
+        self.assertEqual(
+            json.loads(body),
+            {
+                "file_content": "QUJD",
+                "file_type": "pdf",
+                PAYLOAD_KEY: schema.to_list(),
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
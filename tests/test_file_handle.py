@@ -0,0 +1,182 @@
+"""Testing upload-once file handles"""
+
+import io
+import json
+import sys
+import unittest
+from email.parser import BytesParser
+from email.policy import default
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.file_handle import FileHandleRegistry  # noqa: E402
+from any_parser.utils import encode_json_payload  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+
+SAMPLE_PDF = "./examples/sample_data/sample.pdf"
+
+
+def request_upload(request):
+    """Presigned upload endpoint."""
+    server = request.server
+    with server.lock:
+        server.upload_requests.append(request.json())
+        file_id = f"file-{len(server.upload_requests)}"
+    return 200, {
+        "fileId": file_id,
+        "presignedUrl": {
+            "url": f"{server.url}/bucket",
+            "fields": {"key": f"uploads/{file_id}", "policy": "signed"},
+        },
+        "expiresIn": server.expires_in,
+    }
+
+
+def bucket(request):
+    """Bucket receiving the multipart upload."""
+    message = BytesParser(policy=default).parsebytes(
+        f"Content-Type: {request.headers['Content-Type']}\r\n\r\n".encode()
+        + request.body
+    )
+    parts = {
+        part.get_param("name", header="content-disposition"): part.get_payload(
+            decode=True
+        )
+        for part in message.iter_parts()
+    }
+    with request.server.lock:
+        request.server.uploads.append((dict(request.headers), parts))
+    return request.server.bucket_status, None
+
+
+def sync_parse(request):
+    with request.server.lock:
+        request.server.parse_requests.append(request.json())
+    return 200, {"markdown": ["parsed"]}
+
+
+ROUTES = {
+    ("POST", "/upload"): request_upload,
+    ("POST", "/bucket"): bucket,
+    ("POST", "/anyparser/"): sync_parse,
+}
+
+
+class TestFileHandles(unittest.TestCase):
+    """Testing uploads, the handle registry and requests by file ID"""
+
+    def _server(self, expires_in=3600, bucket_status=204):
+        return serve(
+            self,
+            ROUTES,
+            expires_in=expires_in,
+            bucket_status=bucket_status,
+            upload_requests=[],
+            uploads=[],
+            parse_requests=[],
+        )
+
+    def _parser(self, server, **kwargs):
+        return AnyParser(
+            "key", base_url=server.url, upload_url=server.url + "/upload", **kwargs
+        )
+
+    def setUp(self):
+        with open(SAMPLE_PDF, "rb") as file:
+            self.data = file.read()
+
+    def test_registry_reuses_uploads(self):
+        """The same content is uploaded once per registry until it expires"""
+        server = self._server()
+        registry = FileHandleRegistry()
+        ap = self._parser(server, file_handles=registry)
+        handle = ap.upload(file_path=SAMPLE_PDF)
+        self.assertIs(ap.upload(self.data, file_type="pdf"), handle)
+        shared = self._parser(server, file_handles=registry)
+        self.assertIs(shared.upload(file_path=SAMPLE_PDF), handle)
+        self.assertEqual(len(server.uploads), 1)
+        self.assertEqual(
+            server.upload_requests, [{"file_name": "sample.pdf", "file_type": "pdf"}]
+        )
+        self.assertEqual(handle.file_id, "file-1")
+        self.assertEqual(handle.size_bytes, len(self.data))
+
+        # A new registry uploads again
+        self.assertEqual(
+            self._parser(server).upload(self.data, file_type="pdf").file_id, "file-2"
+        )
+
+    def test_expired_handles(self):
+        """Handles about to expire are uploaded again and rejected by methods"""
+        server = self._server(expires_in=30)
+        ap = self._parser(server)
+        handle = ap.upload(file_path=SAMPLE_PDF)
+        self.assertTrue(handle.expired)
+        self.assertEqual(ap.upload(file_path=SAMPLE_PDF).file_id, "file-2")
+        self.assertEqual(len(ap.file_handles), 1)
+
+        result, timing = ap.parse(handle)
+        self.assertEqual(
+            result, "Error: file handle file-1 has expired, upload the file again"
+        )
+        self.assertEqual(timing, "")
+        self.assertEqual(server.parse_requests, [])
+
+    def test_multipart_streaming(self):
+        """A stream is sent in chunks with its length and the presigned fields"""
+        server = self._server()
+        ap = self._parser(server)
+        reads = []
+
+        class Recording(io.BytesIO):
+            def read(self, size=-1):
+                chunk = super().read(size)
+                reads.append(len(chunk))
+                return chunk
+
+            def seek(self, *args):
+                # Only count the reads after the stream is rewound for upload
+                reads.clear()
+                return super().seek(*args)
+
+        stream = Recording(self.data)
+        handle = ap.upload(stream, file_type="pdf")
+        self.assertFalse(stream.closed)
+        self.assertLess(max(reads), len(self.data))
+
+        headers, parts = server.uploads[0]
+        self.assertNotIn("Transfer-Encoding", headers)
+        self.assertEqual(parts["key"], f"uploads/{handle.file_id}".encode())
+        self.assertEqual(parts["policy"], b"signed")
+        self.assertEqual(parts["file"], self.data)
+        self.assertEqual(list(parts), ["key", "policy", "file"])
+
+    def test_payload_encoding(self):
+        """Requests with a handle send its file ID instead of the content"""
+        server = self._server()
+        ap = self._parser(server)
+        handle = ap.upload(file_path=SAMPLE_PDF)
+        result, _ = ap.parse(handle)
+        self.assertEqual(result, ["parsed"])
+        self.assertEqual(
+            server.parse_requests, [{"file_id": handle.file_id, "file_type": "pdf"}]
+        )
+        self.assertEqual(
+            json.loads(encode_json_payload(handle, "pdf", {"mode": "fast"})),
+            {"file_id": handle.file_id, "file_type": "pdf", "mode": "fast"},
+        )
+
+    def test_failed_uploads(self):
+        """Uploads need upload_url, and failed uploads are not registered"""
+        with self.assertRaises(ValueError):
+            AnyParser("key").upload(file_path=SAMPLE_PDF)
+
+        server = self._server(bucket_status=403)
+        ap = self._parser(server)
+        with self.assertRaisesRegex(Exception, "Error: 403"):
+            ap.upload(file_path=SAMPLE_PDF)
+        self.assertEqual(len(ap.file_handles), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
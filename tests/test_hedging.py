@@ -0,0 +1,94 @@
+"""Testing hedged requests"""
+
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(".")
+from any_parser.hedging import HedgePolicy  # noqa: E402
+
+
+class _Server:
+    """Calls that are fast except when told to be slow"""
+
+    def __init__(self):
+        self.calls = 0
+        self.slow = set()
+        self.discarded = []
+        self._lock = threading.Lock()
+
+    def call(self):
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+        time.sleep(0.5 if number in self.slow else 0.001)
+        return number
+
+
+class TestHedgePolicy(unittest.TestCase):
+    """Testing the threshold, the race and the budget"""
+
+    def _policy(self, **kwargs):
+        policy = HedgePolicy(min_samples=10, min_delay=0.02, **kwargs)
+        self.addCleanup(policy.shutdown)
+        return policy
+
+    def _warm_up(self, policy, server, count=10):
+        for _ in range(count):
+            policy.call("parse", server.call, bool, server.discarded.append)
+
+    def test_hedge_wins_over_slow_request(self):
+        """A slow request is raced and the duplicate's result is used"""
+        policy = self._policy(budget=0.5)
+        server = _Server()
+        self._warm_up(policy, server)
+        server.slow.add(11)
+        start = time.monotonic()
+        result = policy.call("parse", server.call, bool, server.discarded.append)
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(result, 12)
+        stats = policy.stats()
+        self.assertEqual((stats.requests, stats.hedged, stats.hedges_won), (11, 1, 1))
+        # The slow primary's latency so far is recorded, not just the winner's
+        self.assertGreater(stats.thresholds["parse"], 0.02)
+        self.assertLess(stats.thresholds["parse"], 0.3)
+        time.sleep(0.6)
+        self.assertEqual(server.discarded, [11])
+
+    def test_budget_caps_hedges(self):
+        """No hedge is sent once the budget is used up"""
+        policy = self._policy(budget=0.05)
+        server = _Server()
+        self._warm_up(policy, server)
+        server.slow.add(11)
+        result = policy.call("parse", server.call, bool, server.discarded.append)
+        self.assertEqual(result, 11)
+        stats = policy.stats()
+        self.assertEqual((stats.hedged, stats.budget_denied), (0, 1))
+
+    def test_full_pool_skips_hedges(self):
+        """Attempts share a bounded pool; no hedge is queued behind it"""
+        policy = self._policy(budget=0.5, max_workers=1)
+        server = _Server()
+        self._warm_up(policy, server)
+        server.slow.add(11)
+        result = policy.call("parse", server.call, bool, server.discarded.append)
+        self.assertEqual(result, 11)
+        stats = policy.stats()
+        self.assertEqual((stats.hedged, stats.pool_full), (0, 1))
+        self.assertEqual(server.calls, 11)
+
+    def test_failed_hedge_falls_back_to_primary(self):
+        """A failing duplicate does not win the race"""
+        policy = self._policy(budget=0.5)
+        server = _Server()
+        self._warm_up(policy, server)
+        server.slow.add(11)
+        result = policy.call("parse", server.call, lambda n: n != 12, lambda n: None)
+        self.assertEqual(result, 11)
+        self.assertEqual(policy.stats().hedges_won, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+"""Testing client-side image preprocessing"""
+
+import importlib.util
+import io
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.append(".")
+import any_parser.image_preprocessing as module  # noqa: E402
+from any_parser.image_preprocessing import (  # noqa: E402
+    ImagePreprocessOptions,
+    ImagePreprocessor,
+    preprocess_image,
+)
+
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+
+def encode(image, format, **kwargs):
+    output = io.BytesIO()
+    image.save(output, format, **kwargs)
+    return output.getvalue()
+
+
+def gradient(size):
+    from PIL import Image
+
+    image = Image.linear_gradient("L").resize(size)
+    return Image.merge("RGB", (image, image.transpose(Image.FLIP_LEFT_RIGHT), image))
+
+
+def noise(size):
+    from PIL import Image
+
+    return Image.merge("RGB", [Image.effect_noise(size, 64) for _ in range(3)])
+
+
+def open_image(data):
+    from PIL import Image
+
+    return Image.open(io.BytesIO(data))
+
+
+@unittest.skipUnless(HAS_PILLOW, "Pillow is not installed")
+class TestImagePreprocessing(unittest.TestCase):
+    """Testing orientation, downscaling, the quality check and fallbacks"""
+
+    def test_exif_transpose(self):
+        """The EXIF orientation is applied before the metadata is dropped"""
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 degrees clockwise
+        data = encode(gradient((400, 200)), "JPEG", quality=100, exif=exif)
+
+        processed, report = preprocess_image(data, "jpg", ImagePreprocessOptions())
+        self.assertTrue(report.applied)
+        self.assertLess(len(processed), len(data))
+        self.assertEqual(report.original_size, (400, 200))
+        self.assertEqual(report.processed_size, (200, 400))
+        image = open_image(processed)
+        self.assertEqual(image.size, (200, 400))
+        self.assertNotIn(0x0112, image.getexif())
+
+    def test_kept_metadata(self):
+        """Without stripping, EXIF is kept but for the applied orientation"""
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotate 90 degrees clockwise
+        exif[0x010F] = "Camera maker"
+        data = encode(gradient((4000, 2000)), "JPEG", quality=100, exif=exif)
+
+        options = ImagePreprocessOptions(strip_metadata=False)
+        processed, report = preprocess_image(data, "jpg", options)
+        self.assertTrue(report.applied)
+        image = open_image(processed)
+        self.assertEqual(image.size, (1500, 3000))
+        self.assertEqual(image.getexif().get(0x010F), "Camera maker")
+        self.assertNotIn(0x0112, image.getexif())
+
+        processed, _ = preprocess_image(data, "jpg", ImagePreprocessOptions())
+        self.assertEqual(len(open_image(processed).getexif()), 0)
+
+    def test_resize_bound(self):
+        """The longest side is limited by max_dimension and target_dpi"""
+        data = encode(noise((4000, 1000)), "PNG")
+
+        options = ImagePreprocessOptions(max_dimension=1000)
+        processed, report = preprocess_image(data, "png", options)
+        self.assertEqual(open_image(processed).size, (1000, 250))
+        self.assertEqual(report.processed_size, (1000, 250))
+        self.assertEqual(report.bytes_saved, len(data) - len(processed))
+
+        options = ImagePreprocessOptions(target_dpi=50, page_size_inches=11)
+        processed, _ = preprocess_image(data, "png", options)
+        self.assertEqual(open_image(processed).size, (550, 138))
+
+        small = encode(noise((100, 50)), "PNG")
+        processed, report = preprocess_image(small, "png", ImagePreprocessOptions())
+        self.assertEqual(report.processed_size, (100, 50))
+
+    def test_psnr_rejection(self):
+        """Recompression below min_psnr keeps the original bytes"""
+        data = encode(noise((300, 300)), "JPEG", quality=100)
+
+        options = ImagePreprocessOptions(min_psnr=80)
+        processed, report = preprocess_image(data, "jpg", options)
+        self.assertIs(processed, data)
+        self.assertFalse(report.applied)
+        self.assertLess(report.psnr, 80)
+
+        options = ImagePreprocessOptions(min_psnr=20)
+        processed, report = preprocess_image(data, "jpg", options)
+        self.assertTrue(report.applied)
+        self.assertGreaterEqual(report.psnr, 20)
+
+    def test_fallback(self):
+        """Images Pillow cannot decode or encode are sent unchanged"""
+        preprocessor = ImagePreprocessor()
+        self.addCleanup(preprocessor.shutdown)
+        garbage = b"\x89PNG\r\n\x1a\n not really a png"
+        cmyk = encode(gradient((300, 300)).convert("CMYK"), "JPEG")
+        with self.assertLogs("any_parser.image_preprocessing", "WARNING") as logs:
+            self.assertIs(preprocessor.process(garbage, "png"), garbage)
+            # PNG cannot store CMYK
+            self.assertIs(preprocessor.process(cmyk, "png"), cmyk)
+        self.assertEqual(len(logs.output), 2)
+
+        data = encode(gradient((4000, 2000)), "JPEG", quality=100)
+        processed = preprocessor.process(data, "jpg")
+        self.assertEqual(open_image(processed).size, (3000, 1500))
+        stats = preprocessor.stats
+        self.assertEqual((stats["images"], stats["failed"]), (1, 2))
+        self.assertEqual(stats["bytes_saved"], len(data) - len(processed))
+
+    def test_pool(self):
+        """At most max_workers images are processed at once, or inline"""
+        running, peak, threads = [0], [0], set()
+        lock = threading.Lock()
+        original = module.preprocess_image
+
+        def tracked(data, file_type, options):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                threads.add(threading.current_thread().name)
+            try:
+                return original(data, file_type, options)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        data = encode(noise((500, 500)), "PNG")
+        with mock.patch.object(module, "preprocess_image", tracked):
+            preprocessor = ImagePreprocessor(max_workers=2)
+            self.addCleanup(preprocessor.shutdown)
+            futures = [preprocessor.submit(data, "png") for _ in range(6)]
+            results = [future.result() for future in futures]
+            self.assertLessEqual(peak[0], 2)
+            self.assertTrue(all(n.startswith("any-parser-images") for n in threads))
+
+            threads.clear()
+            inline = ImagePreprocessor(max_workers=None)
+            self.assertEqual(inline.submit(data, "png").result(), results[0])
+            self.assertEqual(threads, {threading.current_thread().name})
+        self.assertEqual(preprocessor.stats["images"], 6)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,200 @@
+"""Testing page digests and result assembly of incremental parsing"""
+
+import base64
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.dedup import ContentHashIndex  # noqa: E402
+from any_parser.incremental import (  # noqa: E402
+    PAGE_STORE_ENTRIES,
+    PdfPages,
+    merge_page_results,
+    store_key,
+)
+from tests.stand_in_server import serve  # noqa: E402
+
+SAMPLE_PDF = "./examples/sample_data/sample.pdf"
+SAMPLE_PNG = "./examples/sample_data/resume_1.png"
+
+
+def revise(data, edit):
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(data)))
+    edit(writer)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def edit_page_4(writer):
+    from pypdf.generic import DecodedStreamObject, NameObject
+
+    page = writer.pages[4]
+    stream = DecodedStreamObject()
+    stream.set_data(page.get_contents().get_data() + b"\nBT (rev) Tj ET")
+    page[NameObject("/Contents")] = writer._add_object(stream)
+
+
+def sync_parse(request):
+    """Sync parse endpoint answering a page PDF with the page's digest.
+
+    The next ``failures`` requests fail; whole non-PDF files are answered
+    with their file type.
+    """
+    server = request.server
+    body = request.json()
+    with server.lock:
+        server.requests.append(body["file_type"])
+        failed = server.failures > 0
+        server.failures -= failed
+    if failed:
+        return 500, {"error": "unavailable"}
+    data = base64.b64decode(body["file_content"])
+    if data.startswith(b"%PDF") and b"damaged" not in data:
+        return 200, {"markdown": PdfPages(data).digests}
+    return 200, {"markdown": [f"whole {body['file_type']}"]}
+
+
+@unittest.skipUnless(importlib.util.find_spec("pypdf"), "pypdf is not installed")
+class TestIncremental(unittest.TestCase):
+    """Testing which pages count as changed"""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(SAMPLE_PDF, "rb") as file:
+            cls.data = file.read()
+        cls.pages = PdfPages(cls.data)
+
+    def _revise(self, edit):
+        return PdfPages(revise(self.data, edit))
+
+    def test_unchanged_pages_keep_their_digest(self):
+        """Re-saving and inserting pages does not change other pages"""
+        self.assertEqual(len(self.pages), 9)
+        self.assertEqual(len(set(self.pages.digests)), 9)
+
+        revised = self._revise(lambda writer: writer.insert_page(writer.pages[8], 0))
+        self.assertEqual(revised.digests[1:], self.pages.digests)
+        self.assertEqual(revised.digests[0], self.pages.digests[8])
+
+    def test_changed_content_changes_the_digest(self):
+        """Editing one page's content stream changes only that page"""
+        revised = self._revise(edit_page_4)
+        changed = [
+            index
+            for index, digest in enumerate(revised.digests)
+            if digest != self.pages.digests[index]
+        ]
+        self.assertEqual(changed, [4])
+
+    def test_page_pdf_and_store_keys(self):
+        """Pages are sent as one-page PDFs and stored per model and args"""
+        single = PdfPages(self.pages.page_pdf(4))
+        self.assertEqual(single.digests, [self.pages.digests[4]])
+
+        digest = self.pages.digests[0]
+        self.assertEqual(
+            store_key("parse", None, digest), store_key("parse", {}, digest)
+        )
+        self.assertNotEqual(
+            store_key("parse", None, digest), store_key("parse_pro", None, digest)
+        )
+        self.assertNotEqual(
+            store_key("parse", None, digest),
+            store_key("parse", {"language": "fr"}, digest),
+        )
+
+    def test_merge_page_results(self):
+        """Markdown lists are concatenated, other results joined as text"""
+        self.assertEqual(merge_page_results([["a"], ["b", "c"]]), ["a", "b", "c"])
+        self.assertEqual(merge_page_results(["a", ["b"]]), "a\n\nb")
+
+
+@unittest.skipUnless(importlib.util.find_spec("pypdf"), "pypdf is not installed")
+class TestParseIncremental(unittest.TestCase):
+    """Testing parse_incremental against a stand-in sync endpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(SAMPLE_PDF, "rb") as file:
+            cls.data = file.read()
+        cls.revised = revise(cls.data, edit_page_4)
+
+    def setUp(self):
+        self.server = serve(
+            self, {("POST", "/anyparser/"): sync_parse}, failures=0, requests=[]
+        )
+
+    def _parser(self, page_store=None):
+        return AnyParser("key", base_url=self.server.url, page_store=page_store)
+
+    def test_only_changed_pages_are_sent(self):
+        """A revision sends its changed page only, also from a saved store"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pages.jsonl")
+            ap = self._parser(ContentHashIndex(path))
+            result, timing = ap.parse_incremental(
+                file_content=self.data, file_type="pdf"
+            )
+            self.assertEqual(result, PdfPages(self.data).digests)
+            self.assertTrue(timing.endswith("(9 of 9 pages parsed)"))
+            self.assertEqual(len(self.server.requests), 9)
+
+            ap = self._parser(ContentHashIndex(path))
+            result, timing = ap.parse_incremental(
+                file_content=self.revised, file_type="pdf"
+            )
+            self.assertEqual(result, PdfPages(self.revised).digests)
+            self.assertTrue(timing.endswith("(1 of 9 pages parsed)"))
+            self.assertEqual(len(self.server.requests), 10)
+            with open(path, encoding="utf-8") as file:
+                self.assertEqual(len(file.readlines()), 10)
+
+    def test_failed_pages_are_not_stored(self):
+        """Failed pages make the call fail and are sent again next time"""
+        ap = self._parser()
+        self.server.failures = 2
+        result, timing = ap.parse_incremental(file_content=self.data, file_type="pdf")
+        self.assertTrue(result.startswith("Error: 500"))
+        self.assertTrue(result.endswith("(2 of 9 pages failed)"))
+        self.assertEqual(timing, "")
+        self.assertEqual(len(ap.page_store), 7)
+
+        result, timing = ap.parse_incremental(file_content=self.data, file_type="pdf")
+        self.assertEqual(result, PdfPages(self.data).digests)
+        self.assertTrue(timing.endswith("(2 of 9 pages parsed)"))
+        self.assertEqual(len(self.server.requests), 11)
+
+    def test_bounded_page_store(self):
+        """Results are complete even when the store keeps fewer pages"""
+        self.assertEqual(self._parser().page_store.max_entries, PAGE_STORE_ENTRIES)
+        ap = self._parser(ContentHashIndex(max_entries=4))
+        result, _ = ap.parse_incremental(file_content=self.data, file_type="pdf")
+        self.assertEqual(result, PdfPages(self.data).digests)
+        self.assertEqual(len(ap.page_store), 4)
+
+    def test_non_pdf_fallback(self):
+        """Other file types and unreadable PDFs are parsed whole"""
+        ap = self._parser()
+        result, _ = ap.parse_incremental(file_path=SAMPLE_PNG)
+        self.assertEqual(result, ["whole png"])
+        # pypdf warns as well
+        with self.assertLogs(level="WARNING") as logs:
+            result, _ = ap.parse_incremental(
+                file_content=b"%PDF-1.4 damaged", file_type="pdf"
+            )
+        self.assertTrue(any("parsing it whole" in line for line in logs.output))
+        self.assertEqual(result, ["whole pdf"])
+        self.assertEqual(self.server.requests, ["png", "pdf"])
+        self.assertEqual(len(ap.page_store), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
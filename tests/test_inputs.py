@@ -0,0 +1,112 @@
+"""Testing raw bytes and binary stream inputs"""
+
+import base64
+import io
+import json
+import sys
+import unittest
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.any_parser import _load_file_input  # noqa: E402
+from any_parser.utils import (  # noqa: E402
+    encode_json_payload,
+    is_binary_input,
+    validate_file_inputs,
+)
+
+SAMPLE_PDF = "./examples/sample_data/test_invoice.pdf"
+
+
+class TestInputs(unittest.TestCase):
+    """Testing that every input form loads to the same base64 content"""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(SAMPLE_PDF, "rb") as file:
+            cls.raw = file.read()
+        cls.encoded = base64.b64encode(cls.raw)
+
+    def test_input_forms_load_identically(self):
+        """Paths, base64, bytes-likes and streams give the same content"""
+        cases = {
+            "path": dict(file_path=SAMPLE_PDF),
+            "base64": dict(file_content=self.encoded.decode("ascii"), file_type="pdf"),
+            "bytes": dict(file_content=self.raw, file_type="pdf"),
+            "bytes in place of the path": dict(file_path=self.raw, file_type="pdf"),
+            "bytearray": dict(file_content=bytearray(self.raw), file_type="pdf"),
+            "memoryview": dict(file_content=memoryview(self.raw), file_type="pdf"),
+            "stream": dict(file_content=io.BytesIO(self.raw), file_type="pdf"),
+        }
+        for name, kwargs in cases.items():
+            with self.subTest(name=name):
+                _, content, file_type, error = _load_file_input(**kwargs)
+                self.assertEqual(error, "")
+                self.assertEqual(file_type, "pdf")
+                content = (
+                    content.encode("ascii") if isinstance(content, str) else content
+                )
+                self.assertEqual(content, self.encoded)
+
+    def test_raw_input_validation(self):
+        """Raw inputs need a file type and are checked for size"""
+        self.assertTrue(is_binary_input(io.BytesIO()))
+        self.assertFalse(is_binary_input("file.pdf"))
+        self.assertIn(
+            "file_type must be provided", _load_file_input(file_content=self.raw)[3]
+        )
+        self.assertIn(
+            "File is empty",
+            _load_file_input(file_content=io.BytesIO(), file_type="pdf")[3],
+        )
+        self.assertIn(
+            "exceeds maximum limit",
+            _load_file_input(
+                file_content=io.BytesIO(self.raw),
+                file_type="pdf",
+                max_file_size_mb=0.01,
+            )[3],
+        )
+        self.assertIn(
+            "binary mode",
+            _load_file_input(file_content=io.StringIO("text"), file_type="pdf")[3],
+        )
+        self.assertEqual(validate_file_inputs(None, self.raw, "pdf"), (True, ""))
+
+    def test_payload_from_base64_bytes(self):
+        """Base64 bytes are spliced into the request body unchanged"""
+        body = encode_json_payload(self.encoded, "pdf")
+        self.assertTrue(body.startswith(b'{"file_content": "' + self.encoded[:16]))
+        self.assertTrue(body.endswith(b'"file_type": "pdf"}'))
+
+    def test_base64_validation(self):
+        """ASCII base64 strings pass unchanged; others return an error"""
+        lines = base64.encodebytes(self.raw).decode("ascii")
+        urlsafe = base64.urlsafe_b64encode(self.raw).decode("ascii")
+        for content in (lines, urlsafe):
+            _, loaded, _, error = _load_file_input(
+                file_content=content, file_type="pdf"
+            )
+            self.assertEqual(error, "")
+            self.assertEqual(loaded, content.encode("ascii"))
+        body = encode_json_payload(lines, "pdf")
+        self.assertNotIn(b"\n", body)
+        self.assertEqual(json.loads(body)["file_content"], lines)
+
+        error = "Error: file_content is not valid base64: it has non-ASCII characters"
+        _, _, _, message = _load_file_input(file_content="JVBE\u00e9", file_type="pdf")
+        self.assertEqual(message, error)
+        with self.assertRaises(ValueError):
+            encode_json_payload("JVBE\u00e9", "pdf")
+
+        # The methods return the error before sending anything
+        ap = AnyParser("key", base_url="http://127.0.0.1:9")
+        self.addCleanup(ap.job_poller.shutdown)
+        for method in (ap.parse, ap.process):
+            self.assertEqual(
+                method(file_content="caf\u00e9", file_type="pdf"), (error, "")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
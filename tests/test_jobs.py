@@ -0,0 +1,202 @@
+"""Testing the background polling of async jobs"""
+
+import sys
+import time
+import unittest
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.concurrency import AdaptiveLimiter, ServerBusy  # noqa: E402
+from any_parser.constants import ProcessType  # noqa: E402
+from any_parser.deadline import (  # noqa: E402
+    CancellationToken,
+    Cancelled,
+    DeadlineExceeded,
+    deadline,
+)
+from any_parser.jobs import JobPoller  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+
+CONTENT = "JVBERi0xLjQK"
+
+
+def answer(plans, job_id, attempt):
+    """Answer of a status check from the job's plan.
+
+    ``plans`` maps a job ID to the (HTTP code, status) answers of its
+    status checks; the last one repeats. Jobs without a plan are
+    processing once, then completed with their ID as the markdown.
+    """
+    plan = plans.get(job_id) or [(200, "processing"), (200, "completed")]
+    code, status = plan[min(attempt, len(plan) - 1)]
+    body = {"job_id": job_id, "status": status}
+    if status == "completed":
+        body["result"] = {"markdown": [job_id]}
+    elif status == "failed":
+        body["error_message"] = f"{job_id} failed"
+    return code, body
+
+
+def submit(request):
+    server = request.server
+    with server.lock:
+        server.submitted += 1
+        job_id = f"job-{server.submitted}"
+    if server.submit_code != 200:
+        return server.submit_code, {"error": "rejected"}
+    return 200, {"job_id": job_id}
+
+
+def check_status(request):
+    server = request.server
+    job_id = request.path.rsplit("/", 1)[-1]
+    with server.lock:
+        attempt = sum(1 for checked, _ in server.checks if checked == job_id)
+        server.checks.append((job_id, time.monotonic()))
+    if job_id in server.slow:
+        time.sleep(1)
+    return answer(server.plans, job_id, attempt)
+
+
+ROUTES = {("POST", "/"): submit, ("GET", "/"): check_status}
+
+
+class TestJobPoller(unittest.TestCase):
+    """Testing scheduling, backoff, cancellation and errors of polled jobs"""
+
+    def _server(self, plans=None, slow=(), submit_code=200):
+        return serve(
+            self,
+            ROUTES,
+            plans=plans or {},
+            slow=slow,
+            submit_code=submit_code,
+            submitted=0,
+            checks=[],
+        )
+
+    def _parser(self, server, **kwargs):
+        ap = AnyParser("key", base_url=server.url, **kwargs)
+        self.addCleanup(ap.job_poller.shutdown)
+        return ap
+
+    def _checks(self, server, job_id):
+        return [at for checked, at in server.checks if checked == job_id]
+
+    def test_scheduling_order(self):
+        """Jobs are checked in due order, each rescheduled after its check"""
+        server = self._server()
+        ap = self._parser(server)
+        poller = JobPoller(ap.get_job_status, poll_interval=0.1, max_workers=1)
+        self.addCleanup(poller.shutdown)
+        jobs = []
+        for job_id in ("job-3", "job-1", "job-2"):
+            jobs.append(poller.track(job_id, ProcessType.PARSE))
+            time.sleep(0.02)
+        self.assertEqual(
+            [job.result(timeout=5) for job in jobs], [["job-3"], ["job-1"], ["job-2"]]
+        )
+        self.assertEqual(
+            [job_id for job_id, _ in server.checks],
+            ["job-3", "job-1", "job-2"] * 2,
+        )
+        for job_id in ("job-1", "job-2", "job-3"):
+            first, second = self._checks(server, job_id)
+            self.assertGreaterEqual(second - first, 0.1)
+
+    def test_slow_checks_do_not_block_other_jobs(self):
+        """A slow status request does not delay the checks of other jobs"""
+        server = self._server(
+            plans={"job-2": [(200, "processing")] * 5 + [(200, "completed")]},
+            slow=("job-1",),
+        )
+        ap = self._parser(server, poll_interval=0.05)
+        slow = ap.submit_parse(file_content=CONTENT, file_type="pdf")
+        time.sleep(0.1)
+        fast = ap.submit_parse(file_content=CONTENT, file_type="pdf")
+        started = time.monotonic()
+        self.assertEqual(fast.result(timeout=5), ["job-2"])
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertFalse(slow.done())
+        self.assertEqual(slow.result(timeout=5), ["job-1"])
+
+    def test_backoff(self):
+        """Overloaded polls are retried with a limiter and fail without one"""
+        plans = {
+            "job-1": [(429, "busy"), (503, "busy"), (200, "completed")],
+        }
+        server = self._server(plans=plans)
+        limiter = AdaptiveLimiter(initial_limit=4, max_limit=4)
+        ap = self._parser(server, poll_interval=0.05, job_limiter=limiter)
+        job = ap.submit_parse(file_content=CONTENT, file_type="pdf")
+        self.assertEqual(job.result(timeout=5), ["job-1"])
+        checks = self._checks(server, "job-1")
+        self.assertEqual(len(checks), 3)
+        self.assertGreaterEqual(checks[2] - checks[1], 0.05)
+
+        server = self._server(plans=plans)
+        ap = self._parser(server, poll_interval=0.05)
+        job = ap.submit_parse(file_content=CONTENT, file_type="pdf")
+        with self.assertRaises(ServerBusy):
+            job.result(timeout=5)
+        self.assertEqual(len(self._checks(server, "job-1")), 1)
+
+    def test_cancellation(self):
+        """Cancelled or expired jobs stop being polled"""
+        processing = [(200, "processing")]
+        server = self._server(plans={"job-1": processing, "job-2": processing})
+        ap = self._parser(server, poll_interval=0.05)
+        token = CancellationToken()
+        with deadline(cancel_token=token):
+            job = ap.submit_parse(file_content=CONTENT, file_type="pdf")
+        time.sleep(0.2)
+        token.cancel()
+        with self.assertRaises(Cancelled):
+            job.result(timeout=1)
+        checks = len(server.checks)
+        time.sleep(0.2)
+        self.assertLessEqual(len(server.checks), checks + 1)
+        self.assertEqual(ap.job_poller.pending(), 0)
+
+        with deadline(0.3):
+            job = ap.submit_parse(file_content=CONTENT, file_type="pdf")
+        started = time.monotonic()
+        with self.assertLogs("any_parser.jobs", "ERROR"):
+            with self.assertRaises(DeadlineExceeded):
+                job.result(timeout=5)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_errors_reach_the_future(self):
+        """Failed jobs, status errors and rejected submissions raise"""
+        server = self._server(
+            plans={
+                "job-1": [(200, "failed")],
+                "job-2": [(500, "broken")],
+                "job-3": [(200, "lost")],
+            }
+        )
+        ap = self._parser(server, poll_interval=0.05)
+        jobs = [
+            ap.submit_parse(file_content=CONTENT, file_type="pdf") for _ in range(3)
+        ]
+        messages = {}
+        with self.assertLogs("any_parser.jobs", "ERROR"):
+            for job in jobs:
+                with self.assertRaises(Exception) as raised:
+                    job.result(timeout=5)
+                messages[job.job_id] = str(raised.exception)
+        self.assertEqual(messages["job-1"], "Error: job-1 failed")
+        self.assertTrue(messages["job-2"].startswith("Error 500"))
+        self.assertEqual(messages["job-3"], "Unknown status: lost")
+
+        server.submit_code = 400
+        job = ap.submit_parse(file_content=CONTENT, file_type="pdf")
+        with self.assertRaises(Exception):
+            job.result(timeout=5)
+        job = ap.submit_parse(file_content=CONTENT, file_type="txt")
+        with self.assertRaisesRegex(Exception, "Unsupported file type"):
+            job.result(timeout=5)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
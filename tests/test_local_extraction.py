@@ -0,0 +1,214 @@
+"""Testing local DOCX/PPTX to markdown conversion"""
+
+import base64
+import io
+import sys
+import unittest
+import zipfile
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.local_extraction import (  # noqa: E402
+    LocalExtractionOptions,
+    LocalExtractor,
+    extract_office,
+)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def _zip(parts):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as archive:
+        for name, xml in parts.items():
+            archive.writestr(name, xml)
+    return output.getvalue()
+
+
+def make_docx(body):
+    styles = (
+        f'<w:styles xmlns:w="{W_NS}">'
+        '<w:style w:styleId="Heading1"><w:name w:val="heading 1"/></w:style>'
+        "</w:styles>"
+    )
+    numbering = (
+        f'<w:numbering xmlns:w="{W_NS}">'
+        '<w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0">'
+        '<w:numFmt w:val="bullet"/></w:lvl></w:abstractNum>'
+        '<w:abstractNum w:abstractNumId="1"><w:lvl w:ilvl="0">'
+        '<w:numFmt w:val="decimal"/></w:lvl></w:abstractNum>'
+        '<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>'
+        '<w:num w:numId="2"><w:abstractNumId w:val="1"/></w:num>'
+        "</w:numbering>"
+    )
+    document = (
+        f'<w:document xmlns:w="{W_NS}" xmlns:a="{A_NS}">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    return _zip(
+        {
+            "word/document.xml": document,
+            "word/styles.xml": styles,
+            "word/numbering.xml": numbering,
+        }
+    )
+
+
+def paragraph(text, style=None, num_id=None, bold=False):
+    props = ""
+    if style:
+        props += f'<w:pStyle w:val="{style}"/>'
+    if num_id:
+        props += f'<w:numPr><w:ilvl w:val="0"/><w:numId w:val="{num_id}"/></w:numPr>'
+    run_props = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f"<w:p><w:pPr>{props}</w:pPr><w:r>{run_props}<w:t>{text}</w:t></w:r></w:p>"
+
+
+def table(rows):
+    cells = "".join(
+        "<w:tr>" + "".join(f"<w:tc>{paragraph(c)}</w:tc>" for c in row) + "</w:tr>"
+        for row in rows
+    )
+    return f"<w:tbl>{cells}</w:tbl>"
+
+
+def make_pptx(slides):
+    presentation = (
+        f'<p:presentation xmlns:p="{P_NS}" xmlns:r="{R_NS}"><p:sldIdLst>'
+        + "".join(
+            f'<p:sldId id="{256 + i}" r:id="rId{i + 1}"/>' for i in range(len(slides))
+        )
+        + "</p:sldIdLst></p:presentation>"
+    )
+    rels = (
+        f'<Relationships xmlns="{PKG_NS}">'
+        + "".join(
+            f'<Relationship Id="rId{i + 1}" Target="slides/slide{i + 1}.xml"/>'
+            for i in range(len(slides))
+        )
+        + "</Relationships>"
+    )
+    parts = {
+        "ppt/presentation.xml": presentation,
+        "ppt/_rels/presentation.xml.rels": rels,
+    }
+    for i, shapes in enumerate(slides):
+        parts[f"ppt/slides/slide{i + 1}.xml"] = (
+            f'<p:sld xmlns:p="{P_NS}" xmlns:a="{A_NS}"><p:cSld><p:spTree>'
+            f"{shapes}</p:spTree></p:cSld></p:sld>"
+        )
+    return _zip(parts)
+
+
+def shape(placeholder, *texts):
+    ph = f'<p:ph type="{placeholder}"/>' if placeholder else ""
+    paragraphs = "".join(f"<a:p><a:r><a:t>{t}</a:t></a:r></a:p>" for t in texts)
+    return (
+        f"<p:sp><p:nvSpPr><p:nvPr>{ph}</p:nvPr></p:nvSpPr>"
+        f"<p:txBody>{paragraphs}</p:txBody></p:sp>"
+    )
+
+
+class TestLocalExtraction(unittest.TestCase):
+    """Testing markdown conversion and the confidence heuristic"""
+
+    def test_docx_markdown(self):
+        """Headings, lists, emphasis and tables are converted"""
+        data = make_docx(
+            paragraph("Report", style="Heading1")
+            + paragraph("Summary", bold=True)
+            + paragraph("first", num_id=1)
+            + paragraph("second", num_id=1)
+            + paragraph("step", num_id=2)
+            + table([["Name", "Total"], ["a|b", "3"]])
+        )
+        extraction = extract_office(data, "docx")
+        self.assertEqual(extraction.confidence, 1.0)
+        self.assertEqual(
+            extraction.markdown,
+            [
+                "# Report\n\n**Summary**\n\n- first\n- second\n1. step\n\n"
+                "| Name | Total |\n| --- | --- |\n| a\\|b | 3 |"
+            ],
+        )
+
+    def test_pptx_markdown(self):
+        """One markdown entry per slide, in presentation order"""
+        data = make_pptx(
+            [
+                shape("title", "Quarterly") + shape(None, "Confidential"),
+                shape("title", "Results") + shape("body", "Revenue up", "Costs down"),
+            ]
+        )
+        extraction = extract_office(data, "pptx")
+        self.assertEqual(extraction.confidence, 1.0)
+        self.assertEqual(
+            extraction.markdown,
+            ["# Quarterly\n\nConfidential", "# Results\n\n- Revenue up\n- Costs down"],
+        )
+
+    def test_complex_documents_go_remote(self):
+        """Images, merged cells and unreadable files lower the confidence"""
+        extractor = LocalExtractor(LocalExtractionOptions())
+        with open("./examples/sample_data/test_odf.docx", "rb") as file:
+            self.assertIsNone(extractor.extract(file.read(), "docx"))
+
+        merged = make_docx(
+            paragraph("Text")
+            + table([["a", "b"]]).replace(
+                "<w:tc>", "<w:tc><w:tcPr><w:vMerge/></w:tcPr>"
+            )
+        )
+        extraction = extract_office(merged, "docx")
+        self.assertEqual(extraction.issues, ["merged table cells"])
+        self.assertAlmostEqual(extraction.confidence, 0.8)
+        self.assertIsNotNone(extractor.extract(merged, "docx"))
+        strict = LocalExtractor(LocalExtractionOptions(min_confidence=0.9))
+        self.assertIsNone(strict.extract(merged, "docx"))
+        self.assertIsNone(extractor.extract(b"not a zip", "docx"))
+        self.assertEqual(extractor.stats, {"local": 1, "remote": 2})
+
+    def test_parse_uses_local_result(self):
+        """Plain parse calls on simple files are answered locally unless forced"""
+        ap = AnyParser("key", local_extraction=LocalExtractionOptions())
+        calls = []
+        ap._sync_parse.parse = lambda **kwargs: calls.append(kwargs) or (
+            ["remote"],
+            "Time Elapsed: 1.00 seconds",
+        )
+        content = base64.b64encode(make_docx(paragraph("Hello"))).decode()
+
+        result, info = ap.parse(file_content=content, file_type="docx")
+        self.assertEqual(result, ["Hello"])
+        self.assertTrue(info.endswith("(local)"))
+        self.assertEqual(calls, [])
+
+        result, _ = ap.parse(file_content=content, file_type="docx", force_remote=True)
+        self.assertEqual(result, ["remote"])
+        self.assertEqual(ap.local_extractor.stats, {"local": 1, "remote": 0})
+
+        # Calls asking for more than the plain parse result go to the API
+        ap._sync_parse_textract.parse = ap._sync_parse.parse
+        for result, _ in (
+            ap.parse_textract(file_content=content, file_type="docx"),
+            ap.parse_textract(
+                file_content=content, file_type="docx", extract_tables=True
+            ),
+            ap.parse(
+                file_content=content,
+                file_type="docx",
+                extract_args={"extract_tables": True},
+            ),
+        ):
+            self.assertEqual(result, ["remote"])
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(calls[2]["extract_args"], {"extract_tables": True})
+        self.assertEqual(ap.local_extractor.stats, {"local": 1, "remote": 0})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,114 @@
+"""Testing routing of PDFs between the parse models"""
+
+import importlib.util
+import sys
+import unittest
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.constants import ProcessType  # noqa: E402
+from any_parser.model_router import (  # noqa: E402
+    ModelRouter,
+    ModelRoutingOptions,
+    PageProfile,
+    sample_indices,
+)
+
+SAMPLE_DATA = "./examples/sample_data/"
+
+
+def text_page(index, chars=2000, scripts=None, image_coverage=0.0):
+    return PageProfile(
+        page=index,
+        chars=chars,
+        image_coverage=image_coverage,
+        scripts=scripts or {"LATIN": chars},
+    )
+
+
+class TestModelRouter(unittest.TestCase):
+    """Testing the classifier rules and decision reporting"""
+
+    def test_classify(self):
+        """Text layers go to parse, scans to textract, other scripts to pro"""
+        router = ModelRouter()
+        decision = router.classify([text_page(0), text_page(4)])
+        self.assertEqual(decision.process_type, ProcessType.PARSE)
+
+        scanned = PageProfile(page=2, chars=0, image_coverage=1.0)
+        decision = router.classify([text_page(0), scanned])
+        self.assertEqual(decision.process_type, ProcessType.PARSE_TEXTRACT)
+        self.assertEqual(decision.reason, "1 of 2 sampled pages scanned")
+
+        figure = text_page(1, image_coverage=0.7)
+        decision = router.classify([figure])
+        self.assertEqual(decision.process_type, ProcessType.PARSE_TEXTRACT)
+
+        garbled = PageProfile(page=0, chars=500, unreadable_chars=200)
+        decision = router.classify([garbled])
+        self.assertEqual(decision.process_type, ProcessType.PARSE_TEXTRACT)
+
+        arabic = text_page(0, scripts={"ARABIC": 900, "LATIN": 100})
+        decision = router.classify([arabic, text_page(1)])
+        self.assertEqual(decision.process_type, ProcessType.PARSE_PRO)
+        self.assertEqual(decision.reason, "Arabic script")
+
+        options = ModelRoutingOptions(scanned_model=ProcessType.PARSE_PRO)
+        decision = ModelRouter(options).classify([scanned])
+        self.assertEqual(decision.process_type, ProcessType.PARSE_PRO)
+
+    def test_sample_indices(self):
+        """Samples are spread over the whole document"""
+        self.assertEqual(sample_indices(3, 5), [0, 1, 2])
+        self.assertEqual(sample_indices(101, 5), [0, 25, 50, 75, 100])
+        self.assertEqual(sample_indices(10, 1), [0])
+
+    def test_route_reports_decisions(self):
+        """Overrides and non-PDF files skip the classifier"""
+        router = ModelRouter()
+        decision = router.route(b"", "pdf", "a.pdf", override=ProcessType.PARSE)
+        self.assertTrue(decision.overridden)
+        self.assertEqual(decision.process_type, ProcessType.PARSE)
+        router.route(b"data", "png", "b.png")
+        router.route(None, "pdf", "c.pdf")
+        self.assertEqual(
+            [(d.file_path, d.process_type) for d in router.decisions()],
+            [
+                ("a.pdf", ProcessType.PARSE),
+                ("b.png", ProcessType.PARSE_PRO),
+                ("c.pdf", ProcessType.PARSE_PRO),
+            ],
+        )
+        self.assertEqual(router.stats(), {"parse": 1, "parse_pro": 2})
+
+    @unittest.skipUnless(importlib.util.find_spec("pypdf"), "pypdf is not installed")
+    def test_parse_routed(self):
+        """parse_routed sends each sample PDF to the model it was routed to"""
+        ap = AnyParser("key")
+        calls = []
+        for process_type in (ProcessType.PARSE, ProcessType.PARSE_TEXTRACT):
+            ap._sync_parsers[process_type].parse = (
+                lambda process_type=process_type, **kwargs: calls.append(process_type)
+                or (["markdown"], "Time Elapsed: 1.00 seconds")
+            )
+        for name in ("sample.pdf", "resume_1.pdf", "test_invoice.pdf"):
+            result, _ = ap.parse_routed(file_path=SAMPLE_DATA + name)
+            self.assertEqual(result, ["markdown"])
+        ap.parse_routed(
+            file_path=SAMPLE_DATA + "sample.pdf",
+            process_type=ProcessType.PARSE_TEXTRACT,
+        )
+        self.assertEqual(
+            calls,
+            [
+                ProcessType.PARSE,
+                ProcessType.PARSE_TEXTRACT,
+                ProcessType.PARSE,
+                ProcessType.PARSE_TEXTRACT,
+            ],
+        )
+        self.assertEqual(ap.model_router.decisions()[1].pages[0].image_coverage, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
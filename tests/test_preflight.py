@@ -0,0 +1,186 @@
+"""Testing file preflight without full file load"""
+
+import base64
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.append(".")
+from any_parser.preflight import (  # noqa: E402
+    estimate_pages,
+    preflight,
+    preflight_content,
+)
+
+# Three pages that all point at one page object, so a scan for page
+# objects (the fallback) would count one
+OBJECTS = {
+    1: b"<< /Type /Catalog /Pages 2 0 R >>",
+    2: b"<< /Type /Pages /Kids [3 0 R 3 0 R 3 0 R] /Count 3 >>",
+    3: b"<< /Type /Page /Parent 2 0 R >>",
+}
+
+
+def _objects(data, objects):
+    """Append numbered objects to data, returning their offsets."""
+    offsets = {}
+    for number, body in objects.items():
+        offsets[number] = len(data)
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    return offsets
+
+
+def _xref_table(data, offsets, trailer):
+    """Append a cross-reference table, its trailer and startxref."""
+    start = len(data)
+    data += b"xref\n"
+    for number, offset in sorted(offsets.items()):
+        data += b"%d 1\n%010d 00000 n \n" % (number, offset)
+    data += b"trailer\n<< %s >>\nstartxref\n%d\n%%%%EOF\n" % (trailer, start)
+    return start
+
+
+def xref_stream_pdf():
+    """PDF whose cross-reference data is an uncompressed xref stream."""
+    data = bytearray(b"%PDF-1.5\n")
+    offsets = _objects(data, OBJECTS)
+    start = offsets[4] = len(data)
+    rows = b"\x00\x00\x00\xff" + b"".join(
+        b"\x01" + offsets[number].to_bytes(2, "big") + b"\x00" for number in range(1, 5)
+    )
+    data += (
+        b"4 0 obj\n<< /Type /XRef /Size 5 /W [1 2 1] /Root 1 0 R /Length %d >>\n"
+        b"stream\n%s\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n"
+        % (len(rows), rows, start)
+    )
+    return bytes(data)
+
+
+def updated_pdf():
+    """PDF with an incremental update that adds two pages to the page tree."""
+    data = bytearray(b"%PDF-1.4\n")
+    first = _xref_table(data, _objects(data, OBJECTS), b"/Size 4 /Root 1 0 R")
+    pages = b"<< /Type /Pages /Kids [3 0 R 3 0 R 3 0 R 3 0 R 3 0 R] /Count 5 >>"
+    offsets = _objects(data, {2: pages})
+    _xref_table(data, offsets, b"/Size 4 /Root 1 0 R /Prev %d" % first)
+    return bytes(data)
+
+
+class TestPreflight(unittest.TestCase):
+    """Testing page counts, dimensions and size limits"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def _write(self, name, data):
+        path = self.directory / name
+        path.write_bytes(data)
+        return str(path)
+
+    def test_pdf_page_count(self):
+        """PDF page counts from classic and stream cross-references"""
+        cases = {
+            "./examples/sample_data/sample.pdf": 9,
+            "./examples/sample_data/Earnings-Presentation-Q2-2024.pdf": 6,
+            "./examples/sample_data/test_invoice.pdf": 1,
+        }
+        for working_file, pages in cases.items():
+            with self.subTest(working_file=working_file):
+                self.assertEqual(preflight(working_file).page_count, pages)
+
+    def test_pdf_cross_reference_kinds(self):
+        """Page trees are read through xref streams and incremental updates"""
+        self.assertEqual(
+            preflight(self._write("stream.pdf", xref_stream_pdf())).page_count, 3
+        )
+        # The newest section wins over the original page tree
+        self.assertEqual(
+            preflight(self._write("updated.pdf", updated_pdf())).page_count, 5
+        )
+
+    def test_damaged_files(self):
+        """Truncated and corrupt files give no counts instead of raising"""
+        with open("./examples/sample_data/sample.pdf", "rb") as file:
+            pdf = file.read()
+        with open("./examples/sample_data/test_odf.pptx", "rb") as file:
+            pptx = file.read()
+        with open("./examples/sample_data/test3.png", "rb") as file:
+            png = file.read()
+
+        # Without its cross-reference data, a PDF's page objects are counted
+        info = preflight(self._write("truncated.pdf", pdf[: len(pdf) - 1000]))
+        self.assertEqual(info.size_bytes, len(pdf) - 1000)
+        self.assertEqual(info.page_count, 9)
+        self.assertIsNone(preflight(self._write("header.pdf", pdf[:100])).page_count)
+        self.assertIsNone(preflight(self._write("empty.pdf", b"")).page_count)
+
+        for name, data in {
+            "truncated.pptx": pptx[: len(pptx) // 2],
+            "corrupt.pptx": b"PK\x03\x04" + bytes(range(256)) * 4,
+            "corrupt.docx": b"not a zip file",
+        }.items():
+            with self.subTest(name=name):
+                self.assertIsNone(preflight(self._write(name, data)).page_count)
+
+        info = preflight(self._write("truncated.png", png[:12]))
+        self.assertEqual((info.width, info.height), (None, None))
+
+    def test_ooxml_and_images(self):
+        """Slide count and image dimensions"""
+        self.assertEqual(
+            preflight("./examples/sample_data/test_odf.pptx").page_count, 3
+        )
+        info = preflight("./examples/sample_data/test_medical_report.jpeg")
+        self.assertEqual((info.width, info.height), (1432, 1296))
+        info = preflight("./examples/sample_data/test3.png")
+        self.assertEqual((info.width, info.height), (1613, 337))
+
+    def test_base64_content(self):
+        """Base64 content gives the same results, decoding only what is read"""
+        for working_file in (
+            "./examples/sample_data/sample.pdf",
+            "./examples/sample_data/test_odf.pptx",
+            "./examples/sample_data/test3.png",
+        ):
+            with self.subTest(working_file=working_file):
+                expected = preflight(working_file)
+                with open(working_file, "rb") as file:
+                    data = file.read()
+                file_type = expected.file_type
+                for content in (base64.b64encode(data), base64.encodebytes(data)):
+                    info = preflight_content(content, file_type)
+                    self.assertEqual(info.size_bytes, len(data))
+                    self.assertEqual(info.page_count, expected.page_count)
+                    self.assertEqual(info.width, expected.width)
+
+        # Only the header and cross-reference data of a PDF are decoded
+        working_file = "./examples/sample_data/test2.pdf"
+        with open(working_file, "rb") as file:
+            content = base64.b64encode(file.read())
+        with mock.patch("base64.b64decode", wraps=base64.b64decode) as decode:
+            info = preflight_content(content, "pdf")
+        self.assertEqual(info.page_count, preflight(working_file).page_count)
+        decoded = sum(len(call.args[0]) for call in decode.call_args_list)
+        self.assertLess(decoded, len(content) // 4)
+
+    def test_size_limit_and_estimate(self):
+        """Size limit is enforced and page estimates add up"""
+        with self.assertRaises(ValueError):
+            preflight("./examples/sample_data/test2.pdf", max_file_size_mb=0.1)
+        self.assertEqual(
+            estimate_pages(
+                [
+                    "./examples/sample_data/sample.pdf",
+                    "./examples/sample_data/test3.png",
+                ]
+            ),
+            10,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
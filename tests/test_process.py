@@ -0,0 +1,175 @@
+"""Testing several operations on one document with AnyParser.process"""
+
+import base64
+import sys
+import unittest
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.constants import ProcessType  # noqa: E402
+from any_parser.extraction_schema import PAYLOAD_KEY  # noqa: E402
+from any_parser.scheduler import FairScheduler  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+from tests.test_file_handle import bucket, request_upload  # noqa: E402
+
+SAMPLE_PDF = "./examples/sample_data/test_invoice.pdf"
+CONTENT = "JVBERi0xLjQK"
+TABLE = "<table><tr><td>1</td></tr></table>"
+
+# Answer of each sync endpoint
+ANSWERS = {
+    "/anyparser/sync_parse": {"markdown": ["parse"]},
+    "/anyparser/sync_parse_pro": {"markdown": ["parse_pro"]},
+    "/anyparser/sync_parse_textract": {"markdown": ["parse_textract"]},
+    "/anyparser/sync_extract_pii": {"result": {"pii": "redacted"}},
+    "/anyparser/sync_extract_tables": {"markdown": [TABLE]},
+    "/anyparser/sync_extract_key_value": {"result": {"total": "42"}},
+}
+
+
+def sync_endpoint(request):
+    """Sync endpoints recording each request body.
+
+    Endpoints in ``failing`` answer with a 500.
+    """
+    server = request.server
+    with server.lock:
+        server.requests.append((request.path, request.json()))
+    if request.path not in ANSWERS:
+        return 404, {"message": "not found"}
+    if request.path in server.failing:
+        return 500, {"message": "broken"}
+    return 200, ANSWERS[request.path]
+
+
+class TestProcess(unittest.TestCase):
+    """Testing each operation, shared encoding and errors of process"""
+
+    def _parser(self, failing=(), upload=False, **kwargs):
+        routes = {
+            ("POST", "/anyparser/"): sync_endpoint,
+            ("POST", "/upload"): request_upload,
+            ("POST", "/bucket"): bucket,
+        }
+        server = serve(
+            self,
+            routes,
+            requests=[],
+            failing=failing,
+            upload_requests=[],
+            uploads=[],
+            expires_in=3600,
+            bucket_status=204,
+        )
+        if upload:
+            kwargs["upload_url"] = server.url + "/upload"
+        ap = AnyParser("key", base_url=server.url, **kwargs)
+        self.addCleanup(ap.job_poller.shutdown)
+        return server, ap
+
+    def test_each_operation(self):
+        """Every process type calls its endpoint with its arguments"""
+        instruction = {"total": "The invoice total"}
+        cases = {
+            ProcessType.PARSE: ({}, ["parse"], {}),
+            ProcessType.PARSE_PRO: ({}, ["parse_pro"], {}),
+            ProcessType.PARSE_TEXTRACT: (
+                {"extract_tables": True},
+                ["parse_textract"],
+                {"extract_tables": True},
+            ),
+            ProcessType.EXTRACT_PII: ({}, {"pii": "redacted"}, {}),
+            ProcessType.EXTRACT_TABLES: ({}, TABLE, {"extract_tables": True}),
+            ProcessType.EXTRACT_KEY_VALUE: (
+                {"extract_instruction": instruction},
+                {"total": "42"},
+                {PAYLOAD_KEY: [{"key": "total", "description": "The invoice total"}]},
+            ),
+        }
+        self.assertEqual(set(cases), set(ProcessType))
+        for process_type, (kwargs, expected, sent) in cases.items():
+            with self.subTest(process_type=process_type.value):
+                server, ap = self._parser()
+                operation = (process_type, kwargs) if kwargs else process_type
+                result, info = ap.process(
+                    file_content=CONTENT, file_type="pdf", operations=[operation]
+                )
+                self.assertTrue(info.startswith("Time Elapsed"))
+                self.assertTrue(result.ok, result.errors)
+                self.assertEqual(result[process_type.value], expected)
+                self.assertTrue(result.timings[process_type.value])
+
+                ((path, body),) = server.requests
+                self.assertEqual(path, f"/anyparser/sync_{process_type.value}")
+                self.assertEqual(
+                    body, {"file_content": CONTENT, "file_type": "pdf", **sent}
+                )
+
+    def test_default_operations(self):
+        """The default operations share one encoding of the file"""
+        server, ap = self._parser()
+        result, _ = ap.process(file_path=SAMPLE_PDF)
+        self.assertEqual(
+            set(result.results), {"parse", "extract_tables", "extract_pii"}
+        )
+        with open(SAMPLE_PDF, "rb") as file:
+            encoded = base64.b64encode(file.read()).decode("ascii")
+        self.assertEqual(len(server.requests), 3)
+        for _, body in server.requests:
+            self.assertEqual(body["file_content"], encoded)
+
+    def test_scheduled(self):
+        """Each operation takes a scheduler slot of its own, as the caller"""
+        scheduler = FairScheduler(max_concurrent=2)
+        server, ap = self._parser(scheduler=scheduler, coalesce=True)
+        result, _ = ap.process(file_content=CONTENT, file_type="pdf", tenant="acme")
+        self.assertTrue(result.ok, result.errors)
+        self.assertEqual(len(server.requests), 3)
+        stats = scheduler.stats()
+        self.assertEqual(stats.tenants["acme"].granted, 3)
+        self.assertEqual(stats.running, 0)
+
+    def test_file_handle(self):
+        """With an upload URL the file is uploaded once for all operations"""
+        server, ap = self._parser(upload=True)
+        for _ in range(2):
+            result, _ = ap.process(file_path=SAMPLE_PDF)
+            self.assertTrue(result.ok, result.errors)
+        self.assertEqual(len(server.uploads), 1)
+        self.assertEqual(len(server.requests), 6)
+        for _, body in server.requests:
+            self.assertEqual(body["file_id"], "file-1")
+            self.assertNotIn("file_content", body)
+
+        # A single operation is sent inline
+        server.requests.clear()
+        ap.process(file_content=CONTENT, file_type="pdf", operations=["parse"])
+        ((_, body),) = server.requests
+        self.assertEqual(body["file_content"], CONTENT)
+
+    def test_errors(self):
+        """Failed operations are reported; unsupported ones raise up front"""
+        server, ap = self._parser(failing=("/anyparser/sync_extract_pii",))
+        result, info = ap.process(
+            file_content=CONTENT,
+            file_type="pdf",
+            operations=["parse", ProcessType.EXTRACT_PII],
+        )
+        self.assertTrue(info.startswith("Time Elapsed"))
+        self.assertFalse(result.ok)
+        self.assertEqual(result["parse"], ["parse"])
+        self.assertEqual(list(result.errors), ["extract_pii"])
+        self.assertTrue(result.errors["extract_pii"].startswith("Error"))
+
+        server.requests.clear()
+        for operations in (["parse", "parse_fast"], ["parse", ProcessType.PARSE]):
+            with self.subTest(operations=operations):
+                with self.assertRaises(ValueError):
+                    ap.process(
+                        file_content=CONTENT, file_type="pdf", operations=operations
+                    )
+        self.assertEqual(server.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
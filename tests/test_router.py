@@ -0,0 +1,211 @@
+"""Testing routing between the sync and async-job endpoints"""
+
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.append(".")
+from any_parser import AnyParser  # noqa: E402
+from any_parser.router import (  # noqa: E402
+    ASYNC_PRIOR,
+    SYNC_PRIOR,
+    HybridRouter,
+    LatencyModel,
+)
+from any_parser.scheduler import FairScheduler  # noqa: E402
+from tests.stand_in_server import serve  # noqa: E402
+
+CONTENT = "JVBERi0xLjQK"
+
+
+def submit(request):
+    """Sync endpoint that is slow or times out, and a working job endpoint.
+
+    ``sync_status`` is the status of sync answers, sent after ``sync_delay``
+    seconds.
+    """
+    server = request.server
+    with server.lock:
+        server.paths.append(request.path)
+    if request.path.startswith("/anyparser/async_"):
+        return 200, {"job_id": "job-1"}
+    time.sleep(server.sync_delay)
+    if server.sync_status != 200:
+        return server.sync_status, {"message": "timed out"}
+    return 200, {"markdown": ["sync"]}
+
+
+def check_status(request):
+    """Job status endpoint recording the scheduler slots in use."""
+    server = request.server
+    with server.lock:
+        server.paths.append(request.path)
+        if server.scheduler is not None:
+            server.running.append(server.scheduler.stats().running)
+    return 200, {"status": "completed", "result": {"markdown": ["async"]}}
+
+
+ROUTES = {("POST", "/"): submit, ("GET", "/"): check_status}
+
+
+class TestLatencyModel(unittest.TestCase):
+    """Testing the decayed least-squares fit"""
+
+    def test_prior(self):
+        """Without observations the prior line is predicted"""
+        model = LatencyModel(2.0, 1.5)
+        self.assertAlmostEqual(model.predict(1), 3.5)
+        self.assertAlmostEqual(model.predict(20), 32.0)
+
+    def test_fit(self):
+        """Observations replace the prior and old ones fade out"""
+        model = LatencyModel(*SYNC_PRIOR)
+        for _ in range(300):
+            for pages in (1, 5, 20):
+                model.observe(pages, 1.0 + 0.5 * pages)
+        self.assertAlmostEqual(model.predict(10), 6.0, places=2)
+
+        for _ in range(300):
+            for pages in (1, 5, 20):
+                model.observe(pages, 10.0 + 2.0 * pages)
+        self.assertAlmostEqual(model.predict(10), 30.0, places=1)
+
+    def test_clamped_fit(self):
+        """Latency never falls with the page count or below zero"""
+        model = LatencyModel(*SYNC_PRIOR, decay=0.5)
+        for _ in range(50):
+            model.observe(1, 10.0)
+            model.observe(10, 1.0)
+        self.assertAlmostEqual(model.predict(100), model.predict(1))
+        self.assertGreaterEqual(model.predict(0), 0.0)
+
+        # The same page count every time keeps the average per page
+        model = LatencyModel(*SYNC_PRIOR, decay=0.01)
+        for _ in range(20):
+            model.observe(4, 8.0)
+        self.assertAlmostEqual(model.predict(2), 4.0, places=2)
+
+
+class TestHybridRouter(unittest.TestCase):
+    """Testing routing decisions and their feedback"""
+
+    def test_choice_with_default_priors(self):
+        """Small documents go sync, large ones to the job endpoint"""
+        router = HybridRouter(sync_timeout=60)
+        small = router.choose(file_size=10_000, page_count=1)
+        self.assertEqual(small.mode, "sync")
+        self.assertAlmostEqual(small.predicted_sync, sum(SYNC_PRIOR))
+        self.assertAlmostEqual(small.predicted_async, sum(ASYNC_PRIOR))
+        # Sync is predicted slower from 12 pages, and risks the timeout from 19
+        self.assertEqual(router.choose(0, page_count=11).mode, "sync")
+        self.assertEqual(router.choose(0, page_count=13).mode, "async")
+        self.assertEqual(router.choose(0, page_count=500).mode, "async")
+        # Without a page count the size is used
+        self.assertEqual(router.choose(100 * 1024 * 100).pages, 100)
+        self.assertEqual(router.choose(10).pages, 1)
+
+    def test_choice_at_extreme_priors(self):
+        """A fast sync prior keeps long documents sync until the timeout"""
+        router = HybridRouter(sync_timeout=60)
+        router.sync_model = LatencyModel(0.0, 0.1)
+        self.assertEqual(router.choose(0, page_count=290).mode, "sync")
+        self.assertEqual(router.choose(0, page_count=310).mode, "async")
+
+        router = HybridRouter(sync_timeout=60)
+        router.async_model = LatencyModel(0.0, 0.01)
+        self.assertEqual(router.choose(0, page_count=1).mode, "async")
+
+    def test_record(self):
+        """Recorded latencies move each endpoint's model"""
+        router = HybridRouter(sync_timeout=60)
+        self.assertEqual(router.choose(0, page_count=5).mode, "sync")
+        before = router.async_model.predict(5)
+        for _ in range(20):
+            router.record("sync", 5, 25.0)
+        self.assertEqual(router.choose(0, page_count=5).mode, "async")
+        self.assertEqual(router.async_model.predict(5), before)
+        for _ in range(20):
+            router.record("async", 5, 60.0)
+        self.assertEqual(router.choose(0, page_count=5).mode, "sync")
+
+
+class TestAutoParse(unittest.TestCase):
+    """Testing auto_parse against a stand-in server"""
+
+    def _parser(self, sync_status=200, sync_delay=0.0, scheduler=None):
+        server = serve(
+            self,
+            ROUTES,
+            sync_status=sync_status,
+            sync_delay=sync_delay,
+            paths=[],
+            scheduler=scheduler,
+            running=[],
+        )
+        ap = AnyParser(
+            "key", base_url=server.url, poll_interval=0.05, scheduler=scheduler
+        )
+        self.addCleanup(ap.job_poller.shutdown)
+        return server, ap
+
+    def test_sync(self):
+        """Small documents are parsed on the sync endpoint"""
+        server, ap = self._parser()
+        result, info = ap.auto_parse(
+            file_content=CONTENT, file_type="pdf", page_count=1
+        )
+        self.assertEqual(result, ["sync"])
+        self.assertTrue(info.startswith("Time Elapsed"))
+        self.assertEqual(server.paths, ["/anyparser/sync_parse"])
+
+    def test_gateway_timeout_falls_back_to_a_job(self):
+        """A sync call the server times out is run as a job and penalised"""
+        server, ap = self._parser(sync_status=504)
+        before = ap.router.sync_model.predict(1)
+        result, info = ap.auto_parse(
+            file_content=CONTENT, file_type="pdf", page_count=1
+        )
+        self.assertEqual(result, ["async"])
+        self.assertTrue(info.startswith("Time Elapsed"))
+        self.assertEqual(
+            server.paths,
+            [
+                "/anyparser/sync_parse",
+                "/anyparser/async_parse",
+                "/anyparser/job_status/job-1",
+            ],
+        )
+        self.assertGreater(ap.router.sync_model.predict(1), before)
+
+    def test_client_timeout_falls_back_to_a_job(self):
+        """A sync call that runs out of time is run as a job"""
+        server, ap = self._parser(sync_delay=2)
+        started = time.monotonic()
+        with mock.patch("any_parser.sync_parser.TIMEOUT", 0.3):
+            result, _ = ap.auto_parse(
+                file_content=CONTENT, file_type="pdf", page_count=1
+            )
+        self.assertEqual(result, ["async"])
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(server.paths[1], "/anyparser/async_parse")
+
+    def test_large_documents_go_to_jobs(self):
+        """Documents predicted to risk the sync timeout skip the sync endpoint"""
+        server, ap = self._parser()
+        result, _ = ap.auto_parse(file_content=CONTENT, file_type="pdf", page_count=200)
+        self.assertEqual(result, ["async"])
+        self.assertNotIn("/anyparser/sync_parse", server.paths)
+
+    def test_job_wait_releases_slot(self):
+        """The scheduler slot is given back while waiting for the job"""
+        scheduler = FairScheduler(max_concurrent=1, reserved=0)
+        server, ap = self._parser(scheduler=scheduler)
+        result, _ = ap.auto_parse(file_content=CONTENT, file_type="pdf", page_count=200)
+        self.assertEqual(result, ["async"])
+        self.assertEqual(server.running, [0])
+        self.assertEqual(scheduler.stats().running, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,99 @@
+"""Testing priority and per-tenant fair scheduling"""
+
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(".")
+from any_parser.deadline import DeadlineExceeded, deadline  # noqa: E402
+from any_parser.scheduler import (  # noqa: E402
+    FairScheduler,
+    Priority,
+    release_slot,
+    schedule_as,
+)
+
+
+class TestFairScheduler(unittest.TestCase):
+    """Testing grant order, reservation and queue timeouts"""
+
+    def _queue(self, scheduler, order, tenant, priority):
+        """Start a call that records when it gets a slot, once it is queued"""
+        queued = scheduler.stats().queued
+
+        def call():
+            with scheduler.slot(tenant, priority):
+                order.append(tenant)
+
+        thread = threading.Thread(target=call)
+        thread.start()
+        while scheduler.stats().queued == queued:
+            time.sleep(0.005)
+        return thread
+
+    def test_priority_then_fair_share(self):
+        """Interactive calls go first; tenants alternate within a class"""
+        scheduler = FairScheduler(max_concurrent=1, reserved=0)
+        order = []
+        with scheduler.slot():
+            threads = [
+                self._queue(scheduler, order, "backfill", Priority.BACKGROUND),
+                self._queue(scheduler, order, "backfill", Priority.BACKGROUND),
+                self._queue(scheduler, order, "backfill", Priority.BACKGROUND),
+                self._queue(scheduler, order, "small", Priority.BACKGROUND),
+                self._queue(scheduler, order, "web", Priority.INTERACTIVE),
+            ]
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["web", "backfill", "small", "backfill", "backfill"])
+        stats = scheduler.stats()
+        self.assertEqual(stats.tenants["backfill"].granted, 3)
+        self.assertEqual(stats.priorities["BACKGROUND"].granted, 4)
+        self.assertEqual((stats.running, stats.queued), (0, 0))
+
+    def test_reserved_slot_and_nesting(self):
+        """Reserved slots admit only interactive calls; nested calls reuse a slot"""
+        scheduler = FairScheduler(max_concurrent=2, reserved=1)
+        outcome = {}
+
+        def call(name, priority):
+            try:
+                with deadline(0.1), schedule_as(name, priority), scheduler.slot():
+                    outcome[name] = "ran"
+            except DeadlineExceeded:
+                outcome[name] = "timed out"
+
+        with schedule_as("backfill", "background"), scheduler.slot():
+            with scheduler.slot():
+                self.assertEqual(scheduler.stats().running, 1)
+            for name, priority in (("batch", "normal"), ("web", "interactive")):
+                thread = threading.Thread(target=call, args=(name, priority))
+                thread.start()
+                thread.join()
+        self.assertEqual(outcome, {"batch": "timed out", "web": "ran"})
+        self.assertEqual(scheduler.stats().queued, 0)
+
+    def test_release_slot(self):
+        """A slot given back early is released once; later calls take a new one"""
+        scheduler = FairScheduler(max_concurrent=1, reserved=0)
+        with scheduler.slot():
+            release_slot()
+            self.assertEqual(scheduler.stats().running, 0)
+            with scheduler.slot():
+                self.assertEqual(scheduler.stats().running, 1)
+            release_slot()
+        stats = scheduler.stats()
+        self.assertEqual((stats.running, stats.tenants["default"].granted), (0, 2))
+
+    def test_invalid_arguments(self):
+        """Bad limits and priorities are rejected"""
+        with self.assertRaises(ValueError):
+            FairScheduler(max_concurrent=1, reserved=1)
+        with self.assertRaises(ValueError):
+            with schedule_as(priority="urgent"):
+                pass
+
+
+if __name__ == "__main__":
+    unittest.main()
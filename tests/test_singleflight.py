@@ -0,0 +1,158 @@
+"""Testing coalescing of identical concurrent calls"""
+
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(".")
+from any_parser.deadline import DeadlineExceeded, deadline  # noqa: E402
+from any_parser.extraction_schema import ExtractionSchema  # noqa: E402
+from any_parser.singleflight import SingleFlight, freeze  # noqa: E402
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Testing shared results, errors and retries after caller errors"""
+
+    def _run_concurrently(self, flight, key, fn, count, failed=None):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do(key, fn, failed)))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_run(self):
+        """Callers arriving while a call runs receive its result"""
+        flight = SingleFlight()
+        runs = []
+
+        def fn():
+            runs.append(1)
+            time.sleep(0.1)
+            return "markdown"
+
+        results = self._run_concurrently(flight, "key", fn, 4)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(
+            sorted(results), [("markdown", False)] + [("markdown", True)] * 3
+        )
+        self.assertEqual(flight.do("key", fn), ("markdown", False))
+        stats = flight.stats()
+        self.assertEqual((stats.calls, stats.shared, stats.in_flight), (5, 3, 0))
+
+    def test_errors_are_shared(self):
+        """An error of the running call is raised to every caller"""
+        flight = SingleFlight()
+        errors = []
+
+        def fn():
+            time.sleep(0.05)
+            raise ValueError("bad file")
+
+        def call():
+            try:
+                flight.do("key", fn)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+
+    def test_caller_errors_are_retried(self):
+        """If the running caller runs out of time, a waiting caller runs again"""
+        flight = SingleFlight()
+        runs = []
+
+        def fn():
+            runs.append(1)
+            time.sleep(0.05)
+            if len(runs) == 1:
+                raise DeadlineExceeded("Deadline exceeded")
+            return "markdown"
+
+        outcomes = []
+
+        def call():
+            try:
+                outcomes.append(flight.do("key", fn))
+            except DeadlineExceeded:
+                outcomes.append("timed out")
+
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(outcomes, ["timed out", ("markdown", False)])
+
+    def test_returned_caller_errors_are_retried(self):
+        """An error result the running caller got out of time is not shared"""
+        flight = SingleFlight()
+        runs = []
+
+        def fn():
+            runs.append(1)
+            time.sleep(0.1)
+            if len(runs) == 1:
+                return "Error: Deadline exceeded", ""
+            return ["markdown"], "Time Elapsed: 0.10 seconds"
+
+        def failed(result):
+            return not result[1]
+
+        outcomes = {}
+
+        def call(name, timeout):
+            with deadline(timeout):
+                outcomes[name] = flight.do("key", fn, failed)
+
+        threads = [
+            threading.Thread(target=call, args=("leader", 0.05)),
+            threading.Thread(target=call, args=("follower", None)),
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(outcomes["leader"], (("Error: Deadline exceeded", ""), False))
+        self.assertEqual(outcomes["follower"][0][0], ["markdown"])
+
+        # Error results of a caller with time left are shared
+        def bad_file():
+            runs.append(1)
+            time.sleep(0.1)
+            return "Error: bad file", ""
+
+        runs.clear()
+        results = self._run_concurrently(flight, "key", bad_file, 2, failed)
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(
+            sorted(results),
+            [(("Error: bad file", ""), False), (("Error: bad file", ""), True)],
+        )
+
+    def test_freeze_arguments(self):
+        """Equal arguments freeze to equal keys"""
+        schema = ExtractionSchema({"total": "The total"})
+        self.assertEqual(
+            freeze({"b": [1, 2], "a": schema}), freeze({"a": schema, "b": (1, 2)})
+        )
+        self.assertNotEqual(freeze({"a": 1}), freeze({"a": 2}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""Testing incremental extraction of result fields from JSON responses"""
+
+import json
+import sys
+import unittest
+
+sys.path.append(".")
+from any_parser.streaming import iter_json_field  # noqa: E402
+
+
+def _chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonFieldStreaming(unittest.TestCase):
+    """Testing JSON field streaming"""
+
+    def test_markdown_list_any_chunking(self):
+        """List of markdown pages is joined with newlines for every chunk size"""
+        payload = {
+            "meta": {"markdown": "nested, ignored"},
+            "markdown": ['page "one" \\ é', "page two 😀"],
+        }
+        raw = json.dumps(payload).encode("utf-8")
+        expected = "\n".join(payload["markdown"])
+        for size in (1, 2, 3, 7, len(raw)):
+            with self.subTest(chunk_size=size):
+                result = "".join(iter_json_field(_chunked(raw, size)))
+                self.assertEqual(result, expected)
+
+    def test_non_string_result_is_raw_json(self):
+        """Object results are emitted as raw JSON text"""
+        payload = {"result": {"ein": ["78-8778788"], "note": "a}b"}}
+        raw = json.dumps(payload).encode("utf-8")
+        result = "".join(iter_json_field(_chunked(raw, 4)))
+        self.assertEqual(json.loads(result), payload["result"])
+
+    def test_missing_and_truncated(self):
+        """Missing fields raise KeyError, truncated bodies raise ValueError"""
+        with self.assertRaises(KeyError):
+            list(iter_json_field([b'{"status": "ok"}']))
+        with self.assertRaises(ValueError):
+            list(iter_json_field([b'{"markdown": "abc']))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)